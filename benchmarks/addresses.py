@@ -0,0 +1,52 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file creates address data dicts, modeled on the phpIPAM API, used as the
+fixture data for the benchmarks.
+"""
+
+__all__ = ['address_dict', 'addresses']
+
+
+def address_dict(each, subnet_id=None):
+    """ Returns the phpIPAM address data dict with the ID value `each`. """
+    subnet_id = subnet_id or each // 250 + 1
+    return {
+        'id': str(each),
+        'subnetId': str(subnet_id),
+        'ip': f'10.{each // 65536 % 256}.{each // 256 % 256}.{each % 256}',
+        'is_gateway': '0',
+        'description': f'Address {each} description',
+        'hostname': f'host-{each}.example.com',
+        'mac': f'00:50:56:{each // 65536 % 256:02x}:{each // 256 % 256:02x}:{each % 256:02x}',
+        'owner': 'network-team',
+        'tag': '2',
+        'deviceId': None,
+        'location': None,
+        'port': '',
+        'note': '',
+        'lastSeen': '2019-06-01 12:00:00',
+        'excludePing': '0',
+        'PTRignore': '0',
+        'PTR': '0',
+        'firewallAddressObject': None,
+        'editDate': '2019-06-01 12:00:00',
+        'customer_id': None
+    }
+
+
+def addresses(count):
+    """ Returns the list of `count` address data dicts, with ID values 1 through count. """
+    return [address_dict(each) for each in range(1, count + 1)]
@@ -0,0 +1,83 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure the client overhead of a controller GET call, without the network: the
+API session uses an adapter that returns a canned response.  The controller
+call is compared with the plain requests Session call of the same URL.
+
+    cd benchmarks
+    PYTHONPATH=.. python bench_dispatch.py
+"""
+
+import time
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from phpipampyez import PhpIpamClient
+
+
+BODY = b'{"code":200,"success":true,"data":{"id":"12","ip":"10.0.0.12"}}'
+
+
+class CannedAdapter(BaseAdapter):
+    """ Returns the same response to each request. """
+
+    def send(self, request, **kwargs):
+        res = Response()
+        res.status_code = 200
+        res._content = BODY
+        res.url = request.url
+        res.request = request
+        res.headers['Content-Type'] = 'application/json'
+        return res
+
+    def close(self):
+        pass
+
+
+def per_call(func, calls, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for each in range(calls):
+            func(each)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls
+
+
+def main(calls=2000, repeat=3):
+    client = PhpIpamClient('http://phpipam.bench', 'bench', 'bench', 'bench', skip_login=True)
+    client.api.headers['token'] = 'bench-token'
+    client.api.mount('http://', CannedAdapter())
+
+    session_get = client.api.get
+    addresses = client.addresses
+
+    timings = dict(
+        session=per_call(lambda each: session_get(f'/addresses/{each}/'), calls, repeat),
+        controller=per_call(lambda each: addresses.get(each), calls, repeat),
+        controller_params=per_call(lambda each: addresses.get(each, params={'a': 1}),
+                                   calls, repeat)
+    )
+
+    baseline = timings['session']
+    for name, elapsed in timings.items():
+        print(f'{name:18s} {elapsed * 1e6:8.1f} us/call  {baseline / elapsed:5.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare decoding and indexing a large addresses response in one process, as
+`res.json()` with `create_index`, with `parallel.decode_records` using an
+increasing number of processes.
+
+    cd benchmarks
+    PYTHONPATH=.. python bench_parallel_decode.py [count]
+"""
+
+import os
+import sys
+import json
+import time
+
+from phpipampyez.utils import create_index
+from phpipampyez.records import compact_records
+from phpipampyez.parallel import decode_records
+from addresses import addresses
+
+
+FIELDS = ('id', 'ip', 'hostname', 'subnetId')
+INDEXES = {'id': 'id', 'ip': 'ip', 'host': ('hostname', 'subnetId')}
+
+
+def single(body):
+    items = json.loads(body)['data']
+    records = compact_records(items, FIELDS)
+    return records, {name: create_index(records, key=lambda record, spec=spec:
+                                        getattr(record, spec) if isinstance(spec, str)
+                                        else tuple(getattr(record, each) for each in spec))
+                     for name, spec in INDEXES.items()}
+
+
+def main(count=1_000_000):
+    body = json.dumps({'code': 200, 'success': True, 'data': addresses(count),
+                       'time': 0.1}).encode()
+    print(f'body: {len(body) / 1e6:.1f} MB, {count} addresses')
+
+    start = time.perf_counter()
+    expected, _ = single(body)
+    baseline = time.perf_counter() - start
+    print(f'    single       {baseline:6.2f} s')
+
+    cpus = os.cpu_count() or 1
+    for processes in sorted({1, 2, 4, cpus}):
+        if processes > cpus:
+            continue
+        start = time.perf_counter()
+        records, indexes = decode_records(body, fields=FIELDS, indexes=INDEXES,
+                                          processes=processes)
+        elapsed = time.perf_counter() - start
+        assert records == [tuple(each) for each in expected]
+        print(f'    processes={processes:<3d}{elapsed:6.2f} s  x{baseline / elapsed:.1f}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,70 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure the reconciliation of a large external inventory, written as a CSV
+file, against a phpIPAM inventory of the same size.
+
+    cd benchmarks
+    PYTHONPATH=.. python bench_reconcile.py [rows]
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import tempfile
+
+from phpipampyez.reconcile import Inventory, reconcile, subnet_intervals
+
+
+def timed(name, func):
+    start = time.perf_counter()
+    value = func()
+    print(f'{name:18s} {time.perf_counter() - start:7.2f} s')
+    return value
+
+
+def main(rows=5_000_000, seed=42):
+    rand = random.Random(seed)
+    base = 10 << 24
+
+    ipam_ips = rand.sample(range(base, base + rows * 2), rows)
+    ext_ips = ipam_ips[:rows // 2] + rand.sample(range(base + rows * 2, base + rows * 3), rows // 2)
+
+    addresses = [{'ip': f'{ip >> 24}.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}',
+                  'hostname': f'host-{ip}'} for ip in ipam_ips]
+    subnets = [{'subnet': f'10.{each >> 8}.{each & 255}.0', 'mask': '24'}
+               for each in range(0, (rows * 2) >> 8)]
+
+    path = os.path.join(tempfile.mkdtemp(), 'external.csv')
+    with open(path, 'w', newline='') as ofile:
+        writer = csv.writer(ofile)
+        writer.writerow(['ip', 'hostname'])
+        for idx, ip in enumerate(ext_ips):
+            name = f'host-{ip}' if idx % 100 else f'other-{ip}'
+            writer.writerow([f'{ip >> 24}.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}', name])
+
+    ipam = timed('load ipam', lambda: Inventory.from_addresses(addresses))
+    external = timed('load csv', lambda: Inventory.from_csv(path))
+    intervals = timed('subnet intervals', lambda: subnet_intervals(subnets))
+    found = timed('reconcile', lambda: reconcile(ipam, external, intervals))
+    print(found)
+
+    os.unlink(path)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
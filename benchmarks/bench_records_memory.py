@@ -0,0 +1,65 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the memory used to index addresses by id, ip and hostname using the
+data dicts and `create_index`, to the memory used by the compact records and
+a MultiIndex.
+
+    cd benchmarks
+    PYTHONPATH=.. python bench_records_memory.py [count]
+"""
+
+import sys
+import gc
+import tracemalloc
+
+from phpipampyez.utils import create_index
+from phpipampyez.records import compact_records, MultiIndex
+from addresses import address_dict
+
+
+def with_create_index(count):
+    items = [address_dict(each) for each in range(1, count + 1)]
+    return [create_index(items, key=key) for key in ('id', 'ip', 'hostname')]
+
+
+def with_multi_index(count):
+    items = (address_dict(each) for each in range(1, count + 1))
+    records = compact_records(items, fields=('id', 'ip', 'hostname', 'subnetId'))
+    return MultiIndex(records, id='id', ip='ip', hostname='hostname')
+
+
+def measure(func, count):
+    gc.collect()
+    tracemalloc.start()
+    kept = func(count)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current, peak
+
+
+def main(count=100000):
+    print(f'addresses: {count}')
+    baseline = None
+    for name, func in [('create_index', with_create_index), ('MultiIndex', with_multi_index)]:
+        current, peak = measure(func, count)
+        baseline = baseline or current
+        print(f'    {name:14s} kept {current / 1e6:8.1f} MB  peak {peak / 1e6:8.1f} MB'
+              f'  x{baseline / current:.1f}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,66 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the search results page parsers on large fixture pages.  Each parser
+must return the same results as the "bs4" parser.
+
+    cd benchmarks
+    PYTHONPATH=.. python bench_search_parse.py
+"""
+
+import time
+
+from phpipampyez import search
+from pages import search_page
+
+
+PAGE_SIZES = [
+    dict(subnets=50, addresses=500, vlans=50, vrfs=10, pstn=5, circuits=5),
+    dict(subnets=500, addresses=5000, vlans=500, vrfs=100, pstn=50, circuits=50),
+    dict(subnets=2000, addresses=20000, vlans=2000, vrfs=500, pstn=500, circuits=500)
+]
+
+
+def best_of(func, content, repeat):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(repeat=3):
+    for sizes in PAGE_SIZES:
+        content = search_page(**sizes).encode()
+        expected = search.extract_results(content)
+        print(f'page: {len(content) / 1e6:.2f} MB {sizes}')
+
+        baseline = None
+        for name, func in search.PARSERS.items():
+            try:
+                found = func(content)
+            except RuntimeError as exc:
+                print(f'    {name:8s} skipped: {exc}')
+                continue
+
+            assert found == expected, f'{name} results differ from bs4'
+            elapsed = best_of(func, content, repeat)
+            baseline = baseline or elapsed
+            print(f'    {name:8s} {elapsed * 1e3:10.1f} ms  x{baseline / elapsed:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains a local stand-in for a phpIPAM server, used by the
+benchmarks.  It implements:
+
+    * the REST API login, "/api/{app}/user/"
+    * the REST API controllers, "/api/{app}/{controller}/[{id}/[{child}/]]"; for
+      example "/api/{app}/subnets/3/addresses/".  A request without the current
+      token has a 401 response; see `expire_token`.
+    * the address create, a POST of "/api/{app}/addresses/" with a JSON body;
+      the address is stored, or has a 409 response when the IP address is
+      already used in the subnet.
+    * the address delete, a DELETE of "/api/{app}/addresses/{id}/".  The other
+      writes are accepted, not stored.
+    * the WebUI login, "/app/login/login_check.php"
+    * the WebUI search, "/tools/search/{find}"; the page has the number of
+      results given by the server `search_results` option.  The Cookie header
+      of each search is kept in the server `search_cookies` list.
+
+Each request is delayed by the server `latency` option to model the network
+and PHP backend time.
+
+    server = MockPhpIpamServer(addresses=10000, latency=0.002)
+    server.start()
+    client = PhpIpamClient(server.url, 'bench', 'bench', 'bench')
+    ...
+    server.stop()
+"""
+
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+
+from pages import search_page
+from addresses import address_dict
+
+
+__all__ = ['MockPhpIpamServer']
+
+
+class MockPhpIpamServer(object):
+    """
+    The mock phpIPAM server; the data is created from the given number of each
+    type of item, so the results are the same for each run.
+    """
+
+    def __init__(self, addresses=1000, subnet_size=250, vlans=100, vrfs=10,
+                 sections=2, latency=0.0, search_results=None, app='bench'):
+        """
+        Parameters
+        ----------
+        addresses : int
+            The number of addresses; the addresses are in subnets of
+            `subnet_size` addresses.
+
+        subnet_size : int
+            The number of addresses in each subnet.
+
+        vlans : int
+            The number of VLANs.
+
+        vrfs : int
+            The number of VRFs.
+
+        sections : int
+            The number of sections; the subnets are spread over the sections.
+
+        latency : float
+            The number of seconds each request is delayed.
+
+        search_results : dict (optional)
+            The number of each type of result on the search page, for example
+            dict(addresses=500, subnets=2).  The default is all of the items.
+            Each number is limited to the number of items of that type.
+
+        app : str
+            The API app name.
+        """
+        self.latency = latency
+        self.app = app
+        self.requests = 0
+        self.logins = 0
+        self.token = 'bench-token'
+        self.search_cookies = list()
+        self._lock = threading.Lock()
+
+        subnets = (addresses + subnet_size - 1) // subnet_size
+        self.data = {
+            'sections': [{'id': str(each), 'name': f'Section {each}'}
+                         for each in range(1, sections + 1)],
+            'subnets': [{'id': str(each), 'sectionId': str(each % sections + 1),
+                         'subnet': f'10.{each // 256 % 256}.{each % 256}.0', 'mask': '24',
+                         'masterSubnetId': '0', 'description': f'Subnet {each}',
+                         'editDate': None}
+                        for each in range(1, subnets + 1)],
+            'addresses': [address_dict(each, subnet_id=(each - 1) // subnet_size + 1)
+                          for each in range(1, addresses + 1)],
+            'vlans': [{'id': str(each), 'number': str(each), 'name': f'VLAN {each}'}
+                      for each in range(1, vlans + 1)],
+            'vrfs': [{'id': str(each), 'name': f'VRF {each}'}
+                     for each in range(1, vrfs + 1)]
+        }
+
+        self.index = {name: {item['id']: item for item in items}
+                      for name, items in self.data.items()}
+
+        self.children = {
+            ('sections', 'subnets'): _group_by(self.data['subnets'], 'sectionId'),
+            ('subnets', 'addresses'): _group_by(self.data['addresses'], 'subnetId')
+        }
+
+        # the search results are limited to the items that exist, so that each
+        # result can be expanded.
+
+        counts = dict(subnets=subnets, addresses=addresses, vlans=vlans, vrfs=vrfs)
+        found = {key: min(count, counts[key]) for key, count in (search_results or counts).items()}
+        self.search_page = search_page(**found).encode()
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def expire_token(self):
+        """
+        Make the current token invalid, so that the API responds with a 401 until
+        the client logs in again.
+        """
+        self.token = f'bench-token-{self.logins + 1}'
+
+    # -------------------------------------------------------------------------
+    #                        request handling
+    # -------------------------------------------------------------------------
+
+    def api_get(self, parts):
+        """ Returns the (status, body) of an API GET request. """
+        if not parts or parts[0] not in self.data:
+            return 400, {'code': 400, 'success': False, 'message': 'Invalid controller'}
+
+        controller = parts[0]
+        if len(parts) == 1:
+            return 200, {'code': 200, 'success': True, 'data': self.data[controller]}
+
+        if len(parts) == 2:
+            item = self.index[controller].get(parts[1])
+            if item is None:
+                return 404, {'code': 404, 'success': False, 'message': 'Not found'}
+            return 200, {'code': 200, 'success': True, 'data': item}
+
+        items = self.children.get((controller, parts[2]), {}).get(parts[1])
+        if not items:
+            return 404, {'code': 404, 'success': False, 'message': 'No items found'}
+
+        return 200, {'code': 200, 'success': True, 'data': items}
+
+    def create_address(self, item):
+        """ Returns the (status, body) of an API POST request of an address. """
+        subnet_id = str(item.get('subnetId'))
+        with self._lock:
+            used = self.children[('subnets', 'addresses')].setdefault(subnet_id, [])
+            if any(each['ip'] == item.get('ip') for each in used):
+                return 409, {'code': 409, 'success': False, 'message': 'IP address already exists'}
+
+            new = dict(item, id=str(len(self.data['addresses']) + 1), subnetId=subnet_id)
+            self.data['addresses'].append(new)
+            self.index['addresses'][new['id']] = new
+            used.append(new)
+
+        return 201, {'code': 201, 'success': True, 'id': new['id']}
+
+    def delete_address(self, item_id):
+        """ Returns the (status, body) of an API DELETE request of an address. """
+        with self._lock:
+            item = self.index['addresses'].pop(item_id, None)
+            if item is None:
+                return 404, {'code': 404, 'success': False, 'message': 'Address does not exist'}
+
+            self.data['addresses'].remove(item)
+            self.children[('subnets', 'addresses')][item['subnetId']].remove(item)
+
+        return 200, {'code': 200, 'success': True, 'message': 'Address deleted'}
+
+
+def _group_by(items, key):
+    groups = dict()
+    for item in items:
+        groups.setdefault(item[key], []).append(item)
+    return groups
+
+
+def _make_handler(server):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body, content_type='application/json', headers=()):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def handle_request(self, method):
+            server.requests += 1
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+
+            if server.latency:
+                time.sleep(server.latency)
+
+            path = unquote(urlsplit(self.path).path)
+            api_prefix = f'/api/{server.app}/'
+
+            if path == '/app/login/login_check.php':
+                return self.reply(200, b'OK', 'text/html',
+                                  headers=[('Set-Cookie', 'phpipam=bench-session; Path=/')])
+
+            if path.startswith('/tools/search/'):
+                server.search_cookies.append(self.headers.get('Cookie'))
+                return self.reply(200, server.search_page, 'text/html')
+
+            if not path.startswith(api_prefix):
+                return self.reply(404, b'Not found', 'text/html')
+
+            parts = [each for each in path[len(api_prefix):].split('/') if each]
+
+            if parts == ['user'] and method == 'POST':
+                server.logins += 1
+                return self.reply(200, {'code': 200, 'success': True, 'data': {
+                    'token': server.token, 'expires': '2099-01-01 00:00:00'}})
+
+            if self.headers.get('token') != server.token:
+                return self.reply(401, {'code': 401, 'success': False,
+                                        'message': 'Token expired'})
+
+            if method == 'POST' and parts == ['addresses']:
+                return self.reply(*server.create_address(json.loads(body or b'{}')))
+
+            if method == 'DELETE' and len(parts) == 2 and parts[0] == 'addresses':
+                return self.reply(*server.delete_address(parts[1]))
+
+            if method != 'GET':
+                return self.reply(201, {'code': 201, 'success': True, 'id': '1'})
+
+            self.reply(*server.api_get(parts))
+
+        def do_GET(self):
+            self.handle_request('GET')
+
+        def do_POST(self):
+            self.handle_request('POST')
+
+        def do_PATCH(self):
+            self.handle_request('PATCH')
+
+        def do_DELETE(self):
+            self.handle_request('DELETE')
+
+    return Handler
@@ -0,0 +1,96 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file creates WebUI search results pages, modeled on the phpIPAM markup,
+used as the fixture data for the benchmarks.
+"""
+
+__all__ = ['search_page']
+
+
+def _subnet_rows(subnet_ids):
+    for each in subnet_ids:
+        yield (f'<tr class="subnetSearch" subnetid="{each}" sectionname="Production" '
+               f'link="/subnets/1/{each}/">'
+               f'<td><a href="/subnets/1/{each}/">10.{each // 256 % 256}.{each % 256}.0/24</a></td>'
+               f'<td>Subnet {each} description</td><td>Production</td>'
+               f'<td class="hidden-xs">VLAN {each % 4096}</td></tr>')
+
+
+def _address_rows(address_ids):
+    for each in address_ids:
+        yield (f'<tr class="ipSearch" id="{each}" subnetid="{each // 250}" sectionid="1" '
+               f'link="/subnets/1/{each // 250}/address-details/{each}/">'
+               f'<td><a href="/subnets/1/{each // 250}/address-details/{each}/">'
+               f'10.{each // 65536 % 256}.{each // 256 % 256}.{each % 256}</a></td>'
+               f'<td>host-{each}.example.com</td><td>Address {each} &amp; notes</td>'
+               f'<td><span class="status status-online"></span></td>'
+               f'<td class="actions"><div class="btn-group">'
+               f'<a class="btn btn-xs btn-default modIPaddr" data-action="edit" data-id="{each}">'
+               f'<i class="fa fa-pencil"></i></a></div></td></tr>')
+
+
+def _table_rows(ids, attr):
+    for each in ids:
+        yield (f'<tr><td><dd>Item {each}</dd></td><td>Description of {each}</td>'
+               f'<td class="actions"><div class="btn-group">'
+               f'<a class="btn btn-xs btn-default" data-action="edit" {attr}="{each}">'
+               f'<i class="fa fa-pencil"></i></a>'
+               f'<a class="btn btn-xs btn-default" data-action="delete" {attr}="{each}">'
+               f'<i class="fa fa-times"></i></a></div></td></tr>')
+
+
+def _section(title, rows):
+    return (f'<h4>{title}</h4><hr>'
+            f'<table class="searchTable table table-striped table-condensed table-top">'
+            f'<tbody>{"".join(rows)}</tbody></table>')
+
+
+def search_page(subnets=0, addresses=0, vlans=0, vrfs=0, pstn=0, circuits=0):
+    """
+    Returns a search results page with the given number of each type of result.
+    The ID values of each type of result are 1 through the number of results.
+
+    Returns
+    -------
+    str
+        The HTML page text.
+    """
+    sections = list()
+
+    if subnets:
+        sections.append(_section('Search results (Subnet list):',
+                                 _subnet_rows(range(1, subnets + 1))))
+    if addresses:
+        sections.append(_section('Search results (IP address list):',
+                                 _address_rows(range(1, addresses + 1))))
+    if vlans:
+        sections.append(_section('Search results (VLANs):',
+                                 _table_rows(range(1, vlans + 1), 'data-vlanid')))
+    if vrfs:
+        sections.append(_section('Search results (VRFs):',
+                                 _table_rows(range(1, vrfs + 1), 'data-vrfid')))
+    if pstn:
+        sections.append(_section('Search results (PSTN):',
+                                 _table_rows(range(1, pstn + 1), 'data-prefixid')))
+    if circuits:
+        sections.append(_section('Search results (Circuits):',
+                                 _table_rows(range(1, circuits + 1), 'data-circuitid')))
+
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>phpIPAM</title>'
+            '<link rel="stylesheet" href="/css/bootstrap.min.css"></head><body>'
+            '<div class="wrapper"><div class="content"><div id="searchResults">'
+            f'{"".join(sections)}'
+            '</div></div></div></body></html>')
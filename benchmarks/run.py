@@ -0,0 +1,162 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Run the client benchmarks against the local mock phpIPAM server, and write the
+results as JSON so that runs can be compared:
+
+    cd benchmarks
+    PYTHONPATH=.. python run.py --addresses 20000 --latency 0.002 --output results.json
+
+The benchmarks are:
+
+    expand_ids      - expand_ids of a random sample of address IDs
+    search          - search, without expand
+    search_expand   - search with expand
+    create_index    - create_index of all of the addresses, by ip and hostname
+    dispatch        - the client overhead of a controller GET, measured with
+                      the server latency set to zero
+
+The sample of IDs is taken with the `--seed` value, so each run uses the same
+requests.
+"""
+
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+from datetime import datetime
+
+from phpipampyez import PhpIpamClient
+from phpipampyez.utils import expand_ids, create_index
+from mockserver import MockPhpIpamServer
+
+
+def timed(func, repeat):
+    """
+    Returns the timing stats, in seconds, of calling `func` `repeat` times.
+    """
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    return dict(min=timings[0], median=timings[len(timings) // 2], max=timings[-1],
+                repeat=repeat)
+
+
+def bench_expand_ids(client, server, options):
+    rand = random.Random(options.seed)
+    ids = rand.sample(range(1, options.addresses + 1), min(options.expand, options.addresses))
+    result = timed(lambda: expand_ids(client.addresses, ids, max_workers=options.workers),
+                   options.repeat)
+    return dict(result, items=len(ids))
+
+
+def bench_search(client, server, options):
+    result = timed(lambda: client.search('10.0', parser=options.parser), options.repeat)
+    return dict(result, page_bytes=len(server.search_page))
+
+
+def bench_search_expand(client, server, options):
+    result = timed(lambda: client.search('10.0', expand=True, parser=options.parser,
+                                         max_workers=options.workers),
+                   options.repeat)
+    return dict(result, page_bytes=len(server.search_page))
+
+
+def bench_create_index(client, server, options):
+    addresses = client.addresses.get().json()['data']
+    result = timed(lambda: (create_index(addresses, key='ip'),
+                            create_index(addresses, key=('hostname', 'subnetId'))),
+                   options.repeat)
+    return dict(result, items=len(addresses))
+
+
+def bench_dispatch(client, server, options):
+    latency, server.latency = server.latency, 0.0
+    try:
+        count = options.dispatch
+        result = timed(lambda: [client.vrfs.get(f'{each % 10 + 1}') for each in range(count)],
+                       options.repeat)
+    finally:
+        server.latency = latency
+
+    return dict(result, calls=count, per_call=result['min'] / count)
+
+
+BENCHMARKS = {
+    'expand_ids': bench_expand_ids,
+    'search': bench_search,
+    'search_expand': bench_search_expand,
+    'create_index': bench_create_index,
+    'dispatch': bench_dispatch
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='phpipampyez client benchmarks')
+    parser.add_argument('--addresses', type=int, default=5000)
+    parser.add_argument('--search-addresses', type=int, default=500,
+                        help='the number of address results on the search page')
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='the mock server delay of each request, in seconds')
+    parser.add_argument('--expand', type=int, default=500,
+                        help='the number of IDs given to expand_ids')
+    parser.add_argument('--dispatch', type=int, default=1000,
+                        help='the number of controller calls of the dispatch benchmark')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--parser', default='bs4')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS))
+    parser.add_argument('--output', help='the JSON results file; default is stdout')
+    options = parser.parse_args(argv)
+
+    search_results = dict(subnets=20, addresses=options.search_addresses, vlans=20, vrfs=5)
+    server = MockPhpIpamServer(addresses=options.addresses, latency=options.latency,
+                               search_results=search_results)
+
+    results = dict()
+    with server:
+        client = PhpIpamClient(server.url, 'bench', 'bench', 'bench',
+                               pool_maxsize=max(10, options.workers or 0))
+
+        for name in options.only or BENCHMARKS:
+            requests = server.requests
+            results[name] = BENCHMARKS[name](client, server, options)
+            results[name]['requests'] = server.requests - requests
+            print(f'{name:14s} min {results[name]["min"] * 1e3:9.1f} ms', file=sys.stderr)
+
+    report = dict(
+        date=datetime.now().isoformat(timespec='seconds'),
+        python=platform.python_version(),
+        options=vars(options),
+        results=results
+    )
+
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, 'w') as ofile:
+            ofile.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the asyncio version of the phpIPAM client.  It provides the
+same controller API as the PhpIpamClient; but each API method is a coroutine.
+
+This module requires the `httpx` package, which can be installed using the
+"async" extra:
+
+    pip install phpipam-pyez[async]
+"""
+
+import asyncio
+from http import HTTPStatus
+from functools import wraps
+
+import httpx
+
+from phpipampyez import search as _search
+
+
+__all__ = [
+    'AsyncPhpIpamClient',
+    'expand_ids'
+]
+
+
+class AsyncPhpIpamClient(object):
+    """
+    Python asyncio client to access phpIPAM system.  All API calls, including
+    the WebUI search calls, share a single pool of HTTP connections.
+
+    Examples
+    --------
+        async with AsyncPhpIpamClient(host, user, password, app) as client:
+            res = await client.devices.get()
+            res.raise_for_status()
+
+            results = await client.search("10.113.29", expand=True)
+    """
+
+    def __init__(self, host, user, password, app, max_connections=100, timeout=30.0):
+        """
+        Create as new client.  The login is performed when the client is used as
+        an async context manager, or when the caller awaits the `login` method.
+
+        Parameters
+        ----------
+        host : str
+            The host URL to the phpIPAM server, for example "http://my-phpIPAM:8080"
+
+        user : str
+            The login user-name
+
+        password : str
+            The login password
+
+        app : str
+            The login application name.  An API app *MUST* be defined within
+            the phpIPAM system to access the API.
+
+        max_connections : int (optional)
+            The maximum number of HTTP connections in the pool.
+
+        timeout : float (optional)
+            The HTTP timeout, in seconds.
+        """
+        self.phpipam_host = host
+        self.phpipam_app = app
+        self.phpipam_url = f'{host}/api/{app}'
+        self.user = user
+        self.password = password
+
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections)
+
+        self.api = httpx.AsyncClient(base_url=self.phpipam_url, limits=limits,
+                                     timeout=timeout)
+        self._login_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.login()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """ Close the HTTP connection pool. """
+        await self.api.aclose()
+
+    async def login(self, user=None, password=None):
+        """
+        Login to the phpIPAM system, both the REST API and the WebUI.  If the API
+        later responds with a 401, the client will login to the REST API again
+        and retry the request.
+
+        Parameters
+        ----------
+        user : str (optional) - the login user-name, when not the one given at init
+        password : str (optional) - the login password, when not the one given at init
+
+        Raises
+        ------
+        HTTPStatusError - any HTTP response error
+        """
+        self.user = user = user or self.user
+        self.password = password = password or self.password
+
+        await self._login_api()
+
+        # ---------------------------------------
+        # WebUI login
+        # ---------------------------------------
+
+        # the WebUI session cookies are stored in the same client so that the
+        # search feature uses the same connection pool as the API.
+
+        webui_login = self.phpipam_host + '/app/login/login_check.php'
+        res = await self.api.post(webui_login, data=dict(ipamusername=user,
+                                                         ipampassword=password))
+        res.raise_for_status()
+
+    async def _login_api(self):
+        """ REST API login, storing the new token in the `api` headers. """
+        res = await self.api.post("/user/", auth=(self.user, self.password))
+        res.raise_for_status()
+        self.api.headers['token'] = res.json()['data']['token']
+
+    async def _renew_token(self, old_token):
+        """
+        Called by the controllers when the API responds with a 401.  Only one
+        coroutine logs in again; the others wait for the new token.
+        """
+        async with self._login_lock:
+            # another coroutine may have already renewed the token.
+            if self.api.headers.get('token') == old_token:
+                await self._login_api()
+
+    async def _request(self, api_func, url, **kwargs):
+        """ Call the API method, and retry once with a new token on a 401. """
+        res = await api_func(url, **kwargs)
+
+        if res.status_code == HTTPStatus.UNAUTHORIZED and 'token' in res.request.headers:
+            await self._renew_token(res.request.headers['token'])
+            res = await api_func(url, **kwargs)
+
+        return res
+
+    def __getattr__(self, item):
+        """
+        Returns API controller instance.  See the same method defined in the
+        PhpIpamClient class.
+
+        Examples
+        --------
+            res = await client.devices.get(...)
+
+        Parameters
+        ----------
+        item : str
+            The name of the controller, for example "devices".
+
+        Returns
+        -------
+        _AsyncPhpIpamController instance
+        """
+        if item in self.__dict__:
+            return self.__dict__[item]
+
+        new_sec = _AsyncPhpIpamController(self, section_url=f"/{item}/")
+        setattr(self, item, new_sec)
+        return new_sec
+
+    async def search(self, find, expand=False, max_concurrency=None, parser='bs4',
+                     **search_options):
+        """
+        Perform the same search as found in the WebUI.  See the same method
+        defined in the PhpIpamClient class.
+
+        Parameters
+        ----------
+        find : str
+            The string expression used for search purpose.
+
+        expand : bool
+            When True, this function will use the IDs to obtain the full data dict
+            for each item.
+
+        max_concurrency : int (optional)
+            When `expand` is True, the maximum number of concurrent API calls
+            used to expand each type of result.  See `expand_ids`.
+
+        parser : str (optional)
+            The name of the HTML parser used for the search results page; one of
+            `search.PARSERS`.
+
+        Returns
+        -------
+        dict[list]
+            Keys are defined by `search.SEARCH_OPTIONS`.  Each key contains a
+            list of items; either just the IDs or a list[dict] depending on the
+            `expand` parameter.
+        """
+        search_url = self.phpipam_host + f'/tools/search/{find}'
+
+        # the search options cookie is sent with this request only, rather than
+        # stored in the shared cookie jar, so that concurrent searches can use
+        # different search options.
+
+        request = self.api.build_request('GET', search_url)
+        cookie = f'search_parameters={_search.search_parameters(search_options)}'
+        request.headers['Cookie'] = '; '.join(filter(None, (request.headers.get('Cookie'), cookie)))
+
+        res = await self.api.send(request)
+        res.raise_for_status()
+        results = _search.extract_results(res.content, parser=parser)
+
+        if not expand:
+            return results
+
+        # expand each type of result at the same time.
+
+        keys = list(_search.RESULT_CONTROLLERS)
+        expanded = await asyncio.gather(*(
+            expand_ids(getattr(self, _search.RESULT_CONTROLLERS[key]), results[key],
+                       max_concurrency=max_concurrency)
+            for key in keys
+        ))
+
+        results.update(zip(keys, expanded))
+        return results
+
+
+async def expand_ids(controller, list_of_ids, max_concurrency=None, errors=None):
+    """
+    This function is the asyncio version of `utils.expand_ids`.  All of the
+    items are fetched concurrently, but no more than `max_concurrency` at a time
+    when provided.  The list of dicts is returned in the same order as
+    `list_of_ids`.
+
+    Parameters
+    ----------
+    controller : AsyncPhpIpamClient controller instance
+        The controller instance that will provide the 'get' method
+        used to fetch the item data from the API.
+
+    list_of_ids : list[str]
+        The list of ID values.
+
+    max_concurrency : int (optional)
+        The maximum number of concurrent API calls.
+
+    errors : list (optional)
+        When provided, failed API calls do not raise an exception.  Instead a
+        tuple of (ID, Response object) is appended to this list for each failure
+        and the processing continues with the next ID.
+
+    Returns
+    -------
+    list[dict]
+        The list of dict items fetched from the API.
+
+    Raises
+    ------
+    RuntimeError
+        When the API returns an HTTP 400 response code.  The args included in the
+        exception will be:
+            args[0] = str: message
+            args[1] = list[dict] of items that were processed ok
+            args[2] = ID of failed API call
+            args[3] = Response object of failed API call
+    """
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def fetch(item_id):
+        if semaphore is None:
+            return await controller.get(item_id)
+
+        async with semaphore:
+            return await controller.get(item_id)
+
+    tasks = [asyncio.ensure_future(fetch(each)) for each in list_of_ids]
+    found_list = list()
+
+    try:
+        for each, task in zip(list_of_ids, tasks):
+            res = await task
+
+            if errors is not None and res.is_error:
+                errors.append((each, res))
+                continue
+
+            if res.status_code == HTTPStatus.BAD_REQUEST:
+                raise RuntimeError(f'ERROR processing ID {each}: {res.text}',
+                                   found_list, each, res)
+
+            res.raise_for_status()
+            found_list.append(res.json()['data'])
+
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    return found_list
+
+
+# -----------------------------------------------------------------------------
+#                Internal class definitions used by AsyncPhpIpamClient
+# -----------------------------------------------------------------------------
+
+class _AsyncPhpIpamController(object):
+    """
+    Used to access a phpIpam 'controller'.  See the _PhpIpamController class
+    for details.
+    """
+
+    def __init__(self, client, section_url):
+        self.url = section_url
+        self.client = client
+        self.api = client.api
+
+    def __repr__(self):
+        return f'phpIPAM controller API url: {self.url}'
+
+    def __getattr__(self, item):
+        """
+        Returns either a sub-section controller, when the item starts with an
+        underscore (_), or the coroutine function that calls the API method.
+        See the _PhpIpamController class for details.
+        """
+        if item.startswith('_'):
+            subsect_name = item[1:]
+            if item in self.__dict__:
+                return self.__dict__[item]
+
+            subsec = _AsyncPhpIpamController(client=self.client, section_url=self.url + f"{subsect_name}/")
+            setattr(self, item, subsec)
+            return subsec
+
+        api_func = getattr(self.api, item)
+
+        @wraps(api_func)
+        async def decorate(url='', **kwargs):
+            return await self.client._request(api_func, f"{self.url}{url}/", **kwargs)
+
+        return decorate
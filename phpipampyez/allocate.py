@@ -0,0 +1,323 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the local allocation of free addresses and subnets.  The
+used addresses of a subnet are loaded once, so that any number of free
+addresses are found without the repeated "first_free" API calls:
+
+    allocator = SubnetAllocator(client, subnet_id, exclude=['10.1.2.200-10.1.2.254'])
+    results = allocator.allocate(200, description='rack 12')
+
+    blocks = free_blocks(client, supernet_id, prefix_length=26, count=4)
+"""
+
+import ipaddress
+from http import HTTPStatus
+from bisect import bisect_right
+
+from phpipampyez.utils import ip_to_int, int_to_ip, fetch_collections
+from phpipampyez.bulk import bulk_create
+
+
+__all__ = [
+    'SubnetAllocator',
+    'free_blocks'
+]
+
+
+class SubnetAllocator(object):
+    """
+    Allocates the free addresses of a subnet.  The addresses used, the gateway,
+    and the `exclude` ranges are kept as a sorted list of merged intervals; for
+    an IPv4 subnet the network and broadcast addresses are never allocated.
+    """
+
+    def __init__(self, client, subnet_id, exclude=()):
+        """
+        Parameters
+        ----------
+        client : PhpIpamClient
+
+        subnet_id : str|int
+            The ID of the subnet.
+
+        exclude : iterable
+            The addresses that are never allocated, such as the DHCP ranges.  Each
+            value is an address "10.1.2.3", a range "10.1.2.100-10.1.2.199", or a
+            network "10.1.2.128/27".
+        """
+        self.client = client
+        self.subnet_id = str(subnet_id)
+        self.subnet = _get_data(client.subnets, self.subnet_id)
+
+        self.network = ipaddress.ip_network(f"{self.subnet['subnet']}/{self.subnet['mask']}")
+        self.exclude = [_parse_range(each) for each in exclude]
+        self.used = list()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reload the addresses used by the subnet; raises requests.HTTPError when
+        the addresses cannot be fetched.
+        """
+        addresses = fetch_collections([self._addresses])
+        gateway = (self.subnet.get('gateway') or {}).get('ip_addr')
+
+        used = [(value, value) for value in
+                (ip_to_int(each.get('ip')) for each in addresses)
+                if value is not None]
+
+        if gateway:
+            used.append((ip_to_int(gateway),) * 2)
+
+        used.extend(self.exclude)
+        used.extend(self._unusable())
+        self.used = _merge(used)
+
+    def mark_used(self, addresses):
+        """ Mark the addresses, strings or integers, as used. """
+        values = [each if isinstance(each, int) else ip_to_int(each) for each in addresses]
+        self.used = _merge(self.used + [(value, value) for value in values])
+
+    def is_free(self, address):
+        value = address if isinstance(address, int) else ip_to_int(address)
+        if value not in _span(self.network):
+            return False
+
+        idx = bisect_right(self.used, (value, float('inf'))) - 1
+        return idx < 0 or self.used[idx][1] < value
+
+    def free(self, count=None):
+        """
+        Returns the first `count` free addresses of the subnet, lowest first; or
+        all of the free addresses when `count` is None.
+
+        Returns
+        -------
+        list[str]
+        """
+        span = _span(self.network)
+        found = list()
+
+        for start, end in _gaps(self.used, span[0], span[-1]):
+            stop = end + 1 if count is None else min(end + 1, start + count - len(found))
+            found.extend(range(start, stop))
+            if count is not None and len(found) >= count:
+                break
+
+        return [int_to_ip(value, self.network.version) for value in found]
+
+    def allocate(self, count, max_workers=8, retries=3, **fields):
+        """
+        Reserve `count` free addresses, creating the address items with bulk
+        API calls.  An address that was taken by someone else since the used
+        addresses were loaded is reported by phpIPAM as a conflict; the used
+        addresses are then reloaded and a replacement is allocated, up to
+        `retries` times.
+
+        Parameters
+        ----------
+        count : int
+            The number of addresses.
+
+        max_workers : int
+            The maximum number of concurrent API calls.
+
+        retries : int
+            The number of times the conflicting addresses are replaced.
+
+        Other Parameters
+        ----------------
+        The other values of each address item, for example `description` or
+        `tag`.
+
+        Returns
+        -------
+        list[BulkResult]
+            The results of the created addresses, and of any failures other than
+            conflicts.  When there are not enough free addresses, fewer than
+            `count` results are returned.
+        """
+        results = list()
+
+        for attempt in range(retries + 1):
+            wanted = count - len(results)
+            addresses = self.free(wanted)
+            if not addresses:
+                break
+
+            self.mark_used(addresses)
+            items = [dict(fields, subnetId=self.subnet_id, ip=ip) for ip in addresses]
+            created = bulk_create(self.client.addresses, items, max_workers=max_workers)
+
+            conflicts = [each for each in created if _is_conflict(each)]
+            results.extend(each for each in created if not _is_conflict(each))
+
+            if not conflicts:
+                break
+
+            if attempt < retries:
+                self.refresh()
+                self.mark_used(each.item['ip'] for each in results)
+            else:
+                results.extend(conflicts)
+
+        return results
+
+    # -------------------------------------------------------------------------
+    #                        internal methods
+    # -------------------------------------------------------------------------
+
+    @property
+    def _addresses(self):
+        return getattr(self.client.subnets, f'_{self.subnet_id}')._addresses
+
+    def _unusable(self):
+        """ Returns the network and broadcast address intervals. """
+        span = _span(self.network)
+        first, last = span[0], span[-1]
+        if self.network.version == 4 and self.network.prefixlen < 31:
+            return [(first, first), (last, last)]
+
+        if self.network.version == 6 and self.network.prefixlen < 127:
+            return [(first, first)]
+
+        return []
+
+
+def free_blocks(client, supernet_id, prefix_length, count=None):
+    """
+    Returns the free subnets of a given size within a supernet.  The child
+    subnets of the supernet, "/subnets/{id}/slaves/", and the addresses of the
+    supernet itself are not free.
+
+    Parameters
+    ----------
+    client : PhpIpamClient
+
+    supernet_id : str|int
+        The ID of the supernet.
+
+    prefix_length : int
+        The size of the blocks, for example 26.
+
+    count : int (optional)
+        The maximum number of blocks; by default all of the free blocks.
+
+    Returns
+    -------
+    list[str]
+        The free blocks, lowest first; for example ['10.1.0.64/26', '10.1.1.0/26']
+
+    Raises
+    ------
+    requests.HTTPError
+        When the child subnets or addresses cannot be fetched; an unknown block
+        is never reported free.
+    """
+    supernet = _get_data(client.subnets, supernet_id)
+    network = ipaddress.ip_network(f"{supernet['subnet']}/{supernet['mask']}")
+
+    if prefix_length < network.prefixlen or prefix_length > network.max_prefixlen:
+        raise ValueError(f'prefix length {prefix_length} is not within {network}')
+
+    controller = getattr(client.subnets, f'_{supernet_id}')
+    used = list()
+
+    for each in fetch_collections([controller._slaves]):
+        child = ipaddress.ip_network(f"{each['subnet']}/{each['mask']}", strict=False)
+        used.append((int(child.network_address), int(child.broadcast_address)))
+
+    for each in fetch_collections([controller._addresses]):
+        value = ip_to_int(each.get('ip'))
+        if value is not None:
+            used.append((value, value))
+
+    span = _span(network)
+    size = 1 << (network.max_prefixlen - prefix_length)
+    found = list()
+
+    for start, end in _gaps(_merge(used), span[0], span[-1]):
+        block = -(-start // size) * size
+        while block + size - 1 <= end:
+            found.append(f'{int_to_ip(block, network.version)}/{prefix_length}')
+            if count is not None and len(found) >= count:
+                return found
+            block += size
+
+    return found
+
+
+# -----------------------------------------------------------------------------
+#                Internal definitions used by the allocator
+# -----------------------------------------------------------------------------
+
+def _get_data(controller, item_id):
+    res = controller.get(item_id)
+    res.raise_for_status()
+    return res.json()['data']
+
+
+def _span(network):
+    """ Returns the range of integer values of the network. """
+    return range(int(network.network_address), int(network.broadcast_address) + 1)
+
+
+def _parse_range(value):
+    """ Returns the (first, last) integer values of an exclude value. """
+    if '/' in value:
+        network = ipaddress.ip_network(value, strict=False)
+        return int(network.network_address), int(network.broadcast_address)
+
+    first, _, last = value.partition('-')
+    return ip_to_int(first.strip()), ip_to_int((last or first).strip())
+
+
+def _merge(intervals):
+    """ Returns the sorted list of the merged (first, last) intervals. """
+    merged = list()
+    for first, last in sorted(intervals):
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+
+    return merged
+
+
+def _gaps(merged, first, last):
+    """ Yields the (start, end) intervals between first and last not in merged. """
+    start = first
+    for used_first, used_last in merged:
+        if used_last < start:
+            continue
+        if used_first > last:
+            break
+        if used_first > start:
+            yield start, used_first - 1
+        start = used_last + 1
+
+    if start <= last:
+        yield start, last
+
+
+def _is_conflict(result):
+    """ Returns True when the create failed because the address is in use. """
+    if result.ok or result.response is None:
+        return False
+
+    return (result.response.status_code == HTTPStatus.CONFLICT
+            or 'exists' in (result.error or '').lower())
@@ -0,0 +1,214 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the bulk write functions, used to create, update or delete
+many items of a controller with concurrent API calls:
+
+    results = bulk_create(client.addresses, list_of_dict, max_workers=16)
+    failed = [each for each in results if not each.ok]
+
+Each function returns a BulkResult for each item, in the order given, rather
+than raising an exception on the first failure.  For the throughput to scale
+with `max_workers` the client connection pool must be at least as large; see
+`PhpIpamClient.configure_transport`.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+__all__ = [
+    'BulkResult',
+    'bulk_create',
+    'bulk_update',
+    'bulk_delete'
+]
+
+
+BulkResult = namedtuple('BulkResult', ['item', 'id', 'ok', 'response', 'error'])
+BulkResult.__doc__ = """
+The result of one item of a bulk write.
+
+    item - the item given; the dict, for create and update, or the ID for delete
+    id - the ID of the item; for create, the ID assigned by phpIPAM
+    ok - True when the API call was successful
+    response - the Request response object, or None when there is no response
+    error - None when ok, otherwise the error message
+"""
+
+
+def bulk_create(controller, items, max_workers=8, compensate=False):
+    """
+    Create each of the items, using the controller POST method.
+
+    Parameters
+    ----------
+    controller : _PhpIpamController
+        For example `client.addresses`.
+
+    items : iterable[dict]
+        The items to create.
+
+    max_workers : int
+        The maximum number of concurrent API calls.
+
+    compensate : bool
+        When True, the first failure stops the remaining creates, and the items
+        that were created are deleted; the results of these items have the
+        error "compensated".  The remaining items have the error "cancelled".
+
+    Returns
+    -------
+    list[BulkResult]
+    """
+    def create(item):
+        return _api_call(item, None, lambda: controller.post(json=item))
+
+    results = _run(create, list(items), max_workers, stop_on_error=compensate)
+
+    if compensate and not all(result.ok for result in results):
+        created = [result for result in results if result.ok and result.id is not None]
+        deleted = bulk_delete(controller, [result.id for result in created],
+                              max_workers=max_workers)
+
+        undone = {result.item for result in deleted if result.ok}
+        results = [result._replace(ok=False, error='compensated')
+                   if result.ok and result.id in undone else result
+                   for result in results]
+
+    return results
+
+
+def bulk_update(controller, items, max_workers=8, key='id'):
+    """
+    Update each of the items, using the controller PATCH method.  The `key`
+    value of each item is the ID of the item to update; the other values are
+    the changes.
+
+    Parameters
+    ----------
+    controller : _PhpIpamController
+        For example `client.addresses`.
+
+    items : iterable[dict]
+        The changes to each item, including the `key` value.
+
+    max_workers : int
+        The maximum number of concurrent API calls.
+
+    key : str
+        The name of the ID value.
+
+    Returns
+    -------
+    list[BulkResult]
+    """
+    def update(item):
+        item_id = item.get(key)
+        changes = {name: value for name, value in item.items() if name != key}
+        return _api_call(item, item_id, lambda: controller.patch(item[key], json=changes))
+
+    return _run(update, list(items), max_workers)
+
+
+def bulk_delete(controller, ids, max_workers=8):
+    """
+    Delete each of the items, using the controller DELETE method.
+
+    Parameters
+    ----------
+    controller : _PhpIpamController
+        For example `client.addresses`.
+
+    ids : iterable
+        The IDs of the items to delete.
+
+    max_workers : int
+        The maximum number of concurrent API calls.
+
+    Returns
+    -------
+    list[BulkResult]
+    """
+    def delete(item_id):
+        return _api_call(item_id, item_id, lambda: controller.delete(item_id))
+
+    return _run(delete, list(ids), max_workers)
+
+
+# -----------------------------------------------------------------------------
+#                Internal definitions used by the bulk functions
+# -----------------------------------------------------------------------------
+
+def _api_call(item, item_id, call):
+    """
+    Make the API call and return the BulkResult of the item.  The ID of a
+    created item is taken from the response.  Any exception, such as a value
+    that cannot be sent as JSON, is the error of this item only.
+    """
+    try:
+        res = call()
+    except Exception as exc:
+        return BulkResult(item, item_id, False, None, str(exc) or repr(exc))
+
+    if not res.ok:
+        try:
+            message = res.json().get('message')
+        except ValueError:
+            message = None
+        return BulkResult(item, item_id, False, res, message or f'HTTP {res.status_code}')
+
+    if item_id is None:
+        try:
+            item_id = res.json().get('id')
+        except ValueError:
+            pass
+
+    return BulkResult(item, item_id, True, res, None)
+
+
+def _run(func, items, max_workers, stop_on_error=False):
+    """
+    Call `func` for each of the items and return the results in the order of
+    the items.  When `stop_on_error` is True, the items that have not been
+    started when a call fails are not processed.
+    """
+    if not max_workers or max_workers == 1:
+        results = list()
+        for item in items:
+            result = func(item)
+            results.append(result)
+            if stop_on_error and not result.ok:
+                break
+
+        return results + [_cancelled(item) for item in items[len(results):]]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, item) for item in items]
+
+        if stop_on_error:
+            for fut in futures:
+                if not fut.cancelled() and not fut.result().ok:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+        return [_cancelled(item) if fut.cancelled() else fut.result()
+                for item, fut in zip(items, futures)]
+
+
+def _cancelled(item):
+    return BulkResult(item, item if not isinstance(item, dict) else None, False, None,
+                      'cancelled')
@@ -0,0 +1,383 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the caches used by the PhpIpamClient.  The caches are
+opt-in; for example to cache the controller GET responses:
+
+    client.cache = ResponseCache(ttl=60, controller_ttl={'sections': 600})
+
+or to share the response of identical GET calls that are in-flight at the same
+time:
+
+    client.coalescer = RequestCoalescer()
+"""
+
+import os
+import copy
+import json
+import time
+from datetime import datetime
+from threading import RLock, Lock, Event
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+
+__all__ = [
+    'TTLCache',
+    'ResponseCache',
+    'RequestCoalescer',
+    'TokenCache'
+]
+
+
+class TTLCache(object):
+    """
+    A thread-safe cache where each entry expires after a time-to-live, and the
+    least recently used entries are evicted when the cache is full.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024):
+        """
+        Parameters
+        ----------
+        ttl : float
+            The default number of seconds an entry remains valid.
+
+        max_entries : int
+            The maximum number of entries; the least recently used entry is
+            evicted when this limit is exceeded.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for `key`, or `default` if the key is not
+        cached or the entry has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl=None):
+        """
+        Store the `value` for `key`.  The entry expires after `ttl` seconds, by
+        default the cache `ttl` value.
+        """
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate):
+        """
+        Remove each entry whose key matches the `predicate` function.
+
+        Returns
+        -------
+        int
+            The number of entries removed.
+        """
+        with self._lock:
+            found = [key for key in self._entries if predicate(key)]
+            for key in found:
+                del self._entries[key]
+
+            self.invalidations += len(found)
+            return len(found)
+
+    def clear(self):
+        """ Remove all entries; the counters are not reset. """
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        """
+        Returns
+        -------
+        dict
+            The cache counters and the current number of entries.
+        """
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                    expirations=self.expirations, invalidations=self.invalidations,
+                    entries=len(self._entries))
+
+
+class ResponseCache(TTLCache):
+    """
+    Caches the responses of the controller GET calls, keyed by the controller URL
+    and the request params.  A POST, PUT, PATCH or DELETE call on a controller
+    URL invalidates the cached entries of that URL, the URLs below it, and its
+    parent URLs.  For example a PATCH on "/addresses/12/" invalidates both
+    "/addresses/12/" and "/addresses/".
+
+    As with the RequestCoalescer, each caller is given its own copy of the
+    response object, so a caller that changes the response, for example its
+    `encoding`, does not change the cached response.
+    """
+
+    # the requests methods that change the phpIPAM data.
+
+    WRITE_METHODS = ('post', 'put', 'patch', 'delete')
+
+    def __init__(self, ttl=60, max_entries=1024, controller_ttl=None):
+        """
+        Parameters
+        ----------
+        ttl : float
+            The default number of seconds a response remains valid.
+
+        max_entries : int
+            The maximum number of cached responses.
+
+        controller_ttl : dict (optional)
+            The TTL value for specific controllers, keyed by the controller name;
+            for example {'sections': 600, 'addresses': 10}
+        """
+        super(ResponseCache, self).__init__(ttl=ttl, max_entries=max_entries)
+        self.controller_ttl = controller_ttl or dict()
+
+    @staticmethod
+    def make_key(url, kwargs):
+        """
+        Returns the cache key for a GET call, or None if the call cannot be
+        cached; that is when any requests option other than `params` is used.
+        """
+        if set(kwargs) - {'params'}:
+            return None
+
+        params = kwargs.get('params') or ()
+        if isinstance(params, dict):
+            params = sorted(params.items())
+
+        return url, urlencode(params, doseq=True)
+
+    def ttl_for(self, url):
+        """ Returns the TTL value for the controller of the given `url`. """
+        return self.controller_ttl.get(url.split('/')[1], self.ttl)
+
+    def invalidate_path(self, url):
+        """
+        Remove the cached responses for `url`, the URLs below it, and its parent
+        URLs.
+        """
+        # the controller calls without an ID produce URLs such as "/sections//",
+        # so the empty path segments are removed before comparing the URLs.
+
+        url = _normpath(url.split('?')[0])
+        return self.invalidate(lambda key: (_normpath(key[0]).startswith(url) or
+                                            url.startswith(_normpath(key[0]))))
+
+    def request(self, method, api_func, url, **kwargs):
+        """
+        Invoke the API method `api_func` on behalf of a controller, using the
+        cache as described by the class.
+        """
+        if method in self.WRITE_METHODS:
+            try:
+                return api_func(url, **kwargs)
+            finally:
+                self.invalidate_path(url)
+
+        key = self.make_key(url, kwargs) if method == 'get' else None
+        if key is None:
+            return api_func(url, **kwargs)
+
+        res = self.get(key)
+        if res is not None:
+            return copy.copy(res)
+
+        res = api_func(url, **kwargs)
+        if res.ok:
+            self.put(key, copy.copy(res), ttl=self.ttl_for(url))
+
+        return res
+
+
+class RequestCoalescer(object):
+    """
+    Coalesces the identical controller GET calls that are in-flight at the same
+    time: the first caller sends the request, and the other callers wait for
+    its response rather than sending the same request.  Each caller is given
+    its own copy of the response object, so `res.json()` returns a separate
+    decoded result for each caller.  Unlike the ResponseCache, no response is
+    kept once the request completes.
+
+        client.coalescer = RequestCoalescer()
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.coalesced = 0
+        self._flights = dict()
+        self._lock = Lock()
+
+    def request(self, api_func, url, **kwargs):
+        """
+        Invoke the GET method `api_func` on behalf of a controller, coalesced as
+        described by the class.  The calls that cannot be cached by the
+        ResponseCache, for example those using `stream`, are not coalesced.
+        """
+        key = ResponseCache.make_key(url, kwargs)
+        if key is None:
+            return api_func(url, **kwargs)
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.requests += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                flight.response = api_func(url, **kwargs)
+                return flight.response
+
+            except BaseException as exc:
+                flight.error = exc
+                raise
+
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+
+        return copy.copy(flight.response)
+
+    @property
+    def stats(self):
+        """
+        Returns
+        -------
+        dict
+            The number of requests sent, the number of calls that were given the
+            response of an in-flight request, and the number of requests
+            currently in-flight.
+        """
+        return dict(requests=self.requests, coalesced=self.coalesced,
+                    in_flight=len(self._flights))
+
+
+class _Flight(object):
+    """ An in-flight request of the RequestCoalescer. """
+
+    def __init__(self):
+        self.done = Event()
+        self.response = None
+        self.error = None
+
+
+class TokenCache(object):
+    """
+    Stores the phpIPAM API tokens in a JSON file, so that a token can be used
+    by the next client until it expires, without a login.  The file is only
+    readable by the owner, since the tokens grant access to the API.
+    """
+
+    # the format of the phpIPAM token "expires" value.
+
+    EXPIRES_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            The file name, for example "~/.phpipam-tokens.json"
+        """
+        self.path = os.path.expanduser(path)
+
+    @staticmethod
+    def make_key(host, app, user):
+        return f'{user}@{host}/api/{app}'
+
+    def _read(self):
+        try:
+            with open(self.path) as ifile:
+                return json.load(ifile)
+        except (OSError, ValueError):
+            return dict()
+
+    def _write(self, tokens):
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as ofile:
+            json.dump(tokens, ofile)
+
+    def get(self, key):
+        """ Returns the cached token, or None when not cached or expired. """
+        entry = self._read().get(key)
+        if not entry:
+            return None
+
+        try:
+            expires = datetime.strptime(entry['expires'], self.EXPIRES_FORMAT)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        return entry['token'] if expires > datetime.now() else None
+
+    def put(self, key, token, expires):
+        """ Store the token and its "expires" value, as returned by the login. """
+        tokens = self._read()
+        tokens[key] = dict(token=token, expires=expires)
+        self._write(tokens)
+
+    def remove(self, key):
+        """ Remove the token, for example when it is no longer valid. """
+        tokens = self._read()
+        if tokens.pop(key, None) is not None:
+            self._write(tokens)
+
+
+def _normpath(url):
+    while '//' in url:
+        url = url.replace('//', '/')
+    return url
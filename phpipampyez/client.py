@@ -20,11 +20,21 @@ This file contains the Pythonic client for the phpIPAM software project.
 
 """
 
+import time
 from http import HTTPStatus
-from requests import Session
-from functools import wraps
+from urllib.parse import urlsplit
+from requests import Session, Request
+from requests.utils import requote_uri
+from functools import wraps, partial
+from threading import Lock
+from contextlib import closing
 
 from phpipampyez import search
+from phpipampyez.cache import TTLCache, TokenCache
+from phpipampyez.instrument import endpoint_name
+from phpipampyez.stream import iter_json_items
+from phpipampyez.transport import RateLimiter, mount_adapter
+from phpipampyez.utils import collection_found
 
 
 __all__ = ['PhpIpamClient']
@@ -39,7 +49,8 @@ class PhpIpamClient(object):
     Before use, you must have setup an "app" in the Administration/API panel.
     """
 
-    def __init__(self, host, user, password, app, skip_login=False):
+    def __init__(self, host, user, password, app, skip_login=False, cache=None,
+                 token_cache=None, coalescer=None, **transport):
         """
         Create as new client session and login.
 
@@ -61,17 +72,63 @@ class PhpIpamClient(object):
         skip_login : bool (optional)
             If set to `True` then do not attempt to login to phpIPAM.
             The default action is login.
+
+        cache : ResponseCache (optional)
+            When provided, the controller GET responses are cached.  See
+            `cache.ResponseCache`.  The cache can also be set, or removed, at
+            any time using the `cache` attribute.
+
+        coalescer : RequestCoalescer (optional)
+            When provided, identical controller GET calls made at the same time,
+            by different threads, share one API request.  See
+            `cache.RequestCoalescer`.  This can also be set, or removed, at any
+            time using the `coalescer` attribute.
+
+        token_cache : str (optional)
+            The name of a file used to store the API token.  When provided, the
+            token is reused by each client until it expires, so no login call is
+            needed.  See `cache.TokenCache`.
+
+        Other Parameters
+        ----------------
+        transport options, such as `pool_maxsize`, `retries` and `rate_limit`; see
+        the `configure_transport` method.
+
+        Notes
+        -----
+        The `search_many` results are cached in the `search_cache` attribute, a
+        TTLCache instance that keeps the results for 5 minutes by default.  Set
+        the attribute to None to disable the cache.
         """
         self.api = _PhpIpamApiSession(host=host, app=app)
-        self.webui = Session()
+        self.webui = _PhpIpamSession()
+        self.cache = cache
+        self.coalescer = coalescer
+        self.search_cache = TTLCache(ttl=300, max_entries=4096)
+        self.token_cache = TokenCache(token_cache) if token_cache else None
+        self.webui_logged_in = False
+
+        self._user = user
+        self._password = password
+        self._login_lock = Lock()
+        self.api.on_unauthorized = self._renew_token
+
+        if transport:
+            self.configure_transport(**transport)
 
         if skip_login is False:
             self.login(user, password)
 
     def login(self, user, password):
         """
-        Login to the phpIPAM system.  When the login is OK, both the client `api` and
-        the client `webui` Request session instances can be uses.
+        Login to the phpIPAM REST API.  When the login is OK, the client `api`
+        Request session instance can be used.  The WebUI login, used by the client
+        `webui` Request session instance for the search feature, is done on the
+        first search; see `login_webui`.
+
+        When the client has a `token_cache`, and the cached token has not expired,
+        the cached token is used without a login call.  If the API later responds
+        with a 401, the client will login again and retry the request.
 
         Parameters
         ----------
@@ -83,34 +140,130 @@ class PhpIpamClient(object):
         RuntimeError - denotes an invalid user/password
         HTTPError - any other HTTP response error that is not an "invalid user/password"
         """
-        # ---------------------------------------
-        # REST API login
-        # ---------------------------------------
+        self._user, self._password = user, password
 
-        res = self.api.post("/user/", auth=(user, password))
+        if self.token_cache is not None:
+            token = self.token_cache.get(self._token_key)
+            if token:
+                self.api.headers['token'] = token
+                return
+
+        self._login_api()
+
+    @property
+    def _token_key(self):
+        return TokenCache.make_key(self.api.phpipam_host, self.api.phpipam_app, self._user)
+
+    def _login_api(self):
+        """ REST API login, storing the new token in the token cache. """
+        res = self.api.post("/user/", auth=(self._user, self._password))
 
         # if res.status_code == 500 and 'Invalid username or password' in res.text:
         #     raise RuntimeError("Login failed: invalid user name or password")
 
         res.raise_for_status()
-        token = res.json()['data']['token']
-        self.api.headers['token'] = token
+        data = res.json()['data']
+        self.api.headers['token'] = data['token']
+
+        if self.token_cache is not None:
+            self.token_cache.put(self._token_key, data['token'], data.get('expires'))
 
-        # ---------------------------------------
-        # WebUI login
-        # ---------------------------------------
+    def _renew_token(self, old_token):
+        """
+        Called by the `api` session when the API responds with a 401.  Returns the
+        token used to retry the request.
+        """
+        with self._login_lock:
+            # another thread may have already renewed the token.
+            if self.api.headers.get('token') == old_token:
+                if self.token_cache is not None:
+                    self.token_cache.remove(self._token_key)
+                self._login_api()
+
+            return self.api.headers['token']
+
+    def login_webui(self):
+        """
+        Login to the phpIPAM WebUI.  This is done by the first `search`, so there
+        is no need to call this method.
+        """
 
         # we also want to "login" via the WebUI so that we can utilize the tools
         # search feature; not currently available as part of the API proper.
 
-        webui_login = self.api.phpipam_host + '/app/login/login_check.php'
-        res = self.webui.post(webui_login, data=dict(ipamusername=user,
-                                                     ipampassword=password))
-        res.raise_for_status()
+        with self._login_lock:
+            if self.webui_logged_in:
+                return
+
+            webui_login = self.api.phpipam_host + '/app/login/login_check.php'
+            res = self.webui.post(webui_login, data=dict(ipamusername=self._user,
+                                                         ipampassword=self._password))
+            res.raise_for_status()
+            self.webui_logged_in = True
 
         # We do not need to check the actual results body contents.  If the
-        # user/password values were not valid, then the previous REST API login
-        # will have failed.
+        # user/password values were not valid, then the REST API login will have
+        # failed.
+
+    @property
+    def instrumentation(self):
+        """
+        The `instrument.Instrumentation` instance that records the requests of both
+        the `api` and `webui` sessions, and the search results parsing; or None,
+        the default, when the requests are not recorded.
+        """
+        return self.api.instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, value):
+        self.api.instrumentation = value
+        self.webui.instrumentation = value
+
+    def configure_transport(self, pool_maxsize=10, pool_block=False, retries=0,
+                            backoff_factor=0.5, backoff_jitter=0.5, rate_limit=None,
+                            rate_burst=None):
+        """
+        Configure the HTTP transport of both the client `api` and `webui` sessions.
+
+        Parameters
+        ----------
+        pool_maxsize : int
+            The maximum number of connections kept alive to the phpIPAM server;
+            this should be at least the number of threads that use the client at
+            the same time, for example the `max_workers` of `expand_ids`.
+
+        pool_block : bool
+            When True, a request waits for a free connection rather than opening
+            a connection that is discarded after use.
+
+        retries : int
+            The number of times an idempotent request is retried on a connection
+            error or a 429/5xx response.  POST and PATCH requests are never
+            retried.
+
+        backoff_factor : float
+            The delay before each retry is backoff_factor * 2 ** (retry number - 1)
+            seconds.
+
+        backoff_jitter : float
+            A random delay, up to this many seconds, added to each retry delay.
+
+        rate_limit : float (optional)
+            The maximum number of requests per second, shared by both sessions.
+            The rate is reduced each time the server responds with a 429 or 503,
+            and then recovers with each successful response.  See
+            `transport.RateLimiter`.
+
+        rate_burst : int (optional)
+            The maximum number of requests sent at once when using `rate_limit`.
+        """
+        rate_limiter = RateLimiter(rate_limit, burst=rate_burst) if rate_limit else None
+
+        for session in (self.api, self.webui):
+            session.rate_limiter = rate_limiter
+            mount_adapter(session, pool_maxsize=pool_maxsize, pool_block=pool_block,
+                          retries=retries, backoff_factor=backoff_factor,
+                          backoff_jitter=backoff_jitter, rate_limiter=rate_limiter)
 
     def __getattr__(self, item):
         """
@@ -142,7 +295,8 @@ class PhpIpamClient(object):
         setattr(self, item, new_sec)
         return new_sec
 
-    def search(self, find, expand=False, **search_options):
+    def search(self, find, expand=False, max_workers=None, bulk_threshold=None,
+               parser='bs4', **search_options):
         """
         Perform the same search as found in the WebUI.  This function
         will return a dict[list] structure as described below.
@@ -159,6 +313,21 @@ class PhpIpamClient(object):
 
             When False the return lists contain only the ID values.
 
+        max_workers : int (optional)
+            When `expand` is True, the maximum number of concurrent API calls
+            used to expand each type of result.  See `utils.expand_ids`.
+
+        bulk_threshold : int (optional)
+            When `expand` is True, the minimum number of IDs used to choose one
+            collection fetch, instead of one API call per ID.  The found
+            addresses are taken from the addresses of the found subnets.  See
+            `utils.expand_ids`.
+
+        parser : str (optional)
+            The name of the HTML parser used for the search results page; one of
+            `search.PARSERS`.  The "lxml" and "stream" parsers are faster than
+            the default "bs4" parser.
+
         Other Parameters
         ----------------
         search_options defines which options to include in the search.  The key
@@ -191,14 +360,180 @@ class PhpIpamClient(object):
             list of items; either just the IDs or a list[dict] depending on the
             `expand` parameter.
         """
-        return search.search(self, find, search_options=search_options, expand=expand)
+        return search.search(self, find, search_options=search_options, expand=expand,
+                             max_workers=max_workers, bulk_threshold=bulk_threshold,
+                             parser=parser)
+
+    def iter_search(self, find, expand=False, max_workers=8, chunk_size=16 * 1024,
+                    **search_options):
+        """
+        Perform the same search as found in the WebUI, and yield each found item
+        while the results page is still being downloaded.  The results page is
+        parsed as it arrives, so the first items are available, and with
+        `expand` their API calls started, before the whole page is downloaded.
+
+        Parameters
+        ----------
+        find : str
+            The string expression used for search purpose.
+
+        expand : bool
+            When True, each found ID is expanded to the full data dict; the API
+            calls are started as soon as each ID is found.  The PSTN results are
+            not available in the API, so those are always ID values.
+
+        max_workers : int (optional)
+            When `expand` is True, the maximum number of concurrent API calls.
+
+        chunk_size : int (optional)
+            The number of bytes read from the response at a time.
+
+        Other Parameters
+        ----------------
+        search_options are the same as those of the `search` method.
+
+        Examples
+        --------
+            for key, item in client.iter_search("10.113.29", addresses=True, expand=True):
+                ....
+
+        Yields
+        ------
+        tuple
+            The (key, ID) of each found item, where the keys are those of the
+            `search` results; or (key, dict) when `expand` is True.  The items
+            are yielded in the order found on the page.
+
+        Raises
+        ------
+        RuntimeError
+            When `expand` is True and the API returns an HTTP 400 response code.
+            The args included in the exception will be:
+                args[0] = str: message
+                args[1] = list[tuple] of the (key, dict) items yielded ok
+                args[2] = ID of failed API call
+                args[3] = Response object of failed API call
+        """
+        return search.iter_search(self, find, search_options=search_options, expand=expand,
+                                  max_workers=max_workers, chunk_size=chunk_size)
+
+    def search_many(self, terms, expand=False, max_workers=8, parser='bs4', **search_options):
+        """
+        Perform the same search as found in the WebUI for each of the terms.
+        The searches run concurrently, and each search uses its own search
+        options, so the searches do not interfere with one another.
+
+        The results are cached by term and search options; see the
+        `search_cache` attribute.  Each call returns its own copy of the lists
+        and data dicts, so the caller may change them.
+
+        Parameters
+        ----------
+        terms : iterable[str]
+            The string expressions used for search purpose.
+
+        expand : bool
+            When True, the found IDs are expanded to the full data dict.  See
+            `search`.
+
+        max_workers : int (optional)
+            The maximum number of concurrent searches.
+
+        parser : str (optional)
+            The name of the HTML parser used for the search results pages.  See
+            `search`.
+
+        Other Parameters
+        ----------------
+        search_options are the same as those of the `search` method.
+
+        Examples
+        --------
+        Search for each of the host names in addresses only:
+
+            results = client.search_many(["web01", "web02", "db01"], addresses=True)
+            web01_ids = results["web01"]["addresses"]
+
+        Returns
+        -------
+        dict[dict[list]]
+            The `search` results, keyed by term.
+        """
+        return search.search_many(self, terms, search_options=search_options,
+                                  expand=expand, max_workers=max_workers, parser=parser)
+
+    def iter_addresses(self, subnet_id, **kwargs):
+        """
+        Iterate over the addresses of a subnet, one address at a time, while the
+        API response is being downloaded.  See `_PhpIpamController.iter_all`.
+
+        Parameters
+        ----------
+        subnet_id : str
+            The subnet ID value
+
+        Yields
+        ------
+        dict
+            Each address data dict.
+        """
+        addresses = getattr(self.subnets, f'_{subnet_id}')._addresses
+        return addresses.iter_all(**kwargs)
 
 
 # -----------------------------------------------------------------------------
 #                Internal class definitions used by PhpIpamClient
 # -----------------------------------------------------------------------------
 
-class _PhpIpamApiSession(Session):
+class _PhpIpamSession(Session):
+    """
+    Define a requests.Session class that waits on the rate limiter, and records
+    the request instrumentation, when these are configured.  Used by the
+    PhpIpamClient for the WebUI requests.
+    """
+    def __init__(self):
+        super(_PhpIpamSession, self).__init__()
+        self.rate_limiter = None
+        self.instrumentation = None
+
+    def send(self, request, **kwargs):
+        if self.rate_limiter is None and self.instrumentation is None:
+            return super(_PhpIpamSession, self).send(request, **kwargs)
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        start = time.perf_counter()
+        try:
+            res = super(_PhpIpamSession, self).send(request, **kwargs)
+        except Exception:
+            self._record(request, None, 0, time.perf_counter() - start)
+            raise
+
+        if self.instrumentation is not None:
+            # the body of a streamed response is not yet read, so the size is
+            # taken from the headers.
+            if kwargs.get('stream'):
+                nbytes = int(res.headers.get('Content-Length') or 0)
+            else:
+                nbytes = len(res.content)
+            self._record(request, res.status_code, nbytes, time.perf_counter() - start)
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(res.status_code)
+
+        return res
+
+    def _record(self, request, status, nbytes, seconds):
+        if self.instrumentation is not None:
+            endpoint = endpoint_name(self._endpoint_path(request.url))
+            self.instrumentation.record(endpoint, request.method, status, nbytes, seconds)
+
+    def _endpoint_path(self, url):
+        return urlsplit(url).path
+
+
+class _PhpIpamApiSession(_PhpIpamSession):
     """
     Define a requests.Session class for prefixing the phpIPAM server API URL.
     Used by the PhpIpamClient upon instance creation.
@@ -208,11 +543,64 @@ class _PhpIpamApiSession(Session):
         self.phpipam_host = host
         self.phpipam_app = app
         self.phpipam_url = f'{host}/api/{app}'
+        self.on_unauthorized = None
+        self._get_template = None
+        self._path_prefix = urlsplit(self.phpipam_url).path
+
+    def _endpoint_path(self, url):
+        path = urlsplit(url).path
+        return path[len(self._path_prefix):] if path.startswith(self._path_prefix) else path
 
     def prepare_request(self, request):
         request.url = self.phpipam_url + request.url
         return super(_PhpIpamApiSession, self).prepare_request(request)
 
+    def fast_get(self, url, **kwargs):
+        """
+        The GET method used by the controllers.  A GET without any requests
+        options is sent as a copy of a request prepared in advance, with only the
+        URL changed; this avoids the header merging and the environment proxy
+        lookup that the requests Session does for each request.  The prepared
+        request is made again whenever a session setting, such as the headers,
+        auth, or proxies, has changed since it was made; a change to the proxy
+        environment variables is not detected.  When the session has cookies or
+        params, which are part of the URL, the GET is a Session get.
+        """
+        if kwargs or self.cookies or self.params:
+            return self.get(url, **kwargs)
+
+        key = self._template_key()
+        template = self._get_template
+        if template is None or template[0] != key:
+            request = self.prepare_request(Request('GET', url))
+            settings = self.merge_environment_settings(request.url, {}, None, None, None)
+            template = self._get_template = (key, request, settings)
+
+        request = template[1].copy()
+        request.url = requote_uri(self.phpipam_url + url)
+        return self.send(request, allow_redirects=True, **template[2])
+
+    def _template_key(self):
+        """ Returns the session settings used to prepare the fast_get request. """
+        return (tuple(self.headers.items()), self.auth,
+                tuple((name, tuple(hooks)) for name, hooks in self.hooks.items()),
+                tuple(self.proxies.items()), self.verify, self.cert, self.stream,
+                self.trust_env)
+
+    def send(self, request, **kwargs):
+        res = super(_PhpIpamApiSession, self).send(request, **kwargs)
+
+        # when the token is no longer valid, obtain a new token and retry the
+        # request once; but not for the login request itself.
+
+        if (res.status_code == HTTPStatus.UNAUTHORIZED and self.on_unauthorized
+                and 'token' in request.headers
+                and request.url != self.phpipam_url + '/user/'):
+            request.headers['token'] = self.on_unauthorized(request.headers['token'])
+            res = super(_PhpIpamApiSession, self).send(request, **kwargs)
+
+        return res
+
 
 class _PhpIpamController(object):
     """
@@ -232,6 +620,43 @@ class _PhpIpamController(object):
     def __repr__(self):
         return f'phpIPAM controller API url: {self.url}'
 
+    def iter_all(self, url='', chunk_size=64 * 1024, **kwargs):
+        """
+        Iterate over the items of a controller collection, one item at a time,
+        while the API response is being downloaded.  The response body is not
+        read into memory as a whole, so large collections can be processed
+        without storing all of the items.
+
+        Examples
+        --------
+            for subnet in client.subnets.iter_all():
+                ....
+
+            by_ip = create_index(client.iter_addresses(subnet_id), key='ip')
+
+        Parameters
+        ----------
+        url : str (optional)
+            The URL of the collection within the controller.
+
+        chunk_size : int (optional)
+            The number of bytes read from the response at a time.
+
+        Other Parameters
+        ----------------
+        kwargs are passed to the requests GET method.
+
+        Yields
+        ------
+        dict
+            Each item data dict.
+        """
+        res = self.get(url, stream=True, **kwargs)
+
+        with closing(res):
+            if collection_found(res):
+                yield from iter_json_items(res.iter_content(chunk_size=chunk_size))
+
     def __getattr__(self, item):
         """
         meta attribute that returns allows the caller to either
@@ -271,12 +696,26 @@ class _PhpIpamController(object):
             return subsec
 
         # if we are here, then item is the name of the `requests` method that we
-        # want to invoke, for example "get".
+        # want to invoke, for example "get".  The method is stored in the
+        # instance, so that this is only done once for each method.
 
-        api_func = getattr(self.api, item)
+        session_func = getattr(self.api, item)
+        api_func = self.api.fast_get if item == 'get' else session_func
+        client = self.client
+        prefix = self.url
 
-        @wraps(api_func)
+        @wraps(session_func)
         def decorate(url='', **kwargs):
-            return api_func(f"{self.url}{url}/", **kwargs)
+            send = api_func
+            coalescer = client.coalescer
+            if coalescer is not None and item == 'get':
+                send = partial(coalescer.request, api_func)
+
+            cache = client.cache
+            if cache is None:
+                return send(f"{prefix}{url}/", **kwargs)
+
+            return cache.request(item, send, f"{prefix}{url}/", **kwargs)
 
+        setattr(self, item, decorate)
         return decorate
@@ -0,0 +1,263 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the crawler that builds the tree of sections, subnets and
+addresses:
+
+    crawler = HierarchyCrawler(client, max_workers=16, sections=['Production'])
+    root = crawler.crawl(on_node=lambda node: print(node.kind, node.id))
+
+    for section in root.children:
+        for subnet in section.walk():
+            ...
+
+The tree is crawled breadth-first: all of the sections, then the subnets of
+all sections, then the addresses of all subnets; the API calls of each level
+are made concurrently.  The subnets of a section are nested by their
+"masterSubnetId" value.
+
+The `state` of a crawler contains each of the API results, so that a crawl
+that failed part way can be resumed by a new crawler without repeating those
+API calls:
+
+    try:
+        root = crawler.crawl()
+    except Exception:
+        json.dump(crawler.state, ofile)
+
+    crawler = HierarchyCrawler(client, state=json.load(ifile))
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from phpipampyez.utils import collection_items
+
+
+__all__ = [
+    'HierarchyCrawler',
+    'Node'
+]
+
+
+class Node(object):
+    """
+    A node of the tree.
+
+    Attributes
+    ----------
+    kind : str
+        One of "root", "section", "subnet", or "address".
+
+    id : str
+        The ID value of the item; None for the root.
+
+    data : dict
+        The API data dict of the item; None for the root.
+
+    parent : Node
+        The parent node; None for the root.
+
+    children : list[Node]
+        The child nodes; the subnets of a section, and the subnets and then
+        addresses of a subnet.
+
+    depth : int
+        The depth of the node; the root is 0, the sections are 1.
+    """
+    __slots__ = ('kind', 'id', 'data', 'parent', 'children', 'depth')
+
+    def __init__(self, kind, data=None, parent=None):
+        self.kind = kind
+        self.data = data
+        self.id = data['id'] if data else None
+        self.parent = parent
+        self.children = list()
+        self.depth = parent.depth + 1 if parent else 0
+        if parent is not None:
+            parent.children.append(self)
+
+    def __repr__(self):
+        return f'Node({self.kind}, id={self.id}, children={len(self.children)})'
+
+    def walk(self):
+        """ Yields this node and each of its descendants, breadth-first. """
+        level = [self]
+        while level:
+            yield from level
+            level = [child for node in level for child in node.children]
+
+
+class HierarchyCrawler(object):
+    """
+    Crawls the sections, subnets and addresses of the phpIPAM system.
+    """
+
+    def __init__(self, client, max_workers=8, sections=None, max_depth=None,
+                 addresses=True, state=None):
+        """
+        Parameters
+        ----------
+        client : PhpIpamClient
+
+        max_workers : int
+            The maximum number of concurrent API calls.
+
+        sections : iterable[str] (optional)
+            The names, or ID values, of the sections to crawl; by default all of
+            the sections.
+
+        max_depth : int (optional)
+            The depth of the deepest nodes in the tree; the sections are at depth
+            1, the top level subnets at depth 2.  By default there is no limit.
+
+        addresses : bool
+            When False, the addresses are not crawled.
+
+        state : dict (optional)
+            The `state` of an earlier crawler, used to resume its crawl.
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.sections = set(sections) if sections is not None else None
+        self.max_depth = max_depth
+        self.addresses = addresses
+        self.state = state if state is not None else dict()
+        self.api_calls = 0
+
+    def crawl(self, on_node=None):
+        """
+        Crawl the hierarchy and return the tree.
+
+        Parameters
+        ----------
+        on_node : callable (optional)
+            Called with each Node as it is added to the tree, before the crawl
+            is complete.  A node is always passed after its parent.
+
+        Returns
+        -------
+        Node
+            The root node; its children are the sections.
+        """
+        notify = on_node or (lambda node: None)
+        root = Node('root')
+
+        if not self._within_depth(1):
+            return root
+
+        sections = list()
+        for data in self._fetch('/sections/', self.client.sections):
+            if self.sections is None or {data['id'], data.get('name')} & self.sections:
+                sections.append(Node('section', data, root))
+                notify(sections[-1])
+
+        if not self._within_depth(2):
+            return root
+
+        subnets = list()
+        sections_api = self.client.sections
+        urls = {f"/sections/{section.id}/subnets/":
+                (section, getattr(sections_api, f'_{section.id}')._subnets)
+                for section in sections}
+
+        for url, items in self._fetch_many(urls):
+            for node in self._nest_subnets(urls[url][0], items):
+                subnets.append(node)
+                notify(node)
+
+        if not self.addresses:
+            return root
+
+        subnets_api = self.client.subnets
+        urls = {f"/subnets/{subnet.id}/addresses/":
+                (subnet, getattr(subnets_api, f'_{subnet.id}')._addresses)
+                for subnet in subnets if self._within_depth(subnet.depth + 1)}
+
+        for url, items in self._fetch_many(urls):
+            for data in items:
+                notify(Node('address', data, urls[url][0]))
+
+        return root
+
+    # -------------------------------------------------------------------------
+    #                        internal methods
+    # -------------------------------------------------------------------------
+
+    def _within_depth(self, depth):
+        return self.max_depth is None or depth <= self.max_depth
+
+    def _nest_subnets(self, section, items):
+        """
+        Add the subnets of a section to the tree, nested by the "masterSubnetId"
+        value, and return the new nodes in breadth-first order.  A subnet whose
+        master subnet is not found is added to the section.
+        """
+        by_master = dict()
+        ids = {data['id'] for data in items}
+        for data in items:
+            master = data.get('masterSubnetId')
+            by_master.setdefault(master if master in ids else None, []).append(data)
+
+        added = list()
+        level = [(section, None)]
+        while level:
+            next_level = list()
+            for parent, parent_id in level:
+                if not self._within_depth(parent.depth + 1):
+                    continue
+                for data in by_master.get(parent_id, ()):
+                    node = Node('subnet', data, parent)
+                    added.append(node)
+                    next_level.append((node, node.id))
+            level = next_level
+
+        return added
+
+    def _fetch(self, url, controller):
+        """
+        Returns the items of the collection `url`, using the controller; or from
+        the state when present.
+        """
+        if url in self.state:
+            return self.state[url]
+
+        res = controller.get()
+        self.api_calls += 1
+
+        items = self.state[url] = collection_items(res)
+        return items
+
+    def _fetch_many(self, urls):
+        """
+        Yields the (url, items) of each of the URLs as each is fetched.  The
+        `urls` values are (node, controller) tuples.
+        """
+        resumed = [url for url in urls if url in self.state]
+        for url in resumed:
+            yield url, self.state[url]
+
+        pending = [url for url in urls if url not in self.state]
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._fetch, url, urls[url][1]): url for url in pending}
+            try:
+                for fut in as_completed(futures):
+                    yield futures[fut], fut.result()
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
@@ -0,0 +1,309 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the client used to access several phpIPAM instances, for
+example one per region, at once.  Each call is made on all of the instances in
+parallel, and the results are tagged with the name of the instance:
+
+    fed = FederatedClient({'us': us_client, 'eu': eu_client}, timeout=10)
+
+    subnets = fed.subnets.get().items()
+    for subnet in subnets:
+        print(subnet['_instance'], subnet['subnet'])
+
+    found = fed.search('web01', addresses=True)
+    addresses = fed.expand_ids('addresses', found.merged()['addresses'])
+
+An instance that fails, or that does not respond within its timeout, does not
+stall the others; its exception is found in the `errors` of the results.  A
+controller call that has an error response, other than the 404 of an empty
+collection, is a failure of the instance with a `requests.HTTPError`.  The
+timeout of a controller call is given by `instance_timeout`, as the `timeout`
+is passed to the requests method:
+
+    res = fed.subnets.get(instance_timeout={'us': 5, 'eu': 20}, timeout=3)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from phpipampyez.utils import expand_ids, collection_found
+
+
+__all__ = [
+    'FederatedClient',
+    'FederatedResults'
+]
+
+# the key added to each data dict with the name of the instance.
+
+INSTANCE_KEY = '_instance'
+
+
+class FederatedResults(object):
+    """
+    The results of a call made on each of the instances.
+
+    Attributes
+    ----------
+    results : dict
+        The value returned for each instance, keyed by the instance name.
+
+    errors : dict
+        The exception raised for each instance that failed, keyed by the instance
+        name.  An instance that did not complete within its timeout has a
+        `concurrent.futures.TimeoutError`; an instance with an error response
+        to a controller call has a `requests.HTTPError`.
+    """
+
+    def __init__(self, results, errors):
+        self.results = results
+        self.errors = errors
+
+    def __repr__(self):
+        return f'FederatedResults(ok={sorted(self.results)}, errors={sorted(self.errors)})'
+
+    @property
+    def ok(self):
+        """ True when the call was successful on all instances. """
+        return not self.errors
+
+    def items(self):
+        """
+        Returns the data dicts of the API responses of all instances, each with
+        the INSTANCE_KEY value.  The 404 response of an empty collection
+        contributes no items; the other error responses are in `errors`.
+
+        Returns
+        -------
+        list[dict]
+        """
+        found = list()
+        for name, res in self.results.items():
+            # the 404 of an empty collection; a controller call has put any
+            # other error response in `errors`.
+
+            if not res.ok:
+                continue
+
+            data = res.json().get('data') or []
+            found.extend(_tag(name, data if isinstance(data, list) else [data]))
+
+        return found
+
+    def merged(self):
+        """
+        Returns the `search` results of all instances as a single dict[list].  The
+        data dicts have the INSTANCE_KEY value, and the IDs are (instance, ID)
+        tuples; the form used by `FederatedClient.expand_ids`.
+
+        Returns
+        -------
+        dict[list]
+        """
+        merged = dict()
+        for name, found in self.results.items():
+            for key, values in found.items():
+                merged.setdefault(key, []).extend(
+                    _tag(name, values) if values and isinstance(values[0], dict)
+                    else ((name, value) for value in values))
+
+        return merged
+
+
+class FederatedClient(object):
+    """
+    Client to access several phpIPAM instances in parallel.
+    """
+
+    def __init__(self, clients, timeout=None, max_workers=None):
+        """
+        Parameters
+        ----------
+        clients : dict
+            The PhpIpamClient of each instance, keyed by the instance name.
+
+        timeout : float|dict (optional)
+            The number of seconds to wait for each instance; either one value
+            for all instances, or a value for each instance keyed by the instance
+            name.  By default there is no timeout.
+
+        max_workers : int (optional)
+            The maximum number of instances called at the same time; by default
+            all of the instances.
+        """
+        self.clients = dict(clients)
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+    def __getattr__(self, item):
+        """
+        Returns the federated controller; for example `fed.subnets`.  See the
+        PhpIpamClient method of the same name.
+        """
+        if item.startswith('__'):
+            raise AttributeError(item)
+
+        return _FederatedController(self, [item])
+
+    def run(self, func, timeout=None):
+        """
+        Call `func(name, client)` for each instance, in parallel.
+
+        Parameters
+        ----------
+        func : callable
+            The function called for each instance.
+
+        timeout : float|dict (optional)
+            The timeout of each instance; by default the client `timeout`.
+
+        Returns
+        -------
+        FederatedResults
+        """
+        timeout = self.timeout if timeout is None else timeout
+        results, errors = dict(), dict()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers or len(self.clients) or 1)
+        start = time.monotonic()
+
+        futures = {name: executor.submit(func, name, client)
+                   for name, client in self.clients.items()}
+
+        try:
+            for name, fut in futures.items():
+                wait = _timeout_for(timeout, name)
+                if wait is not None:
+                    wait = max(0, start + wait - time.monotonic())
+
+                try:
+                    results[name] = fut.result(timeout=wait)
+                except TimeoutError as exc:
+                    fut.cancel()
+                    errors[name] = exc
+                except Exception as exc:
+                    errors[name] = exc
+
+        finally:
+            # do not wait for the instances that have timed out; their calls
+            # complete in the background and the results are discarded.
+            executor.shutdown(wait=False)
+
+        return FederatedResults(results, errors)
+
+    def search(self, find, expand=False, timeout=None, **search_options):
+        """
+        Perform the WebUI search on each of the instances.  See the PhpIpamClient
+        `search` method for the parameters.
+
+        Returns
+        -------
+        FederatedResults
+            The `search` results of each instance; see `FederatedResults.merged`.
+        """
+        return self.run(lambda name, client: client.search(find, expand=expand, **search_options),
+                        timeout=timeout)
+
+    def expand_ids(self, controller, tagged_ids, max_workers=None, timeout=None):
+        """
+        Expand the IDs of items found on several instances.  See `utils.expand_ids`.
+
+        Parameters
+        ----------
+        controller : str
+            The name of the controller, for example "addresses".
+
+        tagged_ids : iterable[tuple]
+            The (instance, ID) of each item, as found in `FederatedResults.merged`.
+
+        max_workers : int (optional)
+            The maximum number of concurrent API calls on each instance.
+
+        timeout : float|dict (optional)
+            The timeout of each instance; by default the client `timeout`.
+
+        Returns
+        -------
+        FederatedResults
+            The data dicts of each instance; see `FederatedResults.merged`.  The
+            `results` and `errors` include only the instances of `tagged_ids`.
+        """
+        ids = dict()
+        for name, each in tagged_ids:
+            ids.setdefault(name, []).append(each)
+
+        def expand(name, client):
+            return {controller: expand_ids(getattr(client, controller), ids[name],
+                                           max_workers=max_workers)}
+
+        subset = FederatedClient({name: self.clients[name] for name in ids},
+                                 timeout=self.timeout, max_workers=self.max_workers)
+
+        return subset.run(expand, timeout=timeout)
+
+
+class _FederatedController(object):
+    """
+    The controller of a FederatedClient; each API method call is made on the
+    same controller of each instance.
+    """
+
+    def __init__(self, federation, path):
+        self.federation = federation
+        self.path = path
+
+    def __repr__(self):
+        return f'phpIPAM federated controller: {"/".join(self.path)}'
+
+    def __getattr__(self, item):
+        if item.startswith('__'):
+            raise AttributeError(item)
+
+        if item.startswith('_'):
+            return _FederatedController(self.federation, self.path + [item])
+
+        # the `timeout` keyword, if any, is the requests timeout of each API
+        # call; `instance_timeout` is the time to wait for each instance.
+
+        def call(url='', instance_timeout=None, **kwargs):
+            def api_call(name, client):
+                res = getattr(self._controller(client), item)(url, **kwargs)
+
+                # an error response, other than the 404 of an empty collection,
+                # raises so that it is found in the `errors` of the results.
+
+                collection_found(res)
+                return res
+
+            return self.federation.run(api_call, timeout=instance_timeout)
+
+        return call
+
+    def _controller(self, client):
+        controller = client
+        for each in self.path:
+            controller = getattr(controller, each)
+        return controller
+
+
+def _timeout_for(timeout, name):
+    if isinstance(timeout, dict):
+        return timeout.get(name)
+    return timeout
+
+
+def _tag(name, list_of_dict):
+    return [dict(item, **{INSTANCE_KEY: name}) for item in list_of_dict]
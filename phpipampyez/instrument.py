@@ -0,0 +1,190 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the instrumentation of the PhpIpamClient requests.  When
+enabled, each request is recorded by endpoint and HTTP method, and passed to
+one or more sinks:
+
+    stats = StatsSink()
+    client.instrumentation = Instrumentation(stats, LoggingSink())
+    ...
+    print(stats.prometheus_text())
+
+The endpoint is the API URL path with the ID values replaced by "{id}", for
+example "/subnets/{id}/addresses/".  The WebUI search is recorded as two
+stages: the "/tools/search/{find}" request, and the "search.parse" of the
+results page.  When `client.instrumentation` is None, the default, nothing is
+recorded.
+"""
+
+import re
+import logging
+from threading import Lock
+from http import HTTPStatus
+
+
+__all__ = [
+    'Instrumentation',
+    'StatsSink',
+    'LoggingSink',
+    'endpoint_name'
+]
+
+# the upper bound, in seconds, of each latency histogram bucket.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_name(path):
+    """
+    Returns the endpoint name of a URL path, for example "/subnets/12/addresses/"
+    is "/subnets/{id}/addresses/".
+    """
+    path = path.split('?')[0]
+    while '//' in path:
+        path = path.replace('//', '/')
+
+    if path.startswith('/tools/search/'):
+        return '/tools/search/{find}'
+
+    return _ID_SEGMENT.sub('/{id}', path)
+
+
+class Instrumentation(object):
+    """
+    Passes each recorded request to each of the sinks.  A sink is any object
+    that provides the `record` method.
+    """
+
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+
+    def record(self, endpoint, method, status, nbytes, seconds):
+        """
+        Record a request.
+
+        Parameters
+        ----------
+        endpoint : str
+            The endpoint name, see `endpoint_name`.
+
+        method : str
+            The HTTP method, for example "GET"; or "PARSE" for the "search.parse"
+            stage.
+
+        status : int|None
+            The response status code, or None when the request failed without a
+            response.
+
+        nbytes : int
+            The number of bytes transferred in the response body.
+
+        seconds : float
+            The elapsed time.
+        """
+        for sink in self.sinks:
+            sink.record(endpoint, method, status, nbytes, seconds)
+
+
+class StatsSink(object):
+    """
+    Keeps the request counts, error counts, bytes transferred and latency
+    histogram of each endpoint and method, in-process.
+    """
+
+    def __init__(self):
+        self._stats = dict()
+        self._lock = Lock()
+
+    def record(self, endpoint, method, status, nbytes, seconds):
+        error = status is None or status >= HTTPStatus.BAD_REQUEST
+
+        with self._lock:
+            stats = self._stats.get((endpoint, method))
+            if stats is None:
+                stats = self._stats[(endpoint, method)] = dict(
+                    count=0, errors=0, bytes=0, seconds=0.0,
+                    buckets=[0] * len(LATENCY_BUCKETS))
+
+            stats['count'] += 1
+            stats['errors'] += error
+            stats['bytes'] += nbytes
+            stats['seconds'] += seconds
+
+            for idx, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats['buckets'][idx] += 1
+                    break
+
+    def snapshot(self):
+        """
+        Returns
+        -------
+        dict[dict]
+            A copy of the stats, keyed by (endpoint, method).  The "buckets" value
+            is the number of requests in each of the LATENCY_BUCKETS.
+        """
+        with self._lock:
+            return {key: dict(stats, buckets=list(stats['buckets']))
+                    for key, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def prometheus_text(self, prefix='phpipam'):
+        """
+        Returns the stats in the Prometheus text exposition format.
+        """
+        snapshot = sorted(self.snapshot().items())
+        lines = list()
+
+        for name, field, kind in (('requests_total', 'count', 'counter'),
+                                  ('errors_total', 'errors', 'counter'),
+                                  ('response_bytes_total', 'bytes', 'counter')):
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            for (endpoint, method), stats in snapshot:
+                lines.append(f'{prefix}_{name}{{endpoint="{endpoint}",method="{method}"}} '
+                             f'{stats[field]}')
+
+        lines.append(f'# TYPE {prefix}_request_seconds histogram')
+        for (endpoint, method), stats in snapshot:
+            labels = f'endpoint="{endpoint}",method="{method}"'
+            total = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats['buckets']):
+                total += count
+                le = '+Inf' if bound == float('inf') else bound
+                lines.append(f'{prefix}_request_seconds_bucket{{{labels},le="{le}"}} {total}')
+
+            lines.append(f'{prefix}_request_seconds_sum{{{labels}}} {stats["seconds"]}')
+            lines.append(f'{prefix}_request_seconds_count{{{labels}}} {stats["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class LoggingSink(object):
+    """
+    Logs each recorded request.
+    """
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger or logging.getLogger('phpipampyez')
+        self.level = level
+
+    def record(self, endpoint, method, status, nbytes, seconds):
+        self.logger.log(self.level, '%s %s status=%s bytes=%d %.1fms',
+                        method, endpoint, status, nbytes, seconds * 1e3)
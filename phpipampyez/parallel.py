@@ -0,0 +1,240 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the decoding and indexing of very large API responses
+using a pool of processes; for example a dump of all addresses:
+
+    res = client.addresses.get()
+    records, indexes = decode_records(res.content, fields=('id', 'ip', 'hostname'),
+                                      indexes={'ip': 'ip', 'host': 'hostname'})
+
+    found = indexes['ip'][ip_to_int('10.113.29.210')]
+
+The "data" array of the response body is split into chunks at item
+boundaries, and each process decodes a chunk, keeps only the `fields` values
+as a plain tuple, and indexes the tuples.  The chunks are then merged in order,
+so the results are the same as decoding the body in one process.  Use
+`records.record_type(fields)._make` to obtain the named record of a tuple.
+"""
+
+import os
+import re
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from phpipampyez.utils import ip_to_int
+
+
+__all__ = [
+    'decode_records',
+    'split_json_array'
+]
+
+# bodies smaller than this are decoded in the calling process.
+
+MIN_PARALLEL_SIZE = 4 * 1024 * 1024
+
+_ITEM_BOUNDARY = re.compile(rb'}\s*,\s*{')
+
+
+def split_json_array(body, parts, key='data'):
+    """
+    Split the JSON array `key` of the response body into about `parts` chunks.
+    Each chunk is the text of one or more array items, without the enclosing
+    brackets.  The split is made at the text "},{" between two items; when that
+    text is found within a string value the chunk is not valid JSON, which is
+    detected when the chunk is decoded.
+
+    Parameters
+    ----------
+    body : bytes
+        The API response body, for example {"code":200,"data":[{...},{...}]}
+
+    parts : int
+        The number of chunks.
+
+    key : str
+        The name of the array value.
+
+    Returns
+    -------
+    tuple
+        The (head, chunks, tail) values; head and tail are the body text before
+        and after the array.  None when the array is not found.
+    """
+    found = re.search(rb'"' + re.escape(key.encode()) + rb'"\s*:\s*\[', body)
+    end = body.rfind(b']')
+    if not found or end < found.end():
+        return None
+
+    start = found.end()
+    size = end - start
+    chunks, pos = list(), start
+
+    for part in range(1, parts):
+        boundary = _ITEM_BOUNDARY.search(body, max(pos, start + size * part // parts), end)
+        if boundary is None:
+            break
+
+        chunks.append(body[pos:boundary.start() + 1])
+        pos = boundary.end() - 1
+
+    chunks.append(body[pos:end])
+    return body[:start], chunks, body[end:]
+
+
+def decode_records(body, fields=None, ip_fields=('ip',), indexes=None, key='data',
+                   processes=None):
+    """
+    Decode the items of a large API response body, and build the indexes of the
+    items, using a pool of processes.
+
+    Parameters
+    ----------
+    body : bytes
+        The API response body; for example `res.content`.
+
+    fields : tuple[str] (optional)
+        The names of the item values to keep; each record is then a tuple of
+        these values.  By default the records are the data dicts.
+
+    ip_fields : tuple[str]
+        The names of the fields that contain an IP address; these are stored as
+        integers, see `utils.ip_to_int`.  Only used with `fields`.
+
+    indexes : dict (optional)
+        The indexes to build, keyed by the index name.  Each value is a field
+        name, or a tuple of field names, used to make the key; as with
+        `utils.create_index`, the last record with a given key is the one
+        found by that key.
+
+    key : str
+        The name of the array value of the body.
+
+    processes : int (optional)
+        The number of processes; by default the number of CPUs.  A body smaller
+        than MIN_PARALLEL_SIZE is decoded in the calling process.
+
+    Returns
+    -------
+    tuple
+        The (records, indexes) values; records is a list, and indexes is a dict
+        of the index dicts by name.
+    """
+    fields = tuple(fields) if fields else None
+    indexes = dict(indexes or {})
+    processes = processes or os.cpu_count() or 1
+
+    chunks = None
+    if processes > 1 and len(body) >= MIN_PARALLEL_SIZE:
+        chunks = _split_checked(body, processes * 2, key)
+
+    if not chunks:
+        items = json.loads(body).get(key) or []
+        return _decode_items(items, fields, ip_fields, indexes)
+
+    args = [(chunk, fields, ip_fields, indexes) for chunk in chunks]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = list(executor.map(_decode_chunk, args))
+
+    # a chunk that could not be decoded was split within a string value, so
+    # the body is decoded as a whole instead.
+
+    if any(result is None for result in results):
+        items = json.loads(body).get(key) or []
+        return _decode_items(items, fields, ip_fields, indexes)
+
+    records = list()
+    merged = {name: dict() for name in indexes}
+    for chunk_records, chunk_indexes in results:
+        records.extend(chunk_records)
+        for name, index in chunk_indexes.items():
+            merged[name].update(index)
+
+    return records, merged
+
+
+# -----------------------------------------------------------------------------
+#                Internal definitions used by decode_records
+# -----------------------------------------------------------------------------
+
+def _split_checked(body, parts, key):
+    """
+    Returns the chunks of the array, or None when the body text around the
+    array is not valid JSON.
+    """
+    split = split_json_array(body, parts, key)
+    if split is None:
+        return None
+
+    head, chunks, tail = split
+    try:
+        json.loads(head + tail)
+    except ValueError:
+        return None
+
+    return chunks
+
+
+def _decode_chunk(args):
+    """ Decode and index a chunk, in a worker process; None when not valid. """
+    chunk, fields, ip_fields, indexes = args
+    try:
+        items = json.loads(b'[' + chunk + b']')
+    except ValueError:
+        return None
+
+    return _decode_items(items, fields, ip_fields, indexes)
+
+
+def _decode_items(items, fields, ip_fields, indexes):
+    """
+    Returns the (records, indexes) of the decoded items.  Each index value is
+    the same object as the record, so the record is pickled only once.
+    """
+    if fields is None:
+        records = items
+        getters = {name: _dict_key(spec) for name, spec in indexes.items()}
+    else:
+        ip_indexes = [idx for idx, field in enumerate(fields) if field in ip_fields]
+        records = list()
+        for item in items:
+            values = [item.get(field) for field in fields]
+            for idx in ip_indexes:
+                values[idx] = ip_to_int(values[idx])
+            records.append(tuple(values))
+
+        getters = {name: _tuple_key(fields, spec) for name, spec in indexes.items()}
+
+    built = {name: {get_key(record): record for record in records}
+             for name, get_key in getters.items()}
+
+    return records, built
+
+
+def _dict_key(spec):
+    if isinstance(spec, tuple):
+        return lambda item: tuple(item.get(field) for field in spec)
+    return lambda item: item.get(spec)
+
+
+def _tuple_key(fields, spec):
+    if isinstance(spec, tuple):
+        positions = [fields.index(field) for field in spec]
+        return lambda record: tuple(record[pos] for pos in positions)
+
+    pos = fields.index(spec)
+    return lambda record: record[pos]
@@ -0,0 +1,269 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the faster alternatives to the BeautifulSoup parsing of the
+WebUI search results page.  Each parser returns the same results as the
+`extracto_*` functions found in the search module:
+
+    * "lxml" - uses XPath expressions on the lxml document tree; requires the
+      `lxml` package.
+
+    * "stream" - a single pass over the HTML text using the Python standard
+      library HTMLParser.  No document tree is built.
+"""
+
+from html.parser import HTMLParser
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+
+__all__ = [
+    'extract_lxml',
+    'extract_stream',
+    'SearchResultsParser'
+]
+
+# the results that are found in a table following a header, the value is the
+# name of the ID attribute of the edit links in that table.
+
+TABLE_RESULTS = {
+    'Search results (VLANs):': ('vlans', 'data-vlanid'),
+    'Search results (VRFs):': ('vrfs', 'data-vrfid'),
+    'Search results (PSTN):': ('pstn', 'data-prefixid'),
+    'Search results (Circuits):': ('circuits', 'data-circuitid')
+}
+
+# the results that are found in table rows, the value is the name of the ID
+# attribute of the row.
+
+ROW_RESULTS = {
+    'subnetSearch': ('subnets', 'subnetid'),
+    'ipSearch': ('addresses', 'id')
+}
+
+RESULT_KEYS = ['subnets', 'addresses', 'vlans', 'vrfs', 'pstn', 'circuits']
+
+
+def extract_lxml(content):
+    """
+    Parse the search results page using lxml.
+
+    Parameters
+    ----------
+    content : bytes|str
+        The search results HTML page.
+
+    Returns
+    -------
+    dict[list]
+        The list of found ID values for each type of result.
+    """
+    if lxml_html is None:
+        raise RuntimeError('The lxml parser requires the lxml package')
+
+    results = {key: [] for key in RESULT_KEYS}
+    if not content.strip():
+        return results
+
+    doc = lxml_html.document_fromstring(content)
+
+    for css_class, (key, attr) in ROW_RESULTS.items():
+        results[key] = [str(value) for value in doc.xpath(
+            f"//tr[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]/@{attr}")]
+
+    for text, (key, attr) in TABLE_RESULTS.items():
+        anchor = next((h4 for h4 in doc.iter('h4') if _string(h4) == text), None)
+        if anchor is not None:
+            results[key] = [str(value) for value in anchor.xpath(
+                f"following-sibling::table[1]//a[@data-action='edit']/@{attr}")]
+
+    return results
+
+
+def _string(element):
+    """
+    Returns the text of an lxml element when the element, and each of its
+    descendants, has a single child node; as is the BeautifulSoup `string`
+    attribute.  Returns None otherwise.
+    """
+    children = list(element)
+    if not children:
+        return element.text
+
+    if len(children) == 1 and not element.text and not children[0].tail:
+        return _string(children[0])
+
+    return None
+
+
+def extract_stream(content):
+    """
+    Parse the search results page in a single pass, without building a
+    document tree.
+
+    Parameters
+    ----------
+    content : bytes|str
+        The search results HTML page.
+
+    Returns
+    -------
+    dict[list]
+        The list of found ID values for each type of result.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+
+    parser = SearchResultsParser()
+    parser.feed(content)
+    parser.close()
+    return parser.results
+
+
+class SearchResultsParser(HTMLParser):
+    """
+    Collects the ID values of the search results while the HTML text is fed to
+    the parser.  The text can be fed in any number of pieces; the found ID
+    values are available in the `results` attribute at any time.
+
+    Attributes
+    ----------
+    results : dict[list]
+        The list of found ID values for each type of result.
+
+    on_found : callable (optional)
+        When set, called with (key, ID) for each ID value as it is found.
+    """
+
+    # the HTML elements that never have an end tag.
+
+    VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                     'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+    def __init__(self, on_found=None):
+        super(SearchResultsParser, self).__init__(convert_charrefs=True)
+        self.results = {key: [] for key in RESULT_KEYS}
+        self.on_found = on_found
+
+        # the stack of open elements; the header (h4) currently open; the
+        # results waiting for a table at a given depth; and the tables whose
+        # links are currently collected.
+
+        self._stack = list()
+        self._header = None
+        self._pending = dict()
+        self._tables = list()
+        self._headers_found = set()
+        self._in_text = False
+
+    def _found(self, key, value):
+        self.results[key].append(value)
+        if self.on_found:
+            self.on_found(key, value)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        depth = len(self._stack)
+        self._in_text = False
+
+        if self._header is not None:
+            self._header_child()
+            if tag not in self.VOID_ELEMENTS:
+                self._header[2].append(0)
+
+        if tag == 'tr':
+            for css_class in (attrs.get('class') or '').split():
+                if css_class in ROW_RESULTS:
+                    key, attr = ROW_RESULTS[css_class]
+                    self._found(key, attrs[attr])
+
+        elif tag == 'a' and attrs.get('data-action') == 'edit':
+            for _, key, attr in self._tables:
+                self._found(key, attrs[attr])
+
+        elif tag == 'h4' and self._header is None:
+            self._header = [depth, [], [0], True]
+
+        elif tag == 'table' and depth in self._pending:
+            self._tables.extend((depth, key, attr) for key, attr in self._pending.pop(depth))
+
+        if tag not in self.VOID_ELEMENTS:
+            self._stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_ELEMENTS:
+            self._stack.pop()
+            self._closed(tag, len(self._stack))
+
+    def handle_endtag(self, tag):
+        self._in_text = False
+        if tag not in self._stack:
+            return
+
+        while self._stack:
+            popped = self._stack.pop()
+            self._closed(popped, len(self._stack))
+            if popped == tag:
+                break
+
+    def handle_data(self, data):
+        # the text of a node is given in more than one piece when the text is
+        # split between the pieces fed to the parser.
+
+        if self._header is not None:
+            if not self._in_text:
+                self._header_child()
+            self._header[1].append(data)
+
+        self._in_text = True
+
+    def _header_child(self):
+        """
+        Count a child node of the element open within the header.  The header
+        text is only matched when each element, starting with the header, has a
+        single child; as is the BeautifulSoup `string` attribute.
+        """
+        counts = self._header[2]
+        if counts:
+            counts[-1] += 1
+            if counts[-1] > 1:
+                self._header[3] = False
+
+    def _closed(self, tag, depth):
+        """ Called when the element `tag`, at `depth`, is closed. """
+        if self._header is not None and self._header[0] < depth:
+            self._header[2].pop()
+
+        elif tag == 'h4' and self._header is not None and self._header[0] == depth:
+            _, texts, _, text_only = self._header
+            self._header = None
+
+            result = TABLE_RESULTS.get(''.join(texts)) if text_only else None
+            if result and result[0] not in self._headers_found:
+                self._headers_found.add(result[0])
+                self._pending.setdefault(depth, []).append(result)
+
+        elif tag == 'table':
+            self._tables = [table for table in self._tables if table[0] != depth]
+
+        # the results waiting for a sibling table are dropped when the parent
+        # element is closed.
+
+        for pending_depth in [each for each in self._pending if each > depth]:
+            del self._pending[pending_depth]
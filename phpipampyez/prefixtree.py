@@ -0,0 +1,402 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains an in-memory prefix tree used to answer questions such as
+"which phpIPAM subnet contains this IP address" without calling the API.
+
+    tree = PrefixTree.from_client(client)
+    subnet = tree.longest_match('10.113.29.210')
+
+A tree stores one value per prefix.  phpIPAM allows the same prefix in more
+than one section or VRF, so use `per_space` to create one tree for each:
+
+    trees = PrefixTree.per_space(subnets, key=('sectionId', 'vrfId'))
+    subnet = trees['3', '0'].longest_match('10.113.29.210')
+"""
+
+import ipaddress
+
+from phpipampyez.utils import create_index, fetch_collections
+
+
+__all__ = ['PrefixTree']
+
+
+class PrefixTree(object):
+    """
+    A radix (patricia) tree of the IPv4 and IPv6 subnet prefixes, encoded as
+    integers.  Each prefix stores a value, typically the phpIPAM subnet dict.
+
+    Attributes
+    ----------
+    sections : dict
+        The section data dicts, keyed by section ID, when the tree is created
+        using `from_client` or `from_subnets` with sections.
+
+    duplicates : list[dict]
+        The subnet dicts not stored by `from_subnets` or `from_client`, because
+        the tree already has a subnet with the same prefix; for example the
+        same prefix in two sections.
+    """
+
+    def __init__(self):
+        self.sections = dict()
+        self.duplicates = list()
+        self._roots = {4: _Node(0, 0), 6: _Node(0, 0)}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    # -------------------------------------------------------------------------
+    #                              build the tree
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_subnets(cls, subnets, sections=None):
+        """
+        Create the tree from a list of phpIPAM subnet dicts; the subnet dict is the
+        value stored for each prefix.  The items that are not subnets, for example
+        folders, are ignored.  When more than one subnet has the same prefix the
+        first is stored, and the others are found in the `duplicates` attribute;
+        see `per_space`.
+
+        Parameters
+        ----------
+        subnets : iterable[dict]
+            The subnet data dicts, which provide the "subnet" and "mask" values.
+
+        sections : list[dict] (optional)
+            The section data dicts.
+
+        Returns
+        -------
+        PrefixTree
+        """
+        tree = cls()
+        if sections:
+            tree.sections = create_index(sections)
+
+        for subnet in subnets:
+            network = _subnet_network(subnet)
+            if network is not None and not tree.insert(network, subnet, replace=False):
+                tree.duplicates.append(subnet)
+
+        return tree
+
+    @classmethod
+    def per_space(cls, subnets, key=('sectionId', 'vrfId'), sections=None):
+        """
+        Create one tree for each address space, so that the same prefix can be
+        used in different sections or VRFs.
+
+        Parameters
+        ----------
+        subnets : iterable[dict]
+            The subnet data dicts.
+
+        key : str|tuple|callable
+            The subnet values that identify the address space, in the forms
+            used by `utils.create_index`; by default the section and VRF.
+
+        sections : list[dict] (optional)
+            The section data dicts, set as the `sections` of each tree.
+
+        Returns
+        -------
+        dict[PrefixTree]
+            The trees keyed by the address space key value.
+        """
+        get_key = _space_key(key)
+
+        spaces = dict()
+        for subnet in subnets:
+            spaces.setdefault(get_key(subnet), []).append(subnet)
+
+        return {space: cls.from_subnets(items, sections=sections)
+                for space, items in spaces.items()}
+
+    @classmethod
+    def from_client(cls, client, max_workers=None):
+        """
+        Create the tree from a snapshot of all subnets in all sections.
+
+        Parameters
+        ----------
+        client : PhpIpamClient
+            The client used to fetch the sections and subnets.
+
+        max_workers : int (optional)
+            The maximum number of concurrent API calls.
+
+        Returns
+        -------
+        PrefixTree
+        """
+        res = client.sections.get()
+        res.raise_for_status()
+        sections = res.json()['data']
+
+        subnets = fetch_collections([getattr(client.sections, f"_{each['id']}")._subnets
+                                     for each in sections], max_workers=max_workers)
+
+        return cls.from_subnets(subnets, sections=sections)
+
+    def insert(self, prefix, value, replace=True):
+        """
+        Add the `prefix` to the tree.
+
+        Parameters
+        ----------
+        prefix : str|IPv4Network|IPv6Network
+            For example "10.113.29.0/24"
+
+        value : any
+            The value stored for the prefix
+
+        replace : bool
+            When the prefix is already in the tree, replace its value when True;
+            otherwise keep the existing value.
+
+        Returns
+        -------
+        bool
+            True when the prefix was added; False when it was already in the
+            tree.
+        """
+        version, key, plen = _prefix_key(prefix)
+        width = _WIDTH[version]
+        node = self._roots[version]
+
+        # the default route prefix is stored in the root node.
+
+        if plen == 0:
+            return self._set_value(node, value, replace)
+
+        while True:
+            bit = (key >> (width - 1 - node.plen)) & 1
+            child = node.children[bit]
+
+            if child is None:
+                node.children[bit] = _Node(key, plen, value)
+                self._size += 1
+                return True
+
+            common = min(_common_length(child.key, key, width), child.plen, plen)
+
+            if common == child.plen:
+                if child.plen == plen:
+                    return self._set_value(child, value, replace)
+
+                node = child
+                continue
+
+            # the new prefix is either above the child, or both are below a new
+            # branch node at their common prefix length.
+
+            if common == plen:
+                new = _Node(key, plen, value)
+            else:
+                new = _Node(_mask(key, common, width), common)
+                new.children[(key >> (width - 1 - common)) & 1] = _Node(key, plen, value)
+
+            new.children[(child.key >> (width - 1 - common)) & 1] = child
+            node.children[bit] = new
+            self._size += 1
+            return True
+
+    def _set_value(self, node, value, replace):
+        """ Set the value of an existing node; returns True when the prefix is new. """
+        if node.has_value and not replace:
+            return False
+
+        added = not node.has_value
+        self._size += added
+        node.value, node.has_value = value, True
+        return added
+
+    # -------------------------------------------------------------------------
+    #                                 queries
+    # -------------------------------------------------------------------------
+
+    def longest_match(self, address, default=None):
+        """
+        Returns the value of the most specific prefix that contains `address`, or
+        `default` when no prefix contains the address.
+
+        Parameters
+        ----------
+        address : str|int|IPv4Address|IPv6Address
+            The IP address; an int value is an IPv4 address.
+        """
+        if isinstance(address, int):
+            version, key = 4, address
+        else:
+            address = ipaddress.ip_address(address)
+            version, key = address.version, int(address)
+
+        width = _WIDTH[version]
+        node = self._roots[version]
+        found = default
+
+        while node is not None:
+            if node.plen and (key >> (width - node.plen)) != (node.key >> (width - node.plen)):
+                break
+
+            if node.has_value:
+                found = node.value
+
+            if node.plen == width:
+                break
+
+            node = node.children[(key >> (width - 1 - node.plen)) & 1]
+
+        return found
+
+    def lookup_many(self, addresses, default=None):
+        """
+        Returns the `longest_match` value for each of the addresses.
+
+        Parameters
+        ----------
+        addresses : iterable
+            The IP addresses, see `longest_match`.
+
+        Returns
+        -------
+        list
+        """
+        longest_match = self.longest_match
+        return [longest_match(each, default) for each in addresses]
+
+    def supernets(self, prefix):
+        """
+        Returns the values of the prefixes that contain `prefix`, including an
+        exact match; ordered from the least to the most specific.
+
+        Parameters
+        ----------
+        prefix : str|IPv4Network|IPv6Network
+            For example "10.113.29.0/24"; an IP address is the same as a host
+            prefix, for example "10.113.29.1/32".
+        """
+        version, key, plen = _prefix_key(prefix)
+        width = _WIDTH[version]
+        node = self._roots[version]
+        found = list()
+
+        while node is not None and node.plen <= plen:
+            if node.plen and _mask(key, node.plen, width) != node.key:
+                break
+
+            if node.has_value:
+                found.append(node.value)
+
+            if node.plen == width:
+                break
+
+            node = node.children[(key >> (width - 1 - node.plen)) & 1]
+
+        return found
+
+    def children(self, prefix):
+        """
+        Returns the values of the prefixes contained within `prefix`, excluding an
+        exact match; in address order.
+
+        Parameters
+        ----------
+        prefix : str|IPv4Network|IPv6Network
+            For example "10.113.0.0/16"
+        """
+        version, key, plen = _prefix_key(prefix)
+        width = _WIDTH[version]
+        node = self._roots[version]
+
+        # find the first node at, or below, the prefix.
+
+        while node is not None and node.plen < plen:
+            node = node.children[(key >> (width - 1 - node.plen)) & 1]
+
+        if node is None or _mask(node.key, plen, width) != key:
+            return []
+
+        found = list()
+        stack = [node]
+        while stack:
+            each = stack.pop()
+            if each.has_value and each.plen > plen:
+                found.append(each.value)
+            stack.extend(child for child in reversed(each.children) if child is not None)
+
+        return found
+
+    def overlaps(self, prefix):
+        """
+        Returns the values of the prefixes that overlap `prefix`; that is the
+        supernets, including an exact match, and the children.
+        """
+        return self.supernets(prefix) + self.children(prefix)
+
+
+# -----------------------------------------------------------------------------
+#                Internal definitions used by PrefixTree
+# -----------------------------------------------------------------------------
+
+_WIDTH = {4: 32, 6: 128}
+
+
+class _Node(object):
+    __slots__ = ('key', 'plen', 'value', 'has_value', 'children')
+
+    def __init__(self, key, plen, *value):
+        self.key = key
+        self.plen = plen
+        self.has_value = bool(value)
+        self.value = value[0] if value else None
+        self.children = [None, None]
+
+
+def _mask(key, plen, width):
+    """ Returns the `key` with the bits after the prefix length set to zero. """
+    return (key >> (width - plen)) << (width - plen) if plen else 0
+
+
+def _common_length(key1, key2, width):
+    """ Returns the number of leading bits that are the same in both keys. """
+    return width - (key1 ^ key2).bit_length()
+
+
+def _prefix_key(prefix):
+    """ Returns the (version, network int, prefix length) of the prefix. """
+    network = ipaddress.ip_network(prefix, strict=False)
+    return network.version, int(network.network_address), network.prefixlen
+
+
+def _space_key(key):
+    """ Returns the function that makes the address space key of a subnet dict. """
+    if callable(key):
+        return key
+    if isinstance(key, tuple):
+        return lambda subnet: tuple(subnet.get(each) for each in key)
+    return lambda subnet: subnet.get(key)
+
+
+def _subnet_network(subnet):
+    """ Returns the network of a phpIPAM subnet dict, or None if not a subnet. """
+    try:
+        return ipaddress.ip_network(f"{subnet['subnet']}/{subnet['mask']}", strict=False)
+    except (KeyError, TypeError, ValueError):
+        return None
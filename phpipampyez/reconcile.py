@@ -0,0 +1,380 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the reconciliation of an external inventory of IPv4
+addresses, such as DHCP leases or ARP tables, against the phpIPAM addresses.
+The addresses are kept in sorted NumPy arrays, so that millions of addresses
+are compared with array operations rather than Python loops:
+
+    ipam, subnets = load_ipam(client, max_workers=16)
+    external = Inventory.from_csv('leases.csv', ip='address', hostname='name')
+
+    found = reconcile(ipam, external, subnets)
+    for ip in found.ips('missing'):
+        ...
+
+This module requires the numpy package; "pip install phpipam-pyez[numpy]".
+IPv6 addresses are not supported; these, and any value that is not a valid
+IPv4 address, are counted in the `skipped` value of each Inventory.
+"""
+
+import csv
+import socket
+from itertools import compress
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from phpipampyez.crawler import HierarchyCrawler
+
+
+__all__ = [
+    'Inventory',
+    'Reconciliation',
+    'load_ipam',
+    'subnet_intervals',
+    'reconcile',
+    'ips_to_array',
+    'array_to_ips'
+]
+
+
+def ips_to_array(ips):
+    """
+    Returns the uint32 array of the IPv4 address strings.  The strings are
+    converted in one pass and the resulting bytes used as the array buffer.
+
+    Raises
+    ------
+    OSError
+        When a value is not a valid IPv4 address.
+    """
+    _require_numpy()
+    packed = b''.join(map(_inet_pton4, ips))
+    return np.frombuffer(packed, dtype='>u4').astype(np.uint32)
+
+
+def array_to_ips(array):
+    """ Returns the list of IPv4 address strings of the uint32 array. """
+    packed = np.asarray(array, dtype='>u4').tobytes()
+    return [socket.inet_ntoa(packed[idx:idx + 4]) for idx in range(0, len(packed), 4)]
+
+
+class Inventory(object):
+    """
+    A set of IPv4 addresses, each with an optional host name, kept as a sorted
+    uint32 array of the unique addresses and the aligned array of host names.
+    When an address is given more than once, the first host name is kept.
+
+    Attributes
+    ----------
+    ips : numpy.ndarray[uint32]
+        The sorted unique addresses.
+
+    hostnames : numpy.ndarray[object]
+        The normalized host name of each address; the lower case name without a
+        trailing ".", or "" when there is no host name.
+
+    skipped : int
+        The number of values not included; IPv6, empty and malformed addresses.
+    """
+
+    def __init__(self, ips, hostnames=None, skipped=0):
+        """
+        Parameters
+        ----------
+        ips : array-like
+            The uint32 address values, in any order.
+
+        hostnames : iterable[str] (optional)
+            The host name of each address.
+        """
+        _require_numpy()
+        ips = np.asarray(ips, dtype=np.uint32)
+        if hostnames is None:
+            hostnames = np.full(len(ips), '', dtype=object)
+        else:
+            hostnames = np.array([_normalize_hostname(each) for each in hostnames], dtype=object)
+
+        self.ips, first = np.unique(ips, return_index=True)
+        self.hostnames = hostnames[first]
+        self.skipped = skipped
+
+    def __len__(self):
+        return len(self.ips)
+
+    def __repr__(self):
+        return f'Inventory({len(self)} addresses, skipped={self.skipped})'
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """
+        Create the inventory from an iterable of IP address strings, or of
+        (IP address, host name) tuples.
+        """
+        ips, hostnames = list(), list()
+        for each in pairs:
+            ip, hostname = (each, None) if isinstance(each, str) else each
+            ips.append(ip)
+            hostnames.append(hostname)
+
+        return cls._from_strings(ips, hostnames)
+
+    @classmethod
+    def from_addresses(cls, list_of_dict):
+        """ Create the inventory from phpIPAM address data dicts. """
+        ips, hostnames = list(), list()
+        for item in list_of_dict:
+            ips.append(item.get('ip'))
+            hostnames.append(item.get('hostname'))
+
+        return cls._from_strings(ips, hostnames)
+
+    @classmethod
+    def from_csv(cls, path, ip='ip', hostname='hostname', **reader_options):
+        """
+        Create the inventory from a CSV file with a header row.
+
+        Parameters
+        ----------
+        path : str
+            The CSV file name.
+
+        ip : str
+            The name of the IP address column.
+
+        hostname : str (optional)
+            The name of the host name column; None when there is no host name
+            column.
+
+        Other Parameters
+        ----------------
+        reader_options are passed to `csv.reader`, for example `delimiter`.
+        """
+        with open(path, newline='') as ifile:
+            reader = csv.reader(ifile, **reader_options)
+            header = next(reader)
+            ip_col = header.index(ip)
+            name_col = header.index(hostname) if hostname else None
+
+            ips, hostnames = list(), list()
+            for row in reader:
+                if not row:
+                    continue
+                ips.append(row[ip_col])
+                hostnames.append(row[name_col] if name_col is not None else None)
+
+        return cls._from_strings(ips, hostnames)
+
+    @classmethod
+    def _from_strings(cls, ips, hostnames):
+        keep = [bool(each) and ':' not in each for each in ips]
+        try:
+            array = ips_to_array(compress(ips, keep))
+
+        except OSError:
+            # a malformed value, for example "incomplete" in an ARP table; only
+            # then is each value checked on its own.
+
+            keep = [_is_ipv4(each) for each in ips]
+            array = ips_to_array(compress(ips, keep))
+
+        return cls(array, list(compress(hostnames, keep)), skipped=len(keep) - sum(keep))
+
+
+class Reconciliation(object):
+    """
+    The results of `reconcile`; each set of addresses is a sorted uint32 array.
+
+    Attributes
+    ----------
+    missing : numpy.ndarray
+        The external addresses that are not in phpIPAM.
+
+    stale : numpy.ndarray
+        The phpIPAM addresses that are not in the external inventory.
+
+    conflicts : numpy.ndarray
+        The addresses in both, where both have a host name and the names
+        differ.
+
+    outside : numpy.ndarray
+        The external addresses that are not within any phpIPAM subnet; empty
+        when no subnets were given.
+    """
+    SETS = ('missing', 'stale', 'conflicts', 'outside')
+
+    def __init__(self, missing, stale, conflicts, outside):
+        self.missing = missing
+        self.stale = stale
+        self.conflicts = conflicts
+        self.outside = outside
+
+    def __repr__(self):
+        counts = ', '.join(f'{name}={len(getattr(self, name))}' for name in self.SETS)
+        return f'Reconciliation({counts})'
+
+    def ips(self, name):
+        """ Returns the IP address strings of the set `name`, for example "missing". """
+        return array_to_ips(getattr(self, name))
+
+
+def subnet_intervals(list_of_dict):
+    """
+    Returns the merged (starts, ends) arrays of the IPv4 subnets, as used by
+    `reconcile`.  The arrays are sorted and do not overlap.
+
+    Parameters
+    ----------
+    list_of_dict : iterable[dict]
+        The phpIPAM subnet data dicts; the IPv6 subnets, the folders, and the
+        items without a valid subnet and mask are ignored.
+    """
+    _require_numpy()
+    subnets = [each for each in map(_ipv4_subnet, list_of_dict) if each]
+
+    starts = np.frombuffer(b''.join(packed for packed, _ in subnets), dtype='>u4').astype(np.int64)
+    sizes = np.array([1 << (32 - length) for _, length in subnets], dtype=np.int64)
+    starts = starts & ~(sizes - 1)
+    ends = starts + sizes - 1
+
+    if not len(starts):
+        return starts, ends
+
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], np.maximum.accumulate(ends[order])
+
+    # a new interval starts where the start is beyond the end of all of the
+    # intervals before it.
+
+    new = np.empty(len(starts), dtype=bool)
+    new[0] = True
+    new[1:] = starts[1:] > ends[:-1] + 1
+    group_ends = np.append(np.flatnonzero(new)[1:] - 1, len(starts) - 1)
+
+    return starts[new], ends[group_ends]
+
+
+def reconcile(ipam, external, subnets=None):
+    """
+    Compare the external inventory with the phpIPAM addresses.
+
+    Parameters
+    ----------
+    ipam : Inventory
+        The phpIPAM addresses.
+
+    external : Inventory
+        The external addresses.
+
+    subnets : tuple (optional)
+        The (starts, ends) of the phpIPAM subnets; see `subnet_intervals`.
+
+    Returns
+    -------
+    Reconciliation
+    """
+    missing = np.setdiff1d(external.ips, ipam.ips, assume_unique=True)
+    stale = np.setdiff1d(ipam.ips, external.ips, assume_unique=True)
+
+    both, ipam_idx, ext_idx = np.intersect1d(ipam.ips, external.ips, assume_unique=True,
+                                             return_indices=True)
+    ipam_names = ipam.hostnames[ipam_idx]
+    ext_names = external.hostnames[ext_idx]
+    differ = (ipam_names != '') & (ext_names != '') & (ipam_names != ext_names)
+    conflicts = both[differ.astype(bool)]
+
+    if subnets is None:
+        outside = np.empty(0, dtype=np.uint32)
+    else:
+        starts, ends = subnets
+        values = external.ips.astype(np.int64)
+        idx = np.searchsorted(starts, values, side='right') - 1
+        inside = (idx >= 0) & (values <= ends[np.maximum(idx, 0)]) if len(starts) else \
+            np.zeros(len(values), dtype=bool)
+        outside = external.ips[~inside]
+
+    return Reconciliation(missing, stale, conflicts, outside)
+
+
+def load_ipam(client, max_workers=8, sections=None):
+    """
+    Load the phpIPAM addresses and subnets, using the HierarchyCrawler.
+
+    Parameters
+    ----------
+    client : PhpIpamClient
+
+    max_workers : int
+        The maximum number of concurrent API calls.
+
+    sections : iterable[str] (optional)
+        The names, or ID values, of the sections to load; by default all.
+
+    Returns
+    -------
+    tuple
+        The (Inventory, subnet intervals) values used by `reconcile`.
+    """
+    root = HierarchyCrawler(client, max_workers=max_workers, sections=sections).crawl()
+    nodes = list(root.walk())
+
+    addresses = (node.data for node in nodes if node.kind == 'address')
+    subnets = (node.data for node in nodes if node.kind == 'subnet')
+
+    return Inventory.from_addresses(addresses), subnet_intervals(subnets)
+
+
+# -----------------------------------------------------------------------------
+#                Internal definitions used by the reconciliation
+# -----------------------------------------------------------------------------
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError('The reconciliation requires the numpy package')
+
+
+def _ipv4_subnet(subnet):
+    """
+    Returns the (packed address, prefix length) of a phpIPAM subnet dict, or None
+    if not an IPv4 subnet; for example a folder, or an invalid mask.
+    """
+    if str(subnet.get('isFolder')) == '1':
+        return None
+
+    try:
+        packed, length = _inet_pton4(subnet['subnet']), int(subnet['mask'])
+    except (KeyError, AttributeError, TypeError, ValueError, OSError):
+        return None
+
+    return (packed, length) if 0 <= length <= 32 else None
+
+
+def _inet_pton4(ip):
+    return socket.inet_pton(socket.AF_INET, ip.strip())
+
+
+def _is_ipv4(ip):
+    try:
+        _inet_pton4(ip)
+        return True
+    except (OSError, AttributeError, TypeError):
+        return False
+
+
+def _normalize_hostname(name):
+    return (name or '').strip().rstrip('.').lower()
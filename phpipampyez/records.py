@@ -0,0 +1,172 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the compact record representation of the API data dicts,
+and a container that indexes the records by several keys.  These are used in
+place of the data dicts and `utils.create_index` when working with a large
+number of items; for example:
+
+    records = compact_records(addresses, fields=('id', 'ip', 'hostname', 'subnetId'))
+    index = MultiIndex(records, id='id', ip='ip', hostname='hostname')
+
+    found = index.get('ip', ip_to_int('10.113.29.210'))
+"""
+
+from operator import attrgetter
+from collections import namedtuple
+from collections.abc import Callable
+from functools import lru_cache
+
+from phpipampyez.utils import ip_to_int
+
+
+__all__ = [
+    'record_type',
+    'compact_records',
+    'MultiIndex'
+]
+
+
+@lru_cache(maxsize=None)
+def record_type(fields, name='Record'):
+    """
+    Returns the record class with the given fields.  The records are tuples, and
+    so use much less memory than the data dicts.  The same class is returned for
+    the same fields.
+
+    Parameters
+    ----------
+    fields : tuple[str]
+        The names of the fields; for example ('id', 'ip', 'hostname')
+
+    name : str
+        The class name.
+    """
+    return namedtuple(name, fields)
+
+
+def compact_records(list_of_dict, fields, ip_fields=('ip',), name='Record'):
+    """
+    This function will take a list of dictionaries and return a list of records
+    with only the `fields` values.  The values of the `ip_fields` are stored as
+    integers; see `utils.ip_to_int`.  A field that is missing in the dictionary is
+    stored as None.
+
+    Parameters
+    ----------
+    list_of_dict : iterable[dict]
+        The API data dicts; for example from the `iter_all` controller method.
+
+    fields : tuple[str]
+        The names of the fields to keep.
+
+    ip_fields : tuple[str]
+        The names of the fields that contain an IP address.
+
+    name : str
+        The record class name.
+
+    Returns
+    -------
+    list[Record]
+    """
+    fields = tuple(fields)
+    make = record_type(fields, name)._make
+    ip_indexes = [idx for idx, field in enumerate(fields) if field in ip_fields]
+
+    records = list()
+    for item in list_of_dict:
+        values = [item.get(field) for field in fields]
+        for idx in ip_indexes:
+            values[idx] = ip_to_int(values[idx])
+        records.append(make(values))
+
+    return records
+
+
+class MultiIndex(object):
+    """
+    A container of records that maintains an index for each of several keys.
+    Each index refers to the same records, so there is only one copy of each
+    record regardless of the number of keys.  As with `utils.create_index`, the
+    last record with a given key value is the one found by that key.
+
+    Examples
+    --------
+        index = MultiIndex(records, id='id', ip='ip', name=('hostname', 'subnetId'))
+        index.get('id', '12')
+        index['name'][('web01', '3')]
+    """
+
+    def __init__(self, records=(), **keys):
+        """
+        Parameters
+        ----------
+        records : iterable
+            The records to add.
+
+        Other Parameters
+        ----------------
+        keys define the name of each index, and the key of each index in the same
+        forms used by `utils.create_index`:
+
+            str - a single named field of the record
+
+            tuple - two or more field names that are used to make the key.
+
+            callable - a user-defined callable function; this function would take
+            as a single argument the record; and return the key value.
+        """
+        self.records = list()
+        self._get_keys = {name: _key_func(key) for name, key in keys.items()}
+        self._indexes = {name: dict() for name in keys}
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, name):
+        """ Returns the index dict of the key `name`. """
+        return self._indexes[name]
+
+    def add(self, record):
+        """ Add the record to the container and each index. """
+        self.records.append(record)
+        for name, get_key in self._get_keys.items():
+            self._indexes[name][get_key(record)] = record
+
+    def extend(self, records):
+        """ Add each of the records. """
+        for record in records:
+            self.add(record)
+
+    def get(self, name, key, default=None):
+        """ Returns the record with the `key` value in the index `name`. """
+        return self._indexes[name].get(key, default)
+
+
+def _key_func(key):
+    """ Returns the function that returns the key value of a record. """
+    if isinstance(key, str):
+        return attrgetter(key)
+    elif isinstance(key, tuple):
+        return attrgetter(*key)
+    elif isinstance(key, Callable):
+        return key
+    else:
+        raise ValueError('key is not str|tuple|callable')
@@ -17,10 +17,16 @@ This file contains the code used to execute the "search" tool and return back fo
 """
 
 import json
-from requests.cookies import create_cookie
+import time
+import codecs
+from http import HTTPStatus
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 
 from phpipampyez.utils import expand_ids
+from phpipampyez import parsers
 
 
 DEFAULT_SEARCH_OPTIONS = [
@@ -29,6 +35,17 @@ DEFAULT_SEARCH_OPTIONS = [
 
 SEARCH_OPTIONS = DEFAULT_SEARCH_OPTIONS + ['pstn', 'circuits']
 
+# the client controller used to expand the IDs of each type of result.  The
+# PSTN prefixes are not available in the API, so those IDs are not expanded.
+
+RESULT_CONTROLLERS = {
+    'subnets': 'subnets',
+    'addresses': 'addresses',
+    'vlans': 'vlans',
+    'vrfs': 'vrfs',
+    'circuits': 'circuits'
+}
+
 
 def extracto_subnets(soup):
     found = soup.find_all('tr', attrs={'class': 'subnetSearch'})
@@ -40,37 +57,52 @@ def extracto_addresses(soup):
     return [item.attrs['id'] for item in found]
 
 
-def extracto_vlans(soup):
-    text = 'Search results (VLANs):'
+def extracto_table(soup, text, attr):
     anchor = soup.find('h4', text=text)
     if not anchor:
         return []
 
     table = anchor.find_next_sibling('table')
+    if not table:
+        return []
+
     items = table.find_all('a', attrs={'data-action': 'edit'})
-    return [item['data-vlanid'] for item in items]
+    return [item[attr] for item in items]
+
+
+def extracto_vlans(soup):
+    return extracto_table(soup, 'Search results (VLANs):', 'data-vlanid')
 
 
 def extracto_vrfs(soup):
-    text = 'Search results (VRFs):'
+    return extracto_table(soup, 'Search results (VRFs):', 'data-vrfid')
 
-    anchor = soup.find('h4', text=text)
-    if not anchor:
-        return []
 
-    table = anchor.find_next_sibling('table')
-    items = table.find_all('a', attrs={'data-action': 'edit'})
-    return [item['data-vrfid'] for item in items]
+def extracto_pstn(soup):
+    return extracto_table(soup, 'Search results (PSTN):', 'data-prefixid')
+
+
+def extracto_circuits(soup):
+    return extracto_table(soup, 'Search results (Circuits):', 'data-circuitid')
 
 
-def search(client, find, search_options, expand=False):
+def search_parameters(search_options):
     """
-    Executes the "search" tool found on the WebUI and returns back structured results.
-    See the same method defined in the PhpIpamClient class.
+    Returns the value of the 'search_parameters' cookie used by the WebUI
+    search tool.
+
+    Parameters
+    ----------
+    search_options : list[str]|dict
+        The search options to turn 'on'; all others are turned 'off'.  When
+        empty the DEFAULT_SEARCH_OPTIONS are used.
+
+    Returns
+    -------
+    str
+        The JSON encoded cookie value.
     """
 
-    search_url = client.api.phpipam_host + f'/tools/search/{find}'
-
     # determine the search options based on whether or not the caller provided
     # them.  If they did not, then use the defaults; i.e. those listed in
     # DEFAULT_SEARCH_OPTIONS.  Options specified will be turned 'on' in the
@@ -81,18 +113,38 @@ def search(client, find, search_options, expand=False):
     opt_dict = {opt: ('off', 'on')[opt in opt_settings]
                 for opt in SEARCH_OPTIONS}
 
-    # the search options are specified as a cookie called 'search_parameters';
-    # found this by introspecting the WebUI network calls.  The cookie is a
-    # dict, so we must dump to JSON for the purpose of HTTP usage.
+    # The cookie is a dict, so we must dump to JSON for the purpose of HTTP usage.
 
-    client.webui.cookies.set_cookie(create_cookie('search_parameters', json.dumps(opt_dict)))
+    return json.dumps(opt_dict)
 
-    # The search is invoked as a HTTP GET call, and then we need to parse the HTML results.
-    # using the BeautifulSoup package for this purpose.
 
-    res = client.webui.get(search_url)
-    res.raise_for_status()
-    soup = BeautifulSoup(res.content, 'html.parser')
+def extract_results(content, parser='bs4'):
+    """
+    Parse the HTML content of a WebUI search results page and return the
+    found ID values.
+
+    Parameters
+    ----------
+    content : bytes|str
+        The search results HTML page.
+
+    parser : str
+        The name of the parser, one of PARSERS.  The "bs4" parser is the
+        default; the "lxml" and "stream" parsers are faster and return the
+        same results.  See the parsers module.
+
+    Returns
+    -------
+    dict[list]
+        The list of found ID values for each type of result.
+    """
+
+    if parser != 'bs4':
+        return PARSERS[parser](content)
+
+    # Using the BeautifulSoup package to parse the HTML results.
+
+    soup = BeautifulSoup(content, 'html.parser')
 
     # Store each set of results in separate keys that correspond to the search
     # option keys.  For any option that is either not specified as part of the
@@ -105,8 +157,51 @@ def search(client, find, search_options, expand=False):
     results['addresses'] = extracto_addresses(soup)
     results['vlans'] = extracto_vlans(soup)
     results['vrfs'] = extracto_vrfs(soup)
+    results['pstn'] = extracto_pstn(soup)
+    results['circuits'] = extracto_circuits(soup)
+
+    return results
+
+
+PARSERS = {
+    'bs4': extract_results,
+    'lxml': parsers.extract_lxml,
+    'stream': parsers.extract_stream
+}
+
+
+def search(client, find, search_options, expand=False, max_workers=None,
+           bulk_threshold=None, parser='bs4'):
+    """
+    Executes the "search" tool found on the WebUI and returns back structured results.
+    See the same method defined in the PhpIpamClient class.
+    """
+
+    if not client.webui_logged_in:
+        client.login_webui()
+
+    search_url = client.api.phpipam_host + f'/tools/search/{find}'
+
+    # the search options are specified as a cookie called 'search_parameters';
+    # found this by introspecting the WebUI network calls.  The cookie is sent
+    # with this request only, rather than stored in the webui session, so that
+    # concurrent searches can use different search options.
 
-    # TODO: add pstn and circuits
+    cookies = {'search_parameters': search_parameters(search_options)}
+
+    # The search is invoked as a HTTP GET call, and then we need to parse the HTML results.
+
+    res = client.webui.get(search_url, cookies=cookies)
+    res.raise_for_status()
+
+    instrumentation = client.instrumentation
+    if instrumentation is None:
+        results = extract_results(res.content, parser=parser)
+    else:
+        start = time.perf_counter()
+        results = extract_results(res.content, parser=parser)
+        instrumentation.record('search.parse', 'PARSE', res.status_code, len(res.content),
+                               time.perf_counter() - start)
 
     # If the caller did not request the ID values to be expanded into data
     # dictionaries, then we are all done, and can return the results now.
@@ -114,11 +209,169 @@ def search(client, find, search_options, expand=False):
     if not expand:
         return results
 
-    # If we are here, then we need to transform the list of IDs to list of dicts
+    # If we are here, then we need to transform the list of IDs to list of dicts.
+    # Each result type is expanded at the same time; and each of those will
+    # use up to `max_workers` concurrent API calls.
+
+    controllers = {key: getattr(client, name)
+                   for key, name in RESULT_CONTROLLERS.items()}
 
-    results['subnets'] = expand_ids(client.subnets, results['subnets'])
-    results['addresses'] = expand_ids(client.addresses, results['addresses'])
-    results['vlans'] = expand_ids(client.vlans, results['vlans'])
-    results['vrfs'] = expand_ids(client.vrfs, results['vrfs'])
+    # When using the collection fetch, the found addresses are taken from the
+    # addresses of the found subnets; the other results are taken from the
+    # entire controller collection.  The subnet sub-controllers are cached by
+    # the client, so these are only made when the collection fetch is used.
+
+    collections = dict.fromkeys(controllers)
+    if bulk_threshold is not None:
+        collections['addresses'] = [getattr(controllers['subnets'], f'_{each}')._addresses
+                                    for each in results['subnets']]
+
+    with ThreadPoolExecutor(max_workers=len(controllers)) as executor:
+        futures = {
+            key: executor.submit(expand_ids, controller, results[key],
+                                 max_workers=max_workers,
+                                 bulk_threshold=bulk_threshold,
+                                 collections=collections[key])
+            for key, controller in controllers.items()
+        }
+
+        for key, fut in futures.items():
+            results[key] = fut.result()
 
     return results
+
+
+def iter_search(client, find, search_options, expand=False, max_workers=8,
+                chunk_size=16 * 1024):
+    """
+    Executes the "search" tool found on the WebUI, and yields each found item
+    while the results page is being downloaded.  See the same method defined in
+    the PhpIpamClient class.
+    """
+
+    if not client.webui_logged_in:
+        client.login_webui()
+
+    search_url = client.api.phpipam_host + f'/tools/search/{find}'
+    cookies = {'search_parameters': search_parameters(search_options)}
+
+    found = list()
+    parser = parsers.SearchResultsParser(on_found=lambda key, value: found.append((key, value)))
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    controllers = {key: getattr(client, name)
+                   for key, name in RESULT_CONTROLLERS.items()} if expand else {}
+
+    # each found item is queued, in the order found, with the future of the API
+    # call that expands it; an item is yielded once it and each item before it
+    # are complete.
+
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers) if expand else None
+    done = list()
+
+    def queue_found():
+        for key, value in found:
+            controller = controllers.get(key)
+            fut = executor.submit(controller.get, value) if controller else None
+            pending.append((key, value, fut))
+        found.clear()
+
+    def next_item():
+        item = _expanded(*pending.popleft(), done)
+        done.append(item)
+        return item
+
+    res = client.webui.get(search_url, cookies=cookies, stream=True)
+
+    try:
+        with closing(res):
+            res.raise_for_status()
+
+            for chunk in res.iter_content(chunk_size=chunk_size):
+                parser.feed(decoder.decode(chunk))
+                queue_found()
+                while pending and (pending[0][2] is None or pending[0][2].done()):
+                    yield next_item()
+
+            parser.feed(decoder.decode(b'', final=True))
+            parser.close()
+            queue_found()
+
+        while pending:
+            yield next_item()
+
+    finally:
+        # the caller may stop before all items are yielded; do not wait on the
+        # API calls that have not yet started.
+
+        for _, _, fut in pending:
+            if fut is not None:
+                fut.cancel()
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def _expanded(key, value, fut, done):
+    """
+    Returns the (key, item) of a found item on behalf of `iter_search`.  The
+    RuntimeError args are those of `utils.expand_ids`, with the `done` list of
+    the (key, item) values yielded before the failed ID.
+    """
+    if fut is None:
+        return key, value
+
+    res = fut.result()
+    if res.status_code == HTTPStatus.BAD_REQUEST:
+        raise RuntimeError(f'ERROR processing ID {value}: {res.text}', done, value, res)
+
+    res.raise_for_status()
+    return key, res.json()['data']
+
+
+def search_many(client, terms, search_options, expand=False, max_workers=8, **kwargs):
+    """
+    Executes the "search" tool for each of the terms, concurrently, and returns
+    back the results of each term.  The results are cached, using the client
+    `search_cache`, by the term and search options.  See the same method defined
+    in the PhpIpamClient class.
+    """
+    cache = client.search_cache
+    cookie = search_parameters(search_options)
+
+    def cache_key(term):
+        return term, cookie, expand
+
+    # remove the duplicate terms, and those terms that have cached results.
+
+    found = dict()
+    for term in terms:
+        if term in found:
+            continue
+
+        results = cache.get(cache_key(term)) if cache is not None else None
+        found[term] = None if results is None else _copy_results(results)
+
+    todo = [term for term, results in found.items() if results is None]
+
+    def search_term(term):
+        return search(client, term, search_options=search_options, expand=expand, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for term, results in zip(todo, executor.map(search_term, todo)):
+            if cache is not None:
+                cache.put(cache_key(term), results)
+
+            found[term] = _copy_results(results)
+
+    return found
+
+
+def _copy_results(results):
+    """
+    Returns a copy of the search results, so cached results are not changed.
+    The data dicts of expanded results are copied; their values are not.
+    """
+    return {key: [dict(each) if isinstance(each, dict) else each for each in items]
+            for key, items in results.items()}
@@ -0,0 +1,266 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the local snapshot store of the phpIPAM sections, subnets,
+VLANs, VRFs and addresses.  The snapshot is kept in a SQLite database file so
+that the data can be read without calling the API, and is brought up to date
+using the `sync` method:
+
+    store = SnapshotStore('phpipam.db')
+    store.sync(client)
+
+    addresses = store.find_ip('10.113.29.210')
+
+The sync is incremental only in what it writes to the store: the objects that
+have not changed are not written.  The phpIPAM API has no change log, nor a
+filter of the objects changed since a given time, so by default each sync
+downloads all of the objects, including the addresses of every subnet.  A sync
+with `full=False` downloads only the addresses of the new and changed subnets,
+but can miss address changes; see `SnapshotStore.sync`.
+"""
+
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from phpipampyez.utils import collection_items
+
+
+__all__ = ['SnapshotStore']
+
+
+# the kinds of objects stored, and the client controller of each collection
+# that is fetched as a whole.
+
+KINDS = ['sections', 'subnets', 'vlans', 'vrfs', 'addresses']
+
+COLLECTIONS = {
+    'sections': 'sections',
+    'vlans': 'vlans',
+    'vrfs': 'vrfs'
+}
+
+# the subnet values compared, when the sync is not `full`, to decide which
+# subnet addresses need to be fetched.  These change when the subnet is edited,
+# scanned, or discovered; phpIPAM does not change them when an address of the
+# subnet is edited by a user or the API.
+
+SUBNET_MARKS = ('editDate', 'lastScan', 'lastDiscovery')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    parent_id TEXT,
+    ip TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE INDEX IF NOT EXISTS objects_parent ON objects (kind, parent_id);
+CREATE INDEX IF NOT EXISTS objects_ip ON objects (kind, ip);
+"""
+
+
+class SnapshotStore(object):
+    """
+    The local snapshot of the phpIPAM objects.  Each object is stored as its API
+    data dict, indexed by kind and ID, by parent ID (the section of a subnet, the
+    subnet of an address), and by IP address.
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        Parameters
+        ----------
+        path : str
+            The SQLite database file name; by default the snapshot is only kept
+            in memory.
+        """
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # -------------------------------------------------------------------------
+    #                                  read
+    # -------------------------------------------------------------------------
+
+    def get(self, kind, item_id):
+        """
+        Returns the data dict of the object, or None if the object is not in the
+        snapshot.
+
+        Parameters
+        ----------
+        kind : str
+            One of KINDS, for example "subnets"
+
+        item_id : str
+            The object ID value
+        """
+        row = self.db.execute('SELECT data FROM objects WHERE kind = ? AND id = ?',
+                              (kind, str(item_id))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def all(self, kind):
+        """ Returns the list of data dicts of all objects of the `kind`. """
+        return self._select('kind = ?', kind)
+
+    def section_subnets(self, section_id):
+        """ Returns the list of subnet data dicts of a section. """
+        return self._select('kind = ? AND parent_id = ?', 'subnets', str(section_id))
+
+    def subnet_addresses(self, subnet_id):
+        """ Returns the list of address data dicts of a subnet. """
+        return self._select('kind = ? AND parent_id = ?', 'addresses', str(subnet_id))
+
+    def find_ip(self, ip):
+        """
+        Returns the list of address data dicts with the IP address; there can be
+        more than one when the same IP address is used in different sections.
+        """
+        return self._select('kind = ? AND ip = ?', 'addresses', ip)
+
+    def _select(self, where, *args):
+        rows = self.db.execute(f'SELECT data FROM objects WHERE {where} ORDER BY rowid', args)
+        return [json.loads(row[0]) for row in rows]
+
+    # -------------------------------------------------------------------------
+    #                                  sync
+    # -------------------------------------------------------------------------
+
+    def sync(self, client, max_workers=8, full=True):
+        """
+        Bring the snapshot up to date.  Only the objects that were created,
+        changed, or deleted since the last sync are written to the store; the
+        objects are fetched as described below.
+
+        The sections, subnets, VLANs and VRFs are fetched as collections, and by
+        default the addresses of every subnet are fetched.  When `full` is False
+        the addresses of a subnet are only fetched when the subnet is new, or
+        when its SUBNET_MARKS values have changed.  This is much faster, but
+        phpIPAM does not change these values when an address is edited, so the
+        address changes of the other subnets are not found until the next full
+        sync.
+
+        Parameters
+        ----------
+        client : PhpIpamClient
+            The client used to fetch the objects.
+
+        max_workers : int
+            The maximum number of concurrent API calls.
+
+        full : bool
+            When True, fetch the addresses of every subnet; when False, only the
+            addresses of the new and changed subnets.
+
+        Returns
+        -------
+        dict[dict]
+            The number of objects that were fetched, created, updated and deleted;
+            keyed by kind.
+        """
+        stats = {kind: dict(fetched=0, created=0, updated=0, deleted=0) for kind in KINDS}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            with self.db:
+                previous = {each['id'] for each in self.all('sections')}
+
+                for kind, name in COLLECTIONS.items():
+                    items = _fetch(getattr(client, name))
+                    self._update(stats[kind], kind, {None: items})
+
+                sections = [each['id'] for each in self.all('sections')]
+                subnets = dict(zip(sections, executor.map(
+                    _fetch, [getattr(client.sections, f'_{each}')._subnets for each in sections])))
+
+                # the subnets of the deleted sections are also deleted.
+
+                subnets.update(dict.fromkeys(previous - set(sections), []))
+
+                previous = {each['id']: each for each in self.all('subnets')}
+                self._update(stats['subnets'], 'subnets', subnets, parent_key='sectionId')
+
+                current = {each['id']: each for each in self.all('subnets')}
+                changed = [each for each, subnet in current.items()
+                           if full or _marks(previous.get(each)) != _marks(subnet)]
+
+                addresses = dict(zip(changed, executor.map(
+                    _fetch, [getattr(client.subnets, f'_{each}')._addresses for each in changed])))
+
+                # the addresses of the deleted subnets are also deleted.
+
+                addresses.update(dict.fromkeys(set(previous) - set(current), []))
+                self._update(stats['addresses'], 'addresses', addresses,
+                             parent_key='subnetId', ip_key='ip')
+
+        return stats
+
+    def _update(self, stats, kind, collections, parent_key=None, ip_key=None):
+        """
+        Write the objects of the collections that are different from the stored
+        objects, and delete the stored objects that are no longer found.
+
+        Parameters
+        ----------
+        stats : dict
+            The counters that are updated.
+
+        kind : str
+            The kind of objects
+
+        collections : dict[list]
+            The objects of each collection, keyed by the parent ID of the
+            collection; or None for the collection of all objects of the kind.
+        """
+        for parent_id, items in collections.items():
+            if parent_id is None:
+                rows = self.db.execute('SELECT id, data FROM objects WHERE kind = ?', (kind,))
+            else:
+                rows = self.db.execute('SELECT id, data FROM objects WHERE kind = ? AND parent_id = ?',
+                                       (kind, parent_id))
+
+            stored = dict(rows.fetchall())
+            stats['fetched'] += len(items)
+
+            for item in items:
+                data = json.dumps(item, sort_keys=True)
+                old_data = stored.pop(item['id'], None)
+                if old_data == data:
+                    continue
+
+                stats['updated' if old_data else 'created'] += 1
+                self.db.execute('INSERT OR REPLACE INTO objects (kind, id, parent_id, ip, data) '
+                                'VALUES (?, ?, ?, ?, ?)',
+                                (kind, item['id'], item.get(parent_key), item.get(ip_key), data))
+
+            stats['deleted'] += len(stored)
+            self.db.executemany('DELETE FROM objects WHERE kind = ? AND id = ?',
+                                [(kind, each) for each in stored])
+
+
+# -----------------------------------------------------------------------------
+#                Internal definitions used by SnapshotStore
+# -----------------------------------------------------------------------------
+
+def _fetch(controller):
+    """ Returns the list of items of a collection. """
+    return collection_items(controller.get())
+
+
+def _marks(subnet):
+    return subnet and tuple(subnet.get(each) for each in SUBNET_MARKS)
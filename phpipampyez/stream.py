@@ -0,0 +1,166 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the incremental JSON parser used to iterate over the items
+of an API response body while it is being downloaded.  Only the items of the
+response "data" list are decoded, one at a time, so the memory used does not
+depend on the size of the collection.
+"""
+
+import json
+import codecs
+
+
+__all__ = ['iter_json_items']
+
+
+def iter_json_items(chunks, key='data'):
+    """
+    Yield the items of the list found in the top-level `key` of a JSON object
+    that is provided as a sequence of byte chunks; for example the phpIPAM
+    response body:
+
+        {"code": 200, "success": true, "data": [{...}, {...}], "time": 0.01}
+
+    If the `key` value is not a list, then that value is the only item yielded.
+    If the `key` is not found, then no items are yielded.
+
+    Parameters
+    ----------
+    chunks : iterable[bytes]
+        The JSON text, for example from the Response `iter_content` method.
+
+    key : str
+        The name of the top-level key that contains the list of items.
+
+    Yields
+    ------
+    The decoded items, one at a time.
+
+    Raises
+    ------
+    ValueError
+        When the JSON text is not valid.
+    """
+    reader = _JsonReader(chunks)
+    reader.expect('{')
+
+    if reader.peek() == '}':
+        return
+
+    while True:
+        name = reader.decode()
+        reader.expect(':')
+
+        if name != key:
+            reader.decode()
+
+        elif reader.peek() != '[':
+            yield reader.decode()
+
+        else:
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield reader.decode()
+                    if reader.expect(',]') == ']':
+                        break
+
+        if reader.expect(',}') == '}':
+            return
+
+
+class _JsonReader(object):
+    """
+    Used by `iter_json_items` to decode one JSON value at a time from the
+    stream of text chunks.  The buffer only holds the text that has not yet
+    been decoded.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """ Add the next chunk of text to the buffer; returns False at the end. """
+        if self.eof:
+            return False
+
+        try:
+            data = self.text.decode(next(self.chunks))
+        except StopIteration:
+            data = self.text.decode(b'', final=True)
+            self.eof = True
+
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """ Returns the next non-whitespace character, without consuming it. """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+
+            if not self.more():
+                raise ValueError('unexpected end of JSON text')
+
+    def expect(self, chars):
+        """ Consume the next character, which must be one of `chars`. """
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f'expected one of {chars!r} at {char!r}')
+
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """ Consume and return the next JSON value. """
+        self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+
+            except json.JSONDecodeError:
+                # the value is not complete until more text is read.
+                if not self.more():
+                    raise
+                continue
+
+            # a number at the end of the buffer could be continued in the next
+            # chunk of text; for example "0." is decoded as 0.
+
+            if self._at_end(end) and self.more():
+                continue
+
+            self.pos = end
+            return value
+
+    def _at_end(self, end):
+        """ Returns True if only number characters follow `end` in the buffer. """
+        while end < len(self.buf) and self.buf[end] in '0123456789+-.eE':
+            end += 1
+
+        return end == len(self.buf)
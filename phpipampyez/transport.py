@@ -0,0 +1,183 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the HTTP transport options used by the PhpIpamClient
+sessions: the connection pool size, the retries of idempotent requests, and
+the adaptive rate limit.  See the `PhpIpamClient.configure_transport` method.
+"""
+
+import time
+from threading import Lock
+from http import HTTPStatus
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+__all__ = [
+    'RateLimiter',
+    'mount_adapter'
+]
+
+# the response status codes that denote the server is overloaded.
+
+THROTTLE_STATUS = (HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE)
+
+# the response status codes of the idempotent requests that are retried.
+
+RETRY_STATUS = (HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.INTERNAL_SERVER_ERROR,
+                HTTPStatus.BAD_GATEWAY, HTTPStatus.SERVICE_UNAVAILABLE,
+                HTTPStatus.GATEWAY_TIMEOUT)
+
+
+class RateLimiter(object):
+    """
+    A thread-safe token bucket that limits the number of requests per second.
+    The rate is adaptive: it is reduced each time the server responds with a
+    429 or 503, and then slowly increased back to the maximum rate with each
+    successful response.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=None, decrease=0.5, increase=None):
+        """
+        Parameters
+        ----------
+        rate : float
+            The maximum number of requests per second.
+
+        burst : int (optional)
+            The maximum number of requests sent at once; by default one second
+            worth of requests.
+
+        min_rate : float (optional)
+            The lowest rate used when backing off; by default 1/20 of `rate`.
+
+        decrease : float
+            The rate is multiplied by this value on each 429 or 503 response.
+
+        increase : float (optional)
+            The rate is increased by this value on each successful response; by
+            default 1/20 of `rate`.
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.min_rate = min_rate or rate / 20
+        self.decrease = decrease
+        self.increase = increase or rate / 20
+        self.throttled = 0
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        """ Wait until a request can be sent. """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # the token is taken now, so the callers waiting at the same time are
+            # each given a different time slot.
+
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+    def update(self, status_code):
+        """ Adapt the rate to the response status code. """
+        with self._lock:
+            if status_code in THROTTLE_STATUS:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            elif status_code < HTTPStatus.INTERNAL_SERVER_ERROR:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+def mount_adapter(session, pool_connections=10, pool_maxsize=10, pool_block=False,
+                  retries=0, backoff_factor=0.5, backoff_jitter=0.5, rate_limiter=None):
+    """
+    Mount the HTTP adapter, with the given connection pool and retry options,
+    on the session for both "http://" and "https://" URLs.
+
+    Parameters
+    ----------
+    session : requests.Session
+
+    pool_connections : int
+        The number of hosts for which a connection pool is kept.
+
+    pool_maxsize : int
+        The maximum number of connections kept alive for each host; this should
+        be at least the number of threads that use the session at the same time.
+
+    pool_block : bool
+        When True, a request waits for a connection when all connections of the
+        pool are in use; rather than opening, and then discarding, a new one.
+
+    retries : int
+        The number of times an idempotent request (GET, HEAD, PUT, DELETE,
+        OPTIONS, TRACE) is retried on a connection error or a RETRY_STATUS
+        response.  POST and PATCH requests are never retried.
+
+    backoff_factor : float
+        The delay before each retry is backoff_factor * 2 ** (retry number - 1)
+        seconds.
+
+    backoff_jitter : float
+        A random delay, up to this many seconds, added to each retry delay.
+
+    rate_limiter : RateLimiter (optional)
+        When provided, the rate limiter is also updated by the status code of
+        each retried response.
+    """
+    retry = _AdaptiveRetry(total=retries, backoff_factor=backoff_factor,
+                           status_forcelist=RETRY_STATUS, raise_on_status=False)
+
+    retry.backoff_jitter = backoff_jitter
+    retry.rate_limiter = rate_limiter
+
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          pool_block=pool_block, max_retries=retry)
+
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+
+# -----------------------------------------------------------------------------
+#                Internal definitions used by mount_adapter
+# -----------------------------------------------------------------------------
+
+class _AdaptiveRetry(Retry):
+    """
+    The urllib3 Retry that also updates the rate limiter with the status code of
+    each response that is retried; these are not otherwise seen by the session.
+    """
+    rate_limiter = None
+
+    def new(self, **kw):
+        new = super(_AdaptiveRetry, self).new(**kw)
+        new.rate_limiter = self.rate_limiter
+        new.backoff_jitter = self.backoff_jitter
+        return new
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        if self.rate_limiter is not None and response is not None:
+            self.rate_limiter.update(response.status)
+
+        return super(_AdaptiveRetry, self).increment(method, url, response, error, *args, **kwargs)
@@ -16,14 +16,24 @@
 Set of utility functions to work with the PhpIpamClient instance.
 """
 
+import socket
+import ipaddress
 from operator import itemgetter
-from collections import Callable
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 
+from requests import RequestException
+
 
 __all__ = [
     'create_index',
-    'expand_ids'
+    'expand_ids',
+    'fetch_collections',
+    'collection_found',
+    'collection_items',
+    'ip_to_int',
+    'int_to_ip'
 ]
 
 
@@ -64,13 +74,24 @@ def create_index(list_of_dict, key='id'):
     return {get_key(item): item for item in list_of_dict}
 
 
-def expand_ids(controller, list_of_ids):
+def expand_ids(controller, list_of_ids, max_workers=None, errors=None,
+               bulk_threshold=None, collections=None):
     """
     This function is used to take a list of API ID values (str) and fetch the
-    item data from the API one at a time.  This function returns that list of
-    dicts.  If the API returns a 400 response, this function will raise a
-    RuntimeError; but that exception will contain the list of processed items up
-    to the point of the API failure.
+    item data from the API.  This function returns that list of dicts in the
+    same order as `list_of_ids`.  If the API returns a 400 response, this
+    function will raise a RuntimeError; but that exception will contain the list
+    of processed items up to the point of the API failure.
+
+    By default the items are fetched one at a time.  When `max_workers` is
+    greater than one, the items are fetched concurrently using a thread pool
+    that limits the number of in-flight API calls to `max_workers`.
+
+    When `bulk_threshold` is provided, and there are at least that many IDs for
+    each collection, the items are instead taken from the collection(s) using
+    one API call for each collection.  Any ID that is not found in the
+    collections is then fetched one item at a time; as are all of the IDs when
+    a collection cannot be fetched.
 
     Parameters
     ----------
@@ -81,10 +102,30 @@ def expand_ids(controller, list_of_ids):
     list_of_ids : list[str]
         The list of ID values.
 
+    max_workers : int (optional)
+        The maximum number of concurrent API calls.  When not provided, or 1,
+        the items are fetched sequentially.
+
+    errors : list (optional)
+        When provided, failed API calls do not raise an exception.  Instead a
+        tuple of (ID, Request response object) is appended to this list for
+        each failure and the processing continues with the next ID.  The failed
+        items are not included in the returned list.
+
     Examples
     --------
         list_of_dict = expand_ids(client.addresses, list_of_address_ids)
 
+        # fetch up to 16 addresses at a time, and keep going on failures
+
+        failed = list()
+        list_of_dict = expand_ids(client.addresses, list_of_address_ids,
+                                  max_workers=16, errors=failed)
+
+        # fetch all VLANs at once when there are at least 20 VLAN IDs
+
+        list_of_dict = expand_ids(client.vlans, list_of_vlan_ids, bulk_threshold=20)
+
     Returns
     -------
     list[dict]
@@ -100,12 +141,151 @@ def expand_ids(controller, list_of_ids):
             args[2] = ID of failed API call
             args[3] = Request response object of failed API call
     """
+    # the IDs are used more than once, so any iterable is made a list.
+
+    list_of_ids = list(list_of_ids)
+
+    if collections is None:
+        collections = [controller]
+
+    if bulk_threshold is not None and collections and \
+            len(list_of_ids) >= bulk_threshold * len(collections):
+        return _expand_bulk(controller, list_of_ids, collections,
+                            max_workers=max_workers, errors=errors)
+
+    if not max_workers or max_workers == 1:
+        responses = (controller.get(each) for each in list_of_ids)
+        return _collect_items(list_of_ids, responses, errors)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(controller.get, each) for each in list_of_ids]
+        try:
+            return _collect_items(list_of_ids, (fut.result() for fut in futures), errors)
+        except BaseException:
+            # do not wait on the API calls that have not yet started; the
+            # caller is only going to receive the exception.
+            for fut in futures:
+                fut.cancel()
+            raise
+
+
+def collection_found(res):
+    """
+    Returns False when the response is the 404 that phpIPAM returns for a
+    collection that has no items, and True for any other successful response.
+
+    Raises
+    ------
+    requests.HTTPError
+        When the response is any other error.
+    """
+    if res.status_code == HTTPStatus.NOT_FOUND:
+        return False
+
+    res.raise_for_status()
+    return True
+
+
+def collection_items(res):
+    """
+    Returns the list of items of a collection response; an empty list for an
+    empty collection.  Raises requests.HTTPError as `collection_found`.
+    """
+    return (collection_found(res) and res.json().get('data')) or []
+
+
+def fetch_collections(collections, max_workers=None):
+    """
+    This function is used to fetch the items of one or more collections and
+    return a single list of dicts.  An empty collection, for which the API
+    returns a 404 response, contributes no items.
+
+    Parameters
+    ----------
+    collections : list[controller]
+        The controllers used to fetch the collections.
+
+    max_workers : int (optional)
+        The maximum number of concurrent API calls.
+
+    Examples
+    --------
+        subnet_ids = ['3', '4']
+        list_of_dict = fetch_collections([getattr(client.subnets, f'_{each}')._addresses
+                                          for each in subnet_ids])
+
+    Returns
+    -------
+    list[dict]
+        The items of all collections.
+
+    Raises
+    ------
+    requests.HTTPError
+        When a collection cannot be fetched for any reason other than being
+        empty.
+    """
+    def fetch(collection):
+        return collection_items(collection.get())
+
+    if not max_workers or max_workers == 1 or len(collections) == 1:
+        found = map(fetch, collections)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            found = list(executor.map(fetch, collections))
+
+    return [item for items in found for item in items]
+
+
+def _expand_bulk(controller, list_of_ids, collections, max_workers, errors):
+    """
+    Expand the IDs, on behalf of `expand_ids`, using the items of the
+    collections; and fetch any of the missing items one at a time.
+    """
+    list_of_ids = list(list_of_ids)
+
+    # when a collection cannot be fetched, all of the IDs are fetched one at a
+    # time, so that each failure is handled as given by `errors`.
+
+    try:
+        index = create_index(fetch_collections(collections, max_workers=max_workers))
+    except RequestException:
+        index = dict()
+
+    missing = [each for each in list_of_ids if str(each) not in index]
+    if missing:
+        try:
+            fetched = expand_ids(controller, missing, max_workers=max_workers, errors=errors)
+
+        except RuntimeError as exc:
+            # re-issue the exception so that the items processed ok are those
+            # before the failed ID, in the order of `list_of_ids`.
+
+            failed_id = exc.args[2]
+            index.update(create_index(exc.args[1]))
+            found_list = [index[str(each)] for each in
+                          list_of_ids[:list_of_ids.index(failed_id)]
+                          if str(each) in index]
+            raise RuntimeError(exc.args[0], found_list, failed_id, exc.args[3])
+
+        index.update(create_index(fetched))
+
+    return [index[str(each)] for each in list_of_ids if str(each) in index]
+
+
+def _collect_items(list_of_ids, responses, errors):
+    """
+    Process the API responses, in the order of `list_of_ids`, on behalf of
+    `expand_ids`.
+    """
     found_list = list()
 
-    for each in list_of_ids:
-        res = controller.get(each)
-        code = res.status_code
-        if code == HTTPStatus.BAD_REQUEST:
+    for each, res in zip(list_of_ids, responses):
+        if errors is not None and not res.ok:
+            errors.append((each, res))
+            continue
+
+        if res.status_code == HTTPStatus.BAD_REQUEST:
             raise RuntimeError(f'ERROR processing ID {each}: {res.text}',
                                found_list, each, res)
 
@@ -115,6 +295,38 @@ def expand_ids(controller, list_of_ids):
     return found_list
 
 
+def ip_to_int(ip):
+    """
+    Returns the integer value of an IPv4 or IPv6 address string, or None when
+    `ip` is empty.
+
+    Examples
+    --------
+        ip_to_int('10.113.29.210') == 175185362
+    """
+    if not ip:
+        return None
+
+    if ':' in ip:
+        return int(ipaddress.IPv6Address(ip))
+
+    return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+
+
+def int_to_ip(value, version=4):
+    """
+    Returns the IP address string of the integer value; the reverse of
+    `ip_to_int`.
+    """
+    if value is None:
+        return None
+
+    if version == 4:
+        return socket.inet_ntoa(value.to_bytes(4, 'big'))
+
+    return str(ipaddress.IPv6Address(value))
+
+
 # TODO: experimental
 # def touch(self, **kwargs):
 #     """
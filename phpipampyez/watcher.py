@@ -0,0 +1,254 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+This file contains the watcher that polls phpIPAM controllers and publishes
+the changes to any number of subscribers, so that each consumer does not need
+its own poll loop:
+
+    watcher = ChangeWatcher(client, ['subnets', 'vlans', 'sections/1/subnets'], interval=60)
+
+    watcher.subscribe(lambda event: print(event.kind, event.controller, event.id))
+    events = watcher.subscribe_queue()
+
+    watcher.start()
+    ...
+    event = events.get()
+    ...
+    watcher.stop()
+
+The phpIPAM API does not provide the change log, so each poll fetches the
+controller collections and compares them with the previous poll.  An item is
+updated when its "editDate" value has changed; the items without an editDate
+value are compared in full.
+"""
+
+import queue
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from phpipampyez.utils import collection_items
+
+
+__all__ = [
+    'ChangeWatcher',
+    'ChangeEvent'
+]
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+ChangeEvent = namedtuple('ChangeEvent', ['kind', 'controller', 'id', 'item', 'previous'])
+ChangeEvent.__doc__ = """
+A change found by the ChangeWatcher.
+
+    kind - one of "created", "updated", or "deleted"
+    controller - the controller path, for example "subnets"
+    id - the ID value of the item
+    item - the item data dict; None when deleted
+    previous - the item data dict from the previous poll; None when created
+"""
+
+_logger = logging.getLogger('phpipampyez')
+
+
+class ChangeWatcher(object):
+    """
+    Polls the controller collections and publishes a ChangeEvent for each item
+    that was created, updated, or deleted since the previous poll.
+    """
+
+    def __init__(self, client, controllers, interval=60, max_workers=4, initial_events=False):
+        """
+        Parameters
+        ----------
+        client : PhpIpamClient
+
+        controllers : iterable[str]
+            The controller collection paths, for example "subnets", or
+            "subnets/3/addresses".
+
+        interval : float
+            The number of seconds between each poll, when started.
+
+        max_workers : int
+            The maximum number of collections fetched at the same time.
+
+        initial_events : bool
+            When True, the first poll publishes a "created" event for each item;
+            otherwise the first poll only records the items.
+        """
+        self.client = client
+        self.controllers = [each.strip('/') for each in controllers]
+        self.interval = interval
+        self.max_workers = max_workers
+        self.initial_events = initial_events
+        self.state = dict()
+        self.errors = dict()
+        self.polls = 0
+
+        self._subscribers = list()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # -------------------------------------------------------------------------
+    #                        subscribers
+    # -------------------------------------------------------------------------
+
+    def subscribe(self, callback):
+        """
+        Call `callback(event)` for each ChangeEvent.  The callbacks are called by
+        the poll thread, so should not block; an exception raised by a callback
+        is logged and does not stop the watcher.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def subscribe_queue(self, maxsize=0):
+        """
+        Returns a new queue.Queue that receives each ChangeEvent.  When the queue
+        is full, the poll thread waits for room; use a `maxsize` of 0 for no limit.
+        """
+        events = queue.Queue(maxsize=maxsize)
+        self.subscribe(events.put)
+        return events
+
+    def unsubscribe(self, callback):
+        """ Remove the callback, or the `put` method of a subscribed queue. """
+        with self._lock:
+            self._subscribers.remove(callback)
+
+    # -------------------------------------------------------------------------
+    #                        polling
+    # -------------------------------------------------------------------------
+
+    def poll(self):
+        """
+        Fetch each controller collection once, publish the changes, and return
+        them.  A collection that cannot be fetched is skipped, with the exception
+        found in the `errors` attribute, so its items are not reported deleted.
+
+        Returns
+        -------
+        list[ChangeEvent]
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            fetched = list(executor.map(self._fetch, self.controllers))
+
+        events = list()
+        for controller, (items, error) in zip(self.controllers, fetched):
+            if error is not None:
+                self.errors[controller] = error
+                continue
+
+            self.errors.pop(controller, None)
+            current = {item['id']: item for item in items}
+            previous = self.state.get(controller)
+            self.state[controller] = current
+
+            if previous is None and not self.initial_events:
+                continue
+
+            events.extend(_diff(controller, previous or {}, current))
+
+        self.polls += 1
+        self._publish(events)
+        return events
+
+    def start(self):
+        """ Start polling, every `interval` seconds, in a background thread. """
+        if self._thread is not None:
+            raise RuntimeError('The watcher is already started')
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='phpipam-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """ Stop polling, and wait for the poll thread to finish. """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -------------------------------------------------------------------------
+    #                        internal methods
+    # -------------------------------------------------------------------------
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except Exception:
+                _logger.exception('phpIPAM watcher poll failed')
+
+            self._stopped.wait(self.interval)
+
+    def _fetch(self, controller):
+        """
+        Returns the (items, error) of a collection.  The GET is sent directly by
+        the API session, so the response cache is not used.
+        """
+        try:
+            return collection_items(self.client.api.fast_get(f'/{controller}/')), None
+
+        except Exception as exc:
+            return None, exc
+
+    def _publish(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for event in events:
+            for callback in subscribers:
+                try:
+                    callback(event)
+                except Exception:
+                    _logger.exception('phpIPAM watcher subscriber failed')
+
+
+def _diff(controller, previous, current):
+    """ Returns the ChangeEvents between the previous and current items. """
+    events = list()
+
+    for item_id, item in current.items():
+        old = previous.get(item_id)
+        if old is None:
+            events.append(ChangeEvent(CREATED, controller, item_id, item, None))
+        elif _changed(old, item):
+            events.append(ChangeEvent(UPDATED, controller, item_id, item, old))
+
+    for item_id, old in previous.items():
+        if item_id not in current:
+            events.append(ChangeEvent(DELETED, controller, item_id, None, old))
+
+    return events
+
+
+def _changed(old, new):
+    if old.get('editDate') or new.get('editDate'):
+        return old.get('editDate') != new.get('editDate')
+    return old != new
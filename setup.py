@@ -34,5 +34,10 @@ setup(
     long_description_content_type="text/markdown",
     author='Jeremy Schulman',
     packages=find_packages(),
-    install_requires=requirements()
+    install_requires=requirements(),
+    extras_require={
+        'async': ['httpx'],
+        'lxml': ['lxml'],
+        'numpy': ['numpy']
+    }
 )
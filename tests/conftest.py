@@ -0,0 +1,39 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The pytest fixtures; the tests use the mock phpIPAM server of the benchmarks.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'benchmarks'))
+
+from mockserver import MockPhpIpamServer    # noqa: E402
+from phpipampyez import PhpIpamClient       # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with MockPhpIpamServer(addresses=1000, subnet_size=100, vlans=20, vrfs=5,
+                           sections=2) as mock:
+        yield mock
+
+
+@pytest.fixture
+def client(server):
+    return PhpIpamClient(server.url, 'test', 'test', server.app)
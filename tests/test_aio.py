@@ -0,0 +1,75 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the asyncio client.
+"""
+
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from phpipampyez.aio import AsyncPhpIpamClient, expand_ids     # noqa: E402
+
+
+def run(server, coro_func):
+    async def main():
+        async with AsyncPhpIpamClient(server.url, 'test', 'test', server.app) as client:
+            return await coro_func(client)
+
+    return asyncio.run(main())
+
+
+def test_expand_ids(server):
+    ids = ['7', '3', '999', '5']
+
+    async def expand(client):
+        failed = list()
+        found = await expand_ids(client.vlans, ids, max_concurrency=2, errors=failed)
+        return [each['id'] for each in found], [each for each, _ in failed]
+
+    assert run(server, expand) == (['7', '3', '5'], ['999'])
+
+
+def test_token_renewal(server):
+    async def renew(client):
+        server.expire_token()
+        responses = await asyncio.gather(*(client.vlans.get(str(each)) for each in range(1, 11)))
+        return [res.status_code for res in responses]
+
+    assert run(server, renew) == [200] * 10
+    assert server.logins == 2
+
+
+def test_search_options(server):
+    async def search(client):
+        found = await asyncio.gather(client.search('10.', addresses=True),
+                                     client.search('10.', subnets=True))
+        return found, dict(client.api.cookies)
+
+    found, cookies = run(server, search)
+
+    assert 'search_parameters' not in cookies
+    assert len(found[0]['addresses']) == 1000
+
+    sent = [dict(each.split('=', 1) for each in cookie.split('; '))
+            for cookie in server.search_cookies]
+    options = sorted((json.loads(each['search_parameters'])['addresses'],
+                      json.loads(each['search_parameters'])['subnets']) for each in sent)
+
+    assert options == [('off', 'on'), ('on', 'off')]
+    assert all(each['phpipam'] == 'bench-session' for each in sent)
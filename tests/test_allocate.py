@@ -0,0 +1,88 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the address allocator.
+"""
+
+import pytest
+
+from phpipampyez.allocate import SubnetAllocator, free_blocks, _merge, _gaps
+
+
+@pytest.fixture
+def allocator(server, client):
+    for ip in ('10.0.1.1', '10.0.1.2', '10.0.1.3', '10.0.1.5'):
+        server.create_address({'subnetId': '1', 'ip': ip})
+
+    return SubnetAllocator(client, 1, exclude=['10.0.1.10-10.0.1.20', '10.0.1.240/28'])
+
+
+def test_merge_gaps():
+    merged = _merge([(5, 5), (1, 3), (4, 4), (10, 20), (12, 15), (30, 31)])
+    assert merged == [(1, 5), (10, 20), (30, 31)]
+    assert list(_gaps(merged, 0, 40)) == [(0, 0), (6, 9), (21, 29), (32, 40)]
+    assert list(_gaps(merged, 2, 25)) == [(6, 9), (21, 25)]
+    assert list(_gaps([], 2, 4)) == [(2, 4)]
+
+
+def test_free(allocator):
+    assert allocator.free(7) == ['10.0.1.4', '10.0.1.6', '10.0.1.7', '10.0.1.8',
+                                 '10.0.1.9', '10.0.1.21', '10.0.1.22']
+    assert allocator.free()[-1] == '10.0.1.239'
+    assert len(allocator.free()) == 254 - 4 - 11 - 15
+
+    assert allocator.is_free('10.0.1.4')
+    assert not allocator.is_free('10.0.1.5')
+    assert not allocator.is_free('10.0.1.0')
+    assert not allocator.is_free('10.0.2.1')
+
+
+def test_allocate(server, allocator):
+    results = allocator.allocate(3, description='test')
+
+    assert [(each.ok, each.item['ip']) for each in results] == [
+        (True, '10.0.1.4'), (True, '10.0.1.6'), (True, '10.0.1.7')]
+    assert all(server.index['addresses'][each.id]['description'] == 'test' for each in results)
+
+
+def test_allocate_conflict(server, allocator):
+    # the addresses taken by someone else since the allocator was loaded.
+
+    server.create_address({'subnetId': '1', 'ip': '10.0.1.4'})
+    server.create_address({'subnetId': '1', 'ip': '10.0.1.7'})
+
+    results = allocator.allocate(3)
+
+    assert [(each.ok, each.item['ip']) for each in results] == [
+        (True, '10.0.1.6'), (True, '10.0.1.8'), (True, '10.0.1.9')]
+
+
+def test_allocate_no_retries(server, allocator):
+    server.create_address({'subnetId': '1', 'ip': '10.0.1.4'})
+
+    results = allocator.allocate(2, retries=0)
+
+    assert sorted((each.ok, each.item['ip']) for each in results) == [
+        (False, '10.0.1.4'), (True, '10.0.1.6')]
+
+
+def test_free_blocks(server, client):
+    server.create_address({'subnetId': '1', 'ip': '10.0.1.70'})
+
+    assert free_blocks(client, '1', 26) == ['10.0.1.0/26', '10.0.1.128/26', '10.0.1.192/26']
+    assert free_blocks(client, '1', 25, count=1) == ['10.0.1.128/25']
+
+    with pytest.raises(ValueError):
+        free_blocks(client, '1', 20)
@@ -0,0 +1,79 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the bulk write functions.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from phpipampyez.bulk import bulk_create, bulk_update, bulk_delete
+
+
+def used_ips(server, subnet_id='2'):
+    return {each['ip'] for each in server.children['subnets', 'addresses'].get(subnet_id, [])}
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_create(server, client, max_workers):
+    items = [{'subnetId': '2', 'ip': f'10.0.1.{each}'} for each in range(201, 211)]
+    results = bulk_create(client.addresses, items, max_workers=max_workers)
+
+    assert [(each.ok, each.item['ip']) for each in results] == [
+        (True, each['ip']) for each in items]
+    assert all(server.index['addresses'][each.id]['ip'] == each.item['ip'] for each in results)
+
+
+def test_create_errors(server, client):
+    items = [{'subnetId': '2', 'ip': '10.0.1.201'},
+             {'subnetId': '2', 'ip': '10.0.1.201'},
+             {'subnetId': '2', 'ip': '10.0.1.202', 'editDate': datetime(2026, 1, 1)},
+             {'subnetId': '2', 'ip': '10.0.1.203'}]
+
+    results = bulk_create(client.addresses, items, max_workers=1)
+
+    assert [each.ok for each in results] == [True, False, False, True]
+    assert results[1].response.status_code == 409
+    assert results[2].response is None and 'not JSON serializable' in results[2].error
+    assert {'10.0.1.201', '10.0.1.203'} <= used_ips(server)
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_create_compensate(server, client, max_workers):
+    items = [{'subnetId': '2', 'ip': '10.0.1.201'},
+             {'subnetId': '2', 'ip': '10.0.1.202', 'editDate': datetime(2026, 1, 1)}]
+
+    results = bulk_create(client.addresses, items, max_workers=max_workers, compensate=True)
+
+    assert (results[0].ok, results[0].error) == (False, 'compensated')
+    assert not results[1].ok
+    assert not used_ips(server) & {'10.0.1.201', '10.0.1.202'}
+
+
+def test_update(client):
+    results = bulk_update(client.addresses, [{'id': '1', 'hostname': 'a'},
+                                             {'hostname': 'no id'}])
+
+    assert [each.ok for each in results] == [True, False]
+    assert results[0].id == '1' and results[1].id is None
+
+
+def test_delete(server, client):
+    results = bulk_delete(client.addresses, ['101', '9999', '102'])
+
+    assert [each.ok for each in results] == [True, False, True]
+    assert results[1].response.status_code == 404
+    assert '101' not in server.index['addresses'] and '102' not in server.index['addresses']
@@ -0,0 +1,85 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the response cache and the request coalescer.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from phpipampyez.cache import ResponseCache, RequestCoalescer
+
+
+def test_cache_hit(server, client):
+    client.cache = ResponseCache(ttl=60)
+
+    start = server.requests
+    first = client.subnets.get('3')
+    second = client.subnets.get('3')
+
+    assert first.json() == second.json()
+    assert server.requests - start == 1
+    assert client.cache.stats['hits'] == 1
+
+
+def test_cache_hit_copy(client):
+    client.cache = ResponseCache(ttl=60)
+
+    first = client.subnets.get('3')
+    first.encoding = 'latin-1'
+    second = client.subnets.get('3')
+    second.headers = {}
+    third = client.subnets.get('3')
+
+    assert first is not second and second is not third
+    assert third.encoding != 'latin-1'
+    assert third.headers['Content-Type'] == 'application/json'
+    assert third.json() == first.json()
+
+
+def test_cache_invalidated_by_write(server, client):
+    client.cache = ResponseCache(ttl=60)
+    client.subnets.get()
+    client.subnets.get('3')
+    client.subnets.get('4')
+
+    start = server.requests
+    client.subnets.patch('3', json={'description': 'changed'})
+    client.subnets.get('3')
+    client.subnets.get()
+    client.subnets.get('4')
+
+    # the PATCH, and the GET of the item and its parent collection.
+    assert server.requests - start == 3
+
+
+def test_cache_key_params():
+    assert ResponseCache.make_key('/subnets/', {'params': {'b': 2, 'a': 1}}) == \
+        ResponseCache.make_key('/subnets/', {'params': [('a', 1), ('b', 2)]})
+    assert ResponseCache.make_key('/subnets/', {'stream': True}) is None
+
+
+def test_coalesce(server, client):
+    client.coalescer = RequestCoalescer()
+    server.latency = 0.5
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        responses = list(executor.map(lambda _: client.vlans.get('1'), range(10)))
+
+    assert all(res.ok for res in responses)
+    assert client.coalescer.stats == dict(requests=1, coalesced=9, in_flight=0)
+
+    data = [res.json() for res in responses]
+    data[0]['data']['name'] = 'changed'
+    assert data[1]['data']['name'] == 'VLAN 1'
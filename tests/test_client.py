@@ -0,0 +1,96 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the PhpIpamClient API session: token renewal and the GET template.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from phpipampyez import PhpIpamClient
+
+
+def test_login(server, client):
+    assert server.logins == 1
+    assert client.api.headers['token'] == server.token
+
+
+def test_token_renewal(server, client):
+    server.expire_token()
+
+    res = client.vlans.get('1')
+    assert res.ok and res.json()['data']['id'] == '1'
+    assert server.logins == 2
+
+
+def test_token_renewal_once(server, client):
+    client.configure_transport(pool_maxsize=10)
+    server.latency = 0.05
+    server.expire_token()
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        responses = list(executor.map(lambda each: client.vlans.get(str(each)), range(1, 11)))
+
+    assert all(res.ok for res in responses)
+    assert server.logins == 2
+
+
+def test_token_cache(server, tmp_path):
+    path = str(tmp_path / 'tokens.json')
+    first = PhpIpamClient(server.url, 'test', 'test', server.app, token_cache=path)
+    second = PhpIpamClient(server.url, 'test', 'test', server.app, token_cache=path)
+
+    assert server.logins == 1
+    assert second.api.headers['token'] == first.api.headers['token']
+
+    server.expire_token()
+    assert second.vlans.get('1').ok
+    assert server.logins == 2
+
+    PhpIpamClient(server.url, 'test', 'test', server.app, token_cache=path)
+    assert server.logins == 2
+
+
+def test_session_settings(client):
+    sent = list()
+    send = client.api.send
+
+    def spy(request, **kwargs):
+        sent.append((request, kwargs))
+        return send(request, **kwargs)
+
+    client.api.send = spy
+
+    client.vlans.get('1')
+    client.api.headers['X-Trace'] = 'abc'
+    client.vlans.get('2')
+    client.api.auth = ('user', 'password')
+    client.vlans.get('3')
+    client.api.proxies['http'] = 'http://127.0.0.1:9'
+    client.api.send = lambda request, **kwargs: sent.append((request, kwargs))
+    client.vlans.get('4')
+
+    assert 'X-Trace' not in sent[0][0].headers
+    assert sent[1][0].headers['X-Trace'] == 'abc'
+    assert sent[2][0].headers['Authorization'].startswith('Basic ')
+    assert sent[3][1]['proxies']['http'] == 'http://127.0.0.1:9'
+    assert sent[3][0].url.endswith('/vlans/4/')
+
+
+def test_session_params(client):
+    client.vlans.get('1')
+    client.api.params['filter_by'] = 'number'
+
+    res = client.vlans.get('2')
+    assert res.ok and res.request.url.endswith('/vlans/2/?filter_by=number')
@@ -0,0 +1,102 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the HierarchyCrawler.
+"""
+
+from collections import Counter
+
+import pytest
+
+from phpipampyez.crawler import HierarchyCrawler
+
+
+def kinds(root):
+    return Counter(node.kind for node in root.walk())
+
+
+@pytest.fixture
+def nested(server):
+    # subnets 1 and 3 are both in section 2; 3 is nested in 1.
+    server.index['subnets']['3']['masterSubnetId'] = '1'
+
+
+def test_crawl(client):
+    crawler = HierarchyCrawler(client, max_workers=4)
+    root = crawler.crawl()
+
+    assert kinds(root) == dict(root=1, section=2, subnet=10, address=1000)
+    assert crawler.api_calls == 1 + 2 + 10
+
+
+def test_nested(client, nested):
+    root = HierarchyCrawler(client, addresses=False).crawl()
+    subnets = {node.id: node for node in root.walk() if node.kind == 'subnet'}
+
+    assert subnets['3'].parent is subnets['1']
+    assert subnets['3'].depth == 3
+    assert subnets['1'].parent.id == '2'
+
+
+def test_max_depth(client, nested):
+    assert kinds(HierarchyCrawler(client, max_depth=0).crawl()) == dict(root=1)
+    assert kinds(HierarchyCrawler(client, max_depth=1).crawl()) == dict(root=1, section=2)
+    assert kinds(HierarchyCrawler(client, max_depth=2).crawl()) == \
+        dict(root=1, section=2, subnet=9)
+
+    # the addresses of subnet 3, at depth 4, are not crawled.
+
+    crawler = HierarchyCrawler(client, max_depth=3)
+    assert kinds(crawler.crawl()) == dict(root=1, section=2, subnet=10, address=900)
+    assert crawler.api_calls == 1 + 2 + 9
+
+
+def test_sections(client):
+    for sections in (['Section 1'], ['1']):
+        root = HierarchyCrawler(client, sections=sections, addresses=False).crawl()
+        assert [node.id for node in root.children] == ['1']
+        assert sorted(int(node.id) for node in root.children[0].children) == [2, 4, 6, 8, 10]
+
+
+def test_on_node_order(client, nested):
+    seen = list()
+    root = HierarchyCrawler(client, max_workers=4).crawl(on_node=seen.append)
+
+    assert len(seen) == sum(kinds(root).values()) - 1
+    notified = {id(root)}
+    for node in seen:
+        assert id(node.parent) in notified
+        notified.add(id(node))
+
+
+def test_resume(client, monkeypatch):
+    def fails(*args, **kwargs):
+        raise ConnectionError('subnet 5')
+
+    first = HierarchyCrawler(client, max_workers=1)
+    monkeypatch.setattr(client.subnets._5._addresses, 'get', fails)
+
+    with pytest.raises(ConnectionError):
+        first.crawl()
+
+    assert '/subnets/5/addresses/' not in first.state
+    monkeypatch.undo()
+
+    second = HierarchyCrawler(client, max_workers=4, state=first.state)
+    root = second.crawl()
+
+    assert kinds(root) == dict(root=1, section=2, subnet=10, address=1000)
+    assert second.api_calls == 1 + 2 + 10 - first.api_calls
+    assert second.api_calls >= 1
@@ -0,0 +1,67 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the FederatedClient with two mock phpIPAM servers.
+"""
+
+import pytest
+from requests import HTTPError
+
+from mockserver import MockPhpIpamServer
+from phpipampyez import PhpIpamClient
+from phpipampyez.federation import FederatedClient, INSTANCE_KEY
+
+
+@pytest.fixture
+def other():
+    with MockPhpIpamServer(addresses=200, subnet_size=100, vlans=5, vrfs=1,
+                           sections=1) as mock:
+        yield mock
+
+
+@pytest.fixture
+def fed(server, client, other):
+    return FederatedClient({'us': client,
+                            'eu': PhpIpamClient(other.url, 'test', 'test', other.app)})
+
+
+def test_items(fed):
+    found = fed.vlans.get()
+    assert found.ok
+    assert len(found.items()) == 25
+    assert {each[INSTANCE_KEY] for each in found.items()} == {'us', 'eu'}
+
+
+def test_empty_collection(fed):
+    found = fed.subnets._5._addresses.get()
+    assert found.ok
+    assert {each[INSTANCE_KEY] for each in found.items()} == {'us'}
+
+
+def test_failing_instance(fed, other):
+    del other.data['vlans']
+
+    found = fed.vlans.get()
+    assert not found.ok
+    assert sorted(found.results) == ['us']
+    assert isinstance(found.errors['eu'], HTTPError)
+    assert len(found.items()) == 20
+
+
+def test_expand_ids(fed):
+    tagged = [('us', '3'), ('eu', '2'), ('us', '1')]
+    found = fed.expand_ids('vlans', tagged).merged()
+    assert [(each[INSTANCE_KEY], each['id']) for each in found['vlans']] == \
+        [('us', '3'), ('us', '1'), ('eu', '2')]
@@ -0,0 +1,86 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the process pool decoding of large API responses.
+"""
+
+import json
+
+import pytest
+
+from phpipampyez import parallel
+from phpipampyez.parallel import split_json_array, decode_records
+from phpipampyez.utils import ip_to_int
+
+
+ITEMS = [{'id': str(each), 'ip': f'10.0.{each // 256}.{each % 256}', 'hostname': f'host-{each}'}
+         for each in range(1, 1001)]
+
+
+def body_of(items, **other):
+    return json.dumps(dict(code=200, success=True, data=items, **other)).encode()
+
+
+@pytest.mark.parametrize('parts', [1, 2, 3, 16])
+def test_split(parts):
+    head, chunks, tail = split_json_array(body_of(ITEMS, time=0.1), parts)
+
+    assert len(chunks) == parts
+    assert json.loads(head + b','.join(chunks) + tail)['data'] == ITEMS
+    assert [item for chunk in chunks for item in json.loads(b'[' + chunk + b']')] == ITEMS
+
+
+def test_split_not_found():
+    assert split_json_array(b'{"code": 404, "success": false}', 4) is None
+    assert split_json_array(body_of([]), 4)[1] == [b'']
+
+
+@pytest.fixture
+def in_parallel(monkeypatch):
+    monkeypatch.setattr(parallel, 'MIN_PARALLEL_SIZE', 0)
+
+
+def test_decode(in_parallel):
+    records, indexes = decode_records(body_of(ITEMS), fields=('id', 'ip'),
+                                      indexes={'ip': 'ip', 'both': ('id', 'ip')}, processes=2)
+
+    assert records == [(each['id'], ip_to_int(each['ip'])) for each in ITEMS]
+    assert indexes['ip'][ip_to_int('10.0.1.4')] == ('260', ip_to_int('10.0.1.4'))
+    assert len(indexes['both']) == len(ITEMS)
+
+
+def test_decode_dicts(in_parallel):
+    records, indexes = decode_records(body_of(ITEMS), indexes={'host': 'hostname'}, processes=2)
+    assert records == ITEMS
+    assert indexes['host']['host-7'] == ITEMS[6]
+
+
+def test_split_in_string(in_parallel):
+    # the split text "},{" is found within a string value, so the chunks are not
+    # valid JSON and the body is decoded as a whole.
+
+    items = [dict(each, note='x},{y' * 20) for each in ITEMS]
+    body = body_of(items)
+    assert parallel._split_checked(body, 4, 'data')
+    assert any(parallel._decode_chunk((chunk, None, (), {})) is None
+               for chunk in split_json_array(body, 4)[1])
+
+    records, _ = decode_records(body, fields=('id', 'note'), processes=2)
+    assert records == [(each['id'], each['note']) for each in items]
+
+
+def test_decode_small():
+    records, indexes = decode_records(body_of(ITEMS[:3]), indexes={'id': 'id'})
+    assert records == ITEMS[:3] and list(indexes['id']) == ['1', '2', '3']
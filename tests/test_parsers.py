@@ -0,0 +1,66 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests that the search results parsers return the same results.
+"""
+
+import pytest
+
+from pages import search_page
+from phpipampyez.parsers import SearchResultsParser
+from phpipampyez.search import PARSERS, extract_results
+
+
+PAGES = [
+    search_page(),
+    search_page(addresses=3),
+    search_page(subnets=5, addresses=40, vlans=3, vrfs=2, pstn=2, circuits=4),
+    search_page(vlans=1, circuits=1)
+]
+
+
+@pytest.mark.parametrize('page', PAGES)
+@pytest.mark.parametrize('parser', sorted(set(PARSERS) - {'bs4'}))
+def test_same_results(page, parser):
+    assert extract_results(page, parser=parser) == extract_results(page, parser='bs4')
+
+
+def test_results():
+    found = extract_results(PAGES[2], parser='bs4')
+    assert {key: len(values) for key, values in found.items()} == dict(
+        subnets=5, addresses=40, vlans=3, vrfs=2, pstn=2, circuits=4)
+    assert found['addresses'][:3] == ['1', '2', '3']
+
+
+@pytest.mark.parametrize('size', [1, 13, 4096])
+def test_fed_in_pieces(size):
+    page = PAGES[2]
+    found = list()
+    parser = SearchResultsParser(on_found=lambda key, value: found.append((key, value)))
+    for idx in range(0, len(page), size):
+        parser.feed(page[idx:idx + size])
+    parser.close()
+
+    expected = extract_results(page, parser='bs4')
+    assert parser.results == expected
+    assert sorted(found) == sorted((key, value) for key, values in expected.items()
+                                   for value in values)
+
+
+@pytest.mark.parametrize('parser', sorted(PARSERS))
+def test_client_search(client, parser):
+    found = client.search('10.', expand=True, parser=parser, addresses=True, subnets=True)
+    assert [each['id'] for each in found['subnets']] == [str(each) for each in range(1, 11)]
+    assert len(found['addresses']) == 1000
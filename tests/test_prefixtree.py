@@ -0,0 +1,121 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the PrefixTree against a brute force search of the prefixes.
+"""
+
+import random
+import ipaddress
+
+import pytest
+
+from phpipampyez.prefixtree import PrefixTree
+
+
+def random_networks(rand, count, version):
+    width = 32 if version == 4 else 128
+    base = int(ipaddress.ip_address('10.0.0.0' if version == 4 else '2001:db8::'))
+    span = 16 if version == 4 else 32
+    networks = set()
+    while len(networks) < count:
+        plen = rand.randint(width - span - 4, width)
+        key = base + rand.getrandbits(span)
+        networks.add(ipaddress.ip_network((key, plen), strict=False))
+    return sorted(networks)
+
+
+@pytest.fixture(params=[4, 6])
+def networks(request):
+    return random_networks(random.Random(request.param), 500, request.param)
+
+
+@pytest.fixture
+def tree(networks):
+    tree = PrefixTree()
+    for network in networks:
+        assert tree.insert(network, network) is True
+    return tree
+
+
+def test_longest_match(networks, tree):
+    rand = random.Random(7)
+    for network in rand.sample(networks, 100):
+        for address in (network.network_address, network.broadcast_address,
+                        network.network_address + rand.randrange(network.num_addresses)):
+            matches = [each for each in networks if address in each]
+            expected = max(matches, key=lambda each: each.prefixlen)
+            assert tree.longest_match(address) == expected
+            assert tree.longest_match(str(address)) == expected
+
+
+def test_no_match(tree):
+    assert tree.longest_match('192.0.2.1') is None
+    assert tree.longest_match('2001:db9::1', default='none') == 'none'
+
+
+def test_supernets_children(networks, tree):
+    for network in random.Random(3).sample(networks, 50):
+        supernets = sorted((each for each in networks if network.subnet_of(each)),
+                           key=lambda each: each.prefixlen)
+        children = sorted(each for each in networks
+                          if each != network and each.subnet_of(network))
+
+        assert tree.supernets(network) == supernets
+        assert tree.children(network) == children
+        assert tree.overlaps(network) == supernets + children
+
+
+def test_insert_replace():
+    tree = PrefixTree()
+    assert tree.insert('10.0.0.0/8', 'a')
+    assert not tree.insert('10.0.0.0/8', 'b', replace=False)
+    assert tree.longest_match('10.1.1.1') == 'a'
+    assert not tree.insert('10.0.0.0/8', 'c')
+    assert tree.longest_match('10.1.1.1') == 'c'
+    assert tree.insert('0.0.0.0/0', 'default')
+    assert tree.longest_match('11.0.0.1') == 'default'
+    assert len(tree) == 2
+
+
+SUBNETS = [
+    {'id': '1', 'subnet': '10.0.0.0', 'mask': '16', 'sectionId': '1', 'vrfId': '0'},
+    {'id': '2', 'subnet': '10.0.1.0', 'mask': '24', 'sectionId': '1', 'vrfId': '0'},
+    {'id': '3', 'subnet': '10.0.1.0', 'mask': '24', 'sectionId': '2', 'vrfId': '0'},
+    {'id': '4', 'subnet': '10.0.1.0', 'mask': '24', 'sectionId': '2', 'vrfId': '5'},
+    {'id': '5', 'subnet': None, 'mask': '', 'sectionId': '1', 'isFolder': '1'}
+]
+
+
+def test_duplicates():
+    tree = PrefixTree.from_subnets(SUBNETS)
+    assert len(tree) == 2
+    assert tree.longest_match('10.0.1.1')['id'] == '2'
+    assert [each['id'] for each in tree.duplicates] == ['3', '4']
+
+
+def test_per_space():
+    trees = PrefixTree.per_space(SUBNETS)
+    found = {space: tree.longest_match('10.0.1.1')['id']
+             for space, tree in trees.items() if len(tree)}
+
+    assert found == {('1', '0'): '2', ('2', '0'): '3', ('2', '5'): '4'}
+    assert not any(tree.duplicates for tree in trees.values())
+
+
+def test_from_client(client):
+    tree = PrefixTree.from_client(client, max_workers=4)
+    assert len(tree) == 10
+    assert tree.longest_match('10.0.3.1')['id'] == '3'
+    assert sorted(tree.sections) == ['1', '2']
@@ -0,0 +1,115 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the reconciliation of an external inventory against phpIPAM.
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from phpipampyez.reconcile import (     # noqa: E402
+    Inventory, reconcile, subnet_intervals, load_ipam, ips_to_array, array_to_ips)
+
+
+IPAM = [
+    {'ip': '10.0.0.1', 'hostname': 'a.example.com'},
+    {'ip': '10.0.0.2', 'hostname': 'B.example.com.'},
+    {'ip': '10.0.0.3', 'hostname': 'c.example.com'},
+    {'ip': '10.0.0.4', 'hostname': None},
+    {'ip': '2001:db8::1', 'hostname': 'v6'},
+    {'ip': '', 'hostname': 'empty'}
+]
+
+EXTERNAL = [
+    ('10.0.0.2', 'b.example.com'),
+    ('10.0.0.3', 'other.example.com'),
+    ('10.0.0.4', 'd.example.com'),
+    ('10.0.9.1', 'new.example.com'),
+    ('192.168.1.1', None),
+    ('10.0.0.2', 'duplicate')
+]
+
+SUBNETS = [
+    {'subnet': '10.0.0.0', 'mask': '24'},
+    {'subnet': '10.0.9.0', 'mask': '25'},
+    {'subnet': '0.0.0.0', 'mask': '0', 'isFolder': '1'},
+    {'subnet': None, 'mask': ''},
+    {'subnet': '10.1.0.0', 'mask': ''},
+    {'subnet': '10.2.0.0', 'mask': '33'},
+    {'subnet': 'fd00::', 'mask': '64'}
+]
+
+
+def test_ips_array():
+    ips = ['10.0.0.1', '255.255.255.255', '0.0.0.0']
+    assert array_to_ips(ips_to_array(ips)) == ips
+
+
+def test_inventory():
+    ipam = Inventory.from_addresses(IPAM)
+    assert len(ipam) == 4 and ipam.skipped == 2
+    assert list(ipam.hostnames) == ['a.example.com', 'b.example.com', 'c.example.com', '']
+
+    external = Inventory.from_pairs(EXTERNAL)
+    assert len(external) == 5
+    assert external.hostnames[list(external.ips).index(ips_to_array(['10.0.0.2'])[0])] == \
+        'b.example.com'
+
+
+def test_inventory_malformed(tmp_path):
+    found = Inventory.from_pairs(['incomplete', ('10.0.0.1', 'a'), ('10.0.0.300', 'b'),
+                                  (None, 'c'), ' 10.0.0.2 '])
+    assert array_to_ips(found.ips) == ['10.0.0.1', '10.0.0.2']
+    assert list(found.hostnames) == ['a', ''] and found.skipped == 3
+
+    path = tmp_path / 'arp.csv'
+    path.write_text('ip,hostname\n10.0.0.1,a\nincomplete,b\n')
+    assert Inventory.from_csv(str(path)).skipped == 1
+
+
+def test_subnet_intervals():
+    starts, ends = subnet_intervals(SUBNETS + [{'subnet': '10.0.0.128', 'mask': '25'},
+                                               {'subnet': '10.0.1.0', 'mask': '24'}])
+    assert array_to_ips(starts) == ['10.0.0.0', '10.0.9.0']
+    assert array_to_ips(ends) == ['10.0.1.255', '10.0.9.127']
+
+
+def test_reconcile():
+    found = reconcile(Inventory.from_addresses(IPAM), Inventory.from_pairs(EXTERNAL),
+                      subnet_intervals(SUBNETS))
+
+    assert found.ips('missing') == ['10.0.9.1', '192.168.1.1']
+    assert found.ips('stale') == ['10.0.0.1']
+    assert found.ips('conflicts') == ['10.0.0.3']
+    assert found.ips('outside') == ['192.168.1.1']
+
+
+def test_reconcile_csv(tmp_path):
+    path = tmp_path / 'leases.csv'
+    path.write_text('address,name\n10.0.0.1,A.example.com\n10.0.0.9,\n\n')
+
+    external = Inventory.from_csv(str(path), ip='address', hostname='name')
+    found = reconcile(Inventory.from_addresses(IPAM), external)
+
+    assert found.ips('missing') == ['10.0.0.9']
+    assert found.ips('stale') == ['10.0.0.2', '10.0.0.3', '10.0.0.4']
+    assert found.ips('conflicts') == [] and found.ips('outside') == []
+
+
+def test_load_ipam(client):
+    ipam, (starts, ends) = load_ipam(client, max_workers=4)
+    assert len(ipam) == 1000
+    assert len(starts) == 1 and array_to_ips(ends) == ['10.0.10.255']
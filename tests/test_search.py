@@ -0,0 +1,107 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the WebUI search streamed by iter_search.
+"""
+
+import time
+
+import pytest
+
+from pages import search_page
+
+
+def found_on_page(**counts):
+    return [(key, str(each)) for key in ('subnets', 'addresses', 'vlans', 'vrfs')
+            for each in range(1, counts.get(key, 0) + 1)]
+
+
+@pytest.mark.parametrize('chunk_size', [64, 16 * 1024])
+def test_page_order(server, client, chunk_size):
+    server.search_page = search_page(subnets=3, addresses=50, vlans=4, vrfs=2).encode()
+
+    found = list(client.iter_search('10.', chunk_size=chunk_size))
+    assert found == found_on_page(subnets=3, addresses=50, vlans=4, vrfs=2)
+
+
+def test_expand(server, client):
+    server.search_page = search_page(subnets=3, addresses=50, vlans=4).encode()
+
+    found = list(client.iter_search('10.', expand=True, max_workers=4, chunk_size=256))
+    assert [(key, item['id']) for key, item in found] == \
+        found_on_page(subnets=3, addresses=50, vlans=4)
+    assert found[3][1] == client.addresses.get('1').json()['data']
+
+
+def test_expand_failed(server, client):
+    # the mock server has no circuits controller, so it responds with a 400.
+
+    server.search_page = search_page(vlans=3, circuits=2).encode()
+
+    yielded = list()
+    with pytest.raises(RuntimeError) as info:
+        for each in client.iter_search('10.', expand=True, max_workers=2):
+            yielded.append(each)
+
+    message, done, failed_id, res = info.value.args
+    assert 'ERROR processing ID 1' in message
+    assert done == yielded and [item['id'] for _, item in done] == ['1', '2', '3']
+    assert failed_id == '1' and res.status_code == 400
+
+
+def test_close_early(server, client):
+    server.search_page = search_page(addresses=200).encode()
+    client.login_webui()
+    server.latency = 0.02
+
+    start = server.requests
+    found = client.iter_search('10.', expand=True, max_workers=1)
+    assert next(found)[1]['id'] == '1'
+    found.close()
+
+    # the API calls that had not started are cancelled.
+
+    time.sleep(0.5)
+    assert server.requests - start < 10
+
+
+def test_search_bulk(server, client):
+    server.search_page = search_page(subnets=2, addresses=150, vlans=20).encode()
+
+    found = client.search('10.', expand=True, max_workers=4)
+    assert [each['id'] for each in found['addresses']] == [str(each) for each in range(1, 151)]
+    assert not [name for name in vars(client.subnets) if name[1:].isdigit()]
+
+    start = server.requests
+    bulk = client.search('10.', expand=True, bulk_threshold=10)
+    assert bulk == found
+
+    # the page, the 2 subnets, the addresses of the 2 subnets, and the vlans.
+
+    assert server.requests - start == 1 + 2 + 2 + 1
+
+
+def test_search_many_cache(server, client):
+    server.search_page = search_page(subnets=2, vlans=3).encode()
+
+    first = client.search_many(['10.', '10.'], expand=True)['10.']
+    first['vlans'][0]['name'] = 'changed'
+    first['subnets'].clear()
+
+    start = server.requests
+    second = client.search_many(['10.'], expand=True)['10.']
+    assert server.requests == start
+    assert second['vlans'][0]['name'] == 'VLAN 1'
+    assert len(second['subnets']) == 2
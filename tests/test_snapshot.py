@@ -0,0 +1,92 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the SnapshotStore delta sync.
+"""
+
+import pytest
+
+from phpipampyez.snapshot import SnapshotStore
+
+
+@pytest.fixture
+def store():
+    store = SnapshotStore()
+    yield store
+    store.close()
+
+
+def counts(stats, kind):
+    return {key: value for key, value in stats[kind].items() if key != 'fetched'}
+
+
+def test_initial_sync(client, store):
+    stats = store.sync(client)
+
+    assert stats['addresses'] == dict(fetched=1000, created=1000, updated=0, deleted=0)
+    assert stats['subnets']['created'] == 10
+    assert len(store.subnet_addresses('3')) == 100
+    assert store.get('vlans', 4)['name'] == 'VLAN 4'
+    assert store.find_ip(store.get('addresses', '5')['ip'])[0]['id'] == '5'
+
+
+def test_no_changes(client, store):
+    store.sync(client)
+    stats = store.sync(client)
+    assert all(value == 0 for kind in stats for value in counts(stats, kind).values())
+
+
+def test_changes(server, client, store):
+    store.sync(client)
+
+    server.index['addresses']['5'].update(hostname='changed', editDate='2026-01-01 00:00:00')
+    server.index['subnets']['2']['description'] = 'changed'
+    server.data['vlans'].pop()
+
+    stats = store.sync(client)
+
+    assert counts(stats, 'addresses') == dict(created=0, updated=1, deleted=0)
+    assert counts(stats, 'subnets') == dict(created=0, updated=1, deleted=0)
+    assert counts(stats, 'vlans') == dict(created=0, updated=0, deleted=1)
+    assert store.get('addresses', '5')['hostname'] == 'changed'
+    assert store.get('vlans', '20') is None
+
+
+def test_not_full(server, client, store):
+    store.sync(client)
+
+    # the address edit is not found, as its subnet has not changed.
+
+    server.index['addresses']['5']['hostname'] = 'changed'
+    stats = store.sync(client, full=False)
+    assert stats['addresses']['fetched'] == 0
+
+    server.index['subnets']['1']['editDate'] = '2026-01-01 00:00:00'
+    stats = store.sync(client, full=False)
+    assert stats['addresses']['fetched'] == 100
+    assert stats['addresses']['updated'] == 1
+
+
+def test_deleted_subnet(server, client, store):
+    store.sync(client)
+
+    subnet = server.index['subnets'].pop('10')
+    server.data['subnets'].remove(subnet)
+    server.children['sections', 'subnets'][subnet['sectionId']].remove(subnet)
+
+    stats = store.sync(client)
+    assert stats['subnets']['deleted'] == 1
+    assert stats['addresses']['deleted'] == 100
+    assert store.subnet_addresses('10') == []
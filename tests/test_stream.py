@@ -0,0 +1,72 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the streaming JSON decoder.
+"""
+
+import json
+
+import pytest
+
+from phpipampyez.stream import iter_json_items
+
+
+BODY = {
+    'code': 200,
+    'success': True,
+    'message': 'with "quotes", {braces} and [brackets]',
+    'data': [{'id': str(each), 'hostname': f'host-{each}', 'note': 'tab\t, "é" ☃',
+              'tags': [each, {'nested': [None, True, 1.5]}]}
+             for each in range(50)],
+    'time': 0.01
+}
+
+
+def chunked(text, size):
+    body = text.encode()
+    return [body[idx:idx + size] for idx in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 100000])
+def test_chunked(size):
+    text = json.dumps(BODY, ensure_ascii=False)
+    assert list(iter_json_items(chunked(text, size))) == BODY['data']
+
+
+def test_whitespace():
+    text = json.dumps(BODY, indent=4)
+    assert list(iter_json_items(chunked(text, 5))) == BODY['data']
+
+
+@pytest.mark.parametrize('body, items', [
+    ({}, []),
+    ({'code': 404, 'success': False}, []),
+    ({'data': []}, []),
+    ({'data': {'id': '1'}}, [{'id': '1'}]),
+    ({'data': None}, [None])
+])
+def test_values(body, items):
+    assert list(iter_json_items(chunked(json.dumps(body), 3))) == items
+
+
+def test_not_valid():
+    with pytest.raises(ValueError):
+        list(iter_json_items(chunked('{"data": [{"id": 1}, {"id": }]}', 4)))
+
+
+def test_iter_all(client):
+    assert list(client.subnets._2._addresses.iter_all(chunk_size=37)) == \
+        client.subnets._2._addresses.get().json()['data']
+    assert list(client.subnets._999._addresses.iter_all()) == []
@@ -0,0 +1,83 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the utils functions.
+"""
+
+import random
+
+import pytest
+from requests import HTTPError
+
+from phpipampyez.utils import expand_ids, fetch_collections, ip_to_int, int_to_ip
+
+
+def test_expand_ids_order(client):
+    ids = [str(each) for each in random.Random(1).sample(range(1, 1001), 50)]
+
+    assert [each['id'] for each in expand_ids(client.addresses, ids)] == ids
+    assert [each['id'] for each in expand_ids(client.addresses, ids, max_workers=8)] == ids
+    assert [each['id'] for each in expand_ids(client.addresses, iter(ids), max_workers=8)] == ids
+
+
+def test_expand_ids_errors(client):
+    failed = list()
+    found = expand_ids(client.vlans, ['1', '999', '2'], max_workers=4, errors=failed)
+
+    assert [each['id'] for each in found] == ['1', '2']
+    assert [(each, res.status_code) for each, res in failed] == [('999', 404)]
+
+
+def test_expand_ids_bad_request(client):
+    with pytest.raises(RuntimeError) as info:
+        expand_ids(client.bogus, ['1', '2'])
+
+    message, found, failed_id, res = info.value.args
+    assert found == [] and failed_id == '1' and res.status_code == 400
+
+
+def test_expand_ids_bulk(server, client):
+    ids = [str(each) for each in range(150, 101, -1)] + ['950']
+    collections = [client.subnets._2._addresses]
+
+    start = server.requests
+    found = expand_ids(client.addresses, ids, bulk_threshold=10, collections=collections)
+
+    assert [each['id'] for each in found] == ids
+    assert server.requests - start == 2
+
+
+def test_expand_ids_bulk_failed(client):
+    failed = list()
+    found = expand_ids(client.vlans, ['1', '999', '2'], bulk_threshold=1,
+                       collections=[client.bogus], errors=failed)
+
+    assert [each['id'] for each in found] == ['1', '2']
+    assert [(each, res.status_code) for each, res in failed] == [('999', 404)]
+
+
+def test_fetch_collections(client):
+    items = fetch_collections([client.subnets._1._addresses, client.subnets._999._addresses],
+                              max_workers=2)
+    assert len(items) == 100
+
+    with pytest.raises(HTTPError):
+        fetch_collections([client.bogus])
+
+
+@pytest.mark.parametrize('ip', ['10.1.2.3', '0.0.0.0', '255.255.255.255', '2001:db8::1'])
+def test_ip_int(ip):
+    version = 6 if ':' in ip else 4
+    assert int_to_ip(ip_to_int(ip), version) == ip
@@ -0,0 +1,136 @@
+# Copyright 2019 Jeremy Schulman, nwkautomaniac@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests of the ChangeWatcher.
+"""
+
+import pytest
+from requests import HTTPError
+
+from phpipampyez.watcher import ChangeWatcher
+
+
+def changes(events):
+    return sorted((each.kind, each.controller, each.id) for each in events)
+
+
+def add_vlan(server, vlan_id):
+    vlan = {'id': vlan_id, 'number': vlan_id, 'name': f'VLAN {vlan_id}'}
+    server.data['vlans'].append(vlan)
+    server.index['vlans'][vlan_id] = vlan
+
+
+@pytest.fixture
+def watcher(client):
+    return ChangeWatcher(client, ['vlans', '/subnets/2/addresses/'], max_workers=2)
+
+
+def test_first_poll(client, watcher):
+    assert watcher.poll() == []
+    assert len(watcher.state['vlans']) == 20
+    assert len(watcher.state['subnets/2/addresses']) == 100
+
+    initial = ChangeWatcher(client, ['vlans'], initial_events=True)
+    assert changes(initial.poll()) == [('created', 'vlans', str(each))
+                                       for each in sorted(range(1, 21), key=str)]
+
+
+def test_diff(server, watcher):
+    watcher.poll()
+
+    add_vlan(server, '21')
+    server.index['vlans']['3']['name'] = 'changed'
+    server.data['vlans'].remove(server.index['vlans'].pop('4'))
+
+    # an address is updated only when its editDate has changed.
+
+    server.index['addresses']['101']['hostname'] = 'changed'
+    server.index['addresses']['102'].update(hostname='changed', editDate='2026-01-01 00:00:00')
+
+    events = watcher.poll()
+    assert changes(events) == [('created', 'vlans', '21'),
+                               ('deleted', 'vlans', '4'),
+                               ('updated', 'subnets/2/addresses', '102'),
+                               ('updated', 'vlans', '3')]
+
+    updated = next(each for each in events if each.id == '3')
+    assert (updated.previous['name'], updated.item['name']) == ('VLAN 3', 'changed')
+
+    deleted = next(each for each in events if each.id == '4')
+    assert deleted.item is None and deleted.previous['name'] == 'VLAN 4'
+
+    assert watcher.poll() == []
+
+
+def test_failed_fetch(server, watcher):
+    watcher.poll()
+
+    vlans = server.data.pop('vlans')
+    server.index['addresses']['102']['editDate'] = '2026-01-01 00:00:00'
+
+    # the vlans are not reported deleted; the other collection is still diffed.
+
+    assert changes(watcher.poll()) == [('updated', 'subnets/2/addresses', '102')]
+    assert isinstance(watcher.errors['vlans'], HTTPError)
+    assert len(watcher.state['vlans']) == 20
+
+    server.data['vlans'] = vlans
+    add_vlan(server, '21')
+
+    assert changes(watcher.poll()) == [('created', 'vlans', '21')]
+    assert watcher.errors == {}
+
+
+def test_subscribers(server, watcher):
+    def fails(event):
+        raise ValueError(event)
+
+    found = list()
+    watcher.subscribe(fails)
+    watcher.subscribe(found.append)
+    events = watcher.subscribe_queue()
+
+    watcher.poll()
+    add_vlan(server, '21')
+    add_vlan(server, '22')
+    published = watcher.poll()
+
+    assert changes(found) == changes(published) == [('created', 'vlans', '21'),
+                                                    ('created', 'vlans', '22')]
+    assert [events.get_nowait() for _ in published] == published
+    assert events.empty()
+
+    watcher.unsubscribe(found.append)
+    watcher.unsubscribe(events.put)
+    add_vlan(server, '23')
+    watcher.poll()
+
+    assert len(found) == 2 and events.empty()
+
+
+def test_start_stop(server, watcher):
+    watcher.interval = 0.05
+    events = watcher.subscribe_queue()
+    watcher.poll()
+    add_vlan(server, '21')
+
+    with watcher:
+        event = events.get(timeout=5)
+
+        with pytest.raises(RuntimeError):
+            watcher.start()
+
+    assert (event.kind, event.id) == ('created', '21')
+    assert watcher.polls >= 2 and watcher._thread is None